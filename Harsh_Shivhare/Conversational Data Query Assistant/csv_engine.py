@@ -0,0 +1,84 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from embedding_cache import file_hash
+
+
+class SQLiteCSVEngine:
+    """Loads the whole CSV with pandas into an in-memory SQLite table."""
+
+    dialect = "SQLite"
+
+    def __init__(self, file_path: str, table_name: str = "data_table"):
+        df = pd.read_csv(file_path)
+        self.table_name = table_name
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        df.to_sql(table_name, self.connection, index=False, if_exists='replace')
+        self.schema = str(df.dtypes)
+
+    def query(self, sql: str) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection)
+
+
+class DuckDBCSVEngine:
+    """
+    Queries the CSV through DuckDB's vectorized engine.
+
+    The CSV is converted once into a DuckDB database under ``cache_dir``, named
+    after the file's content hash, so a restart with the same file reuses it and
+    nothing is loaded into Python memory. The database is opened read-only with
+    external access disabled and the configuration locked, so generated SQL can't
+    read or write files on the host (``read_csv``, ``COPY ... TO``, ``ATTACH``).
+    """
+
+    dialect = "DuckDB"
+
+    def __init__(self, file_path: str, cache_dir: str = "csv_cache", table_name: str = "data_table"):
+        import duckdb
+
+        self.table_name = table_name
+        os.makedirs(cache_dir, exist_ok=True)
+        self.database_path = os.path.join(cache_dir, f"{file_hash(file_path)}.duckdb")
+
+        if not os.path.exists(self.database_path):
+            tmp_path = f"{self.database_path}.tmp"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with duckdb.connect(tmp_path) as connection:
+                connection.execute(
+                    f'CREATE TABLE "{table_name}" AS SELECT * FROM read_csv_auto({self._literal(file_path)})'
+                )
+            os.replace(tmp_path, self.database_path)
+
+        # Set at connect time, so the restrictions are in place before any query runs
+        self.connection = duckdb.connect(
+            self.database_path,
+            read_only=True,
+            config={"enable_external_access": False, "lock_configuration": True}
+        )
+
+        columns = self.connection.execute(f'DESCRIBE "{table_name}"').fetchall()
+        row_count = self.connection.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+        self.schema = "\n".join(
+            [f"{name} {column_type}" for name, column_type, *_ in columns] + [f"Rows: {row_count}"]
+        )
+
+    @staticmethod
+    def _literal(value: str) -> str:
+        return "'" + value.replace("'", "''") + "'"
+
+    def query(self, sql: str) -> pd.DataFrame:
+        # A cursor per query, so queries from different threads don't share state
+        return self.connection.cursor().execute(sql).df()
+
+
+def load_csv_engine(file_path: str, engine: str = "duckdb", cache_dir: str = "csv_cache"):
+    """The requested CSV engine, falling back to SQLite when DuckDB isn't installed."""
+    if engine == "duckdb":
+        try:
+            return DuckDBCSVEngine(file_path, cache_dir)
+        except ImportError:
+            print("duckdb is not installed; loading the CSV into SQLite instead.")
+    return SQLiteCSVEngine(file_path)
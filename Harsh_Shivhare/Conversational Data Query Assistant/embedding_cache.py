@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def chunk_hash(text: str) -> str:
+    """Stable id of a chunk's text, shared by every file that contains it."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_identity(model_path: str, **settings) -> str:
+    """
+    Identity of the embedding model actually loaded from ``model_path``.
+
+    For a local model directory this hashes the resolved path, every JSON config
+    file in it and the sizes of its other files (weights, tokenizer), so swapping
+    the model behind the same path gives a new identity. ``settings`` such as
+    encode options that change the vectors are included too.
+    """
+    digest = hashlib.sha256(os.path.realpath(model_path).encode("utf-8"))
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    if os.path.isdir(model_path):
+        for root, dirs, files in os.walk(model_path):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, model_path).encode("utf-8"))
+                if name.endswith(".json") and os.path.getsize(path) < 1 << 20:
+                    with open(path, "rb") as f:
+                        digest.update(f.read())
+                else:
+                    digest.update(str(os.path.getsize(path)).encode("utf-8"))
+    return f"{os.path.basename(os.path.normpath(model_path))}@{digest.hexdigest()[:16]}"
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model with a persistent cache keyed by (model, chunk hash).
+
+    ``embed_documents`` looks every text up first and sends only the misses to
+    the model, ``batch_size`` texts at a time, so re-ingesting an edited file
+    only embeds the chunks that changed. Queries are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, path: str = "embedding_cache.db",
+                 batch_size: int = 256):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, chunk_hash)
+                )
+            """)
+        self.last_run: Dict = {}
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND chunk_hash IN ({','.join('?' * len(batch))})",
+                    [self.model_name, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(self.model_name, key, np.asarray(vector, dtype=np.float32).tobytes())
+                 for key, vector in vectors.items()]
+            )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        hashes = [chunk_hash(text) for text in texts]
+        vectors = self._lookup(sorted(set(hashes)))
+        cached = len(vectors)
+
+        # Embed each distinct missing chunk once, in large batches
+        missing = list(dict.fromkeys(h for h in hashes if h not in vectors))
+        text_for = dict(zip(hashes, texts))
+        embed_seconds = 0.0
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            batch_started = time.perf_counter()
+            embedded = self.embeddings.embed_documents([text_for[h] for h in batch])
+            embed_seconds += time.perf_counter() - batch_started
+            new_vectors = dict(zip(batch, embedded))
+            self._store(new_vectors)
+            vectors.update(new_vectors)
+
+        elapsed = time.perf_counter() - started
+        self.last_run = {
+            "chunks": len(texts),
+            "unique_chunks": len(set(hashes)),
+            "from_cache": cached,
+            "embedded": len(missing),
+            "seconds": round(elapsed, 3),
+            "chunks_per_second": round(len(texts) / elapsed, 1) if elapsed else 0.0,
+            "embedded_per_second": round(len(missing) / embed_seconds, 1) if embed_seconds else 0.0,
+        }
+        return [vectors[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,228 @@
+import json
+import os
+import re
+import uuid
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# Below this many chunks an exact scan of the matrix beats building an ANN graph
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "20000"))
+
+
+def _namespace_dir(directory: str, namespace: str) -> str:
+    return os.path.join(directory, re.sub(r"[^\w.-]+", "_", namespace))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    On-disk vector store with one directory per document namespace.
+
+    Embeddings are kept unit-length as raw float32 rows in ``vectors.f32`` and
+    memory-mapped on load, so cosine similarity is a single matrix-vector product.
+    New rows are appended to the file rather than rewriting it. Namespaces with at
+    least ``ANN_MIN_VECTORS`` chunks also get a FAISS HNSW index (``index.faiss``)
+    when faiss is installed; it is built once when a namespace crosses that size
+    and only the new rows are added to it afterwards. Chunk text and metadata live
+    in ``chunks.json``, along with ``info`` about the namespace (such as the hash of
+    its source file). ``chunks.json`` is written last, and only its rows count, so
+    a crash part-way through an add leaves the previous contents intact.
+    """
+
+    def __init__(self, embedding: Embeddings, directory: str = "vector_store", namespace: str = "default"):
+        self._embedding = embedding
+        self.path = _namespace_dir(directory, namespace)
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._dim: Optional[int] = None
+        self._index = None
+        self.info: dict = {}
+        self._load()
+
+    @staticmethod
+    def exists(directory: str, namespace: str) -> bool:
+        path = _namespace_dir(directory, namespace)
+        return os.path.exists(os.path.join(path, "vectors.f32")) and os.path.exists(os.path.join(path, "chunks.json"))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _load(self):
+        chunks_path = os.path.join(self.path, "chunks.json")
+        vectors_path = os.path.join(self.path, "vectors.f32")
+        if not os.path.exists(chunks_path) or not os.path.exists(vectors_path):
+            return
+        with open(chunks_path, encoding="utf-8") as f:
+            chunks = json.load(f)
+        if not chunks["ids"]:
+            return
+        try:
+            # Rows past len(ids) are left over from an interrupted add and are ignored
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(len(chunks["ids"]), chunks["dim"]))
+        except ValueError:
+            return
+        self._ids = chunks["ids"]
+        self._texts = chunks["texts"]
+        self._metadatas = chunks["metadatas"]
+        self.info = chunks.get("info", {})
+        self._dim = chunks["dim"]
+        self._vectors = vectors
+
+        index_path = os.path.join(self.path, "index.faiss")
+        if os.path.exists(index_path):
+            try:
+                import faiss
+                index = faiss.read_index(index_path)
+                # An index out of step with the chunks is rebuilt on the next add
+                self._index = index if index.ntotal == len(self._ids) else None
+            except ImportError:
+                self._index = None
+
+    def _append(self, new_vectors: np.ndarray):
+        os.makedirs(self.path, exist_ok=True)
+        vectors_path = os.path.join(self.path, "vectors.f32")
+        count = len(self._ids) - len(new_vectors)
+        self._vectors = None
+        with open(vectors_path, "ab") as f:
+            # Drop rows an interrupted add left behind before appending
+            f.truncate(count * new_vectors.shape[1] * 4)
+            f.write(np.ascontiguousarray(new_vectors, dtype=np.float32).tobytes())
+        vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(len(self._ids), new_vectors.shape[1]))
+
+        index_path = os.path.join(self.path, "index.faiss")
+        if self._index is not None or len(vectors) >= ANN_MIN_VECTORS:
+            try:
+                import faiss
+                if self._index is None:
+                    self._index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+                    self._index.add(np.ascontiguousarray(vectors))
+                else:
+                    self._index.add(np.ascontiguousarray(new_vectors, dtype=np.float32))
+                faiss.write_index(self._index, index_path)
+            except ImportError:
+                pass
+        elif os.path.exists(index_path):
+            os.remove(index_path)
+
+        # Writing chunks.json commits the new rows
+        chunks_tmp = os.path.join(self.path, "chunks.json.tmp")
+        with open(chunks_tmp, "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas,
+                       "info": self.info, "dim": self._dim}, f)
+        os.replace(chunks_tmp, os.path.join(self.path, "chunks.json"))
+        self._vectors = vectors
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Store precomputed embeddings alongside their texts."""
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        new_vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        if self._dim is not None and new_vectors.shape[1] != self._dim:
+            raise ValueError(f"Embeddings have {new_vectors.shape[1]} dimensions, the namespace has {self._dim}")
+        self._dim = new_vectors.shape[1]
+
+        self._ids.extend(ids)
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas or [{} for _ in texts])
+        self._append(new_vectors)
+        return ids
+
+    def replace(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        info: Optional[dict] = None,
+    ) -> List[str]:
+        """Swap the whole namespace for new content, e.g. after its source file changed."""
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._vectors = None
+        self._dim = None
+        self._index = None
+        self.info = dict(info or {})
+        # Without chunks.json the namespace reads as empty until the new content is committed
+        for name in ("chunks.json", "index.faiss", "vectors.f32", "vectors.npy"):
+            if os.path.exists(os.path.join(self.path, name)):
+                os.remove(os.path.join(self.path, name))
+        return self.add_embeddings(texts, embeddings, metadatas, ids)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas, ids)
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        if self._vectors is None or not len(self._ids):
+            return []
+        k = min(k, len(self._ids))
+        query = _normalize(np.asarray([embedding], dtype=np.float32))
+
+        if self._index is not None:
+            scores, positions = self._index.search(query, k)
+            hits = [(int(p), float(s)) for p, s in zip(positions[0], scores[0]) if p >= 0]
+        else:
+            scores = self._vectors @ query[0]
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            hits = [(int(p), float(scores[p])) for p in top]
+
+        return [
+            (Document(page_content=self._texts[p], metadata={**self._metadatas[p], "id": self._ids[p]}), score)
+            for p, score in hits
+        ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        directory: str = "vector_store",
+        namespace: str = "default",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding, directory=directory, namespace=namespace)
+        store.add_texts(texts, metadatas, ids=kwargs.get("ids"))
+        return store
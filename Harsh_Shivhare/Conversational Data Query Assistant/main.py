@@ -9,12 +9,13 @@ from typing import Optional, AsyncGenerator
 from PyPDF2 import PdfReader
 from langchain.docstore.document import Document
 from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Pinecone
 from langchain_google_genai import GoogleGenerativeAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.prompts import PromptTemplate
-from pinecone import Pinecone as PineconeClient, ServerlessSpec
 from dotenv import load_dotenv
+from local_vector_store import LocalVectorStore
+from embedding_cache import CachedEmbeddings, chunk_hash, file_hash, model_identity
+from csv_engine import load_csv_engine
 from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import START, MessagesState, StateGraph
@@ -30,6 +31,15 @@ load_dotenv()
 # model_path = "/app/.cache/huggingface/models--sentence-transformers--all-MiniLM-L6-v2"
 model_path = "/local_model"
 
+# "local" keeps vectors on disk next to the app; "pinecone" uses a Pinecone index
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "local")
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "vector_store")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+# "duckdb" queries a cached read-only DuckDB copy of the CSV; "sqlite" loads it into memory
+CSV_ENGINE = os.getenv("CSV_ENGINE", "duckdb")
+CSV_CACHE_DIR = os.getenv("CSV_CACHE_DIR", "csv_cache")
+
 
 class StreamPrinter:
     def __init__(self, delay: float = 0.02):
@@ -50,6 +60,7 @@ class DataQueryAssistant:
         embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
         google_api_key: Optional[str] = None,
         pinecone_api_key: Optional[str] = None,
+        vector_backend: Optional[str] = None,
     ):
         self.file_path = file_path
         self.file_type = self._get_file_type()
@@ -58,12 +69,19 @@ class DataQueryAssistant:
         self.embedding_model = embedding_model
         self.google_api_key = google_api_key or os.getenv("GOOGLE_API_KEY")
         self.pinecone_api_key = pinecone_api_key or os.getenv("PINECONE_API_KEY")
+        self.vector_backend = vector_backend or VECTOR_STORE_BACKEND
         self.vector_store = None
-        if not all([self.google_api_key, self.pinecone_api_key]):
+        if self.vector_backend not in ("local", "pinecone"):
+            raise ValueError(f"Unknown vector store backend: {self.vector_backend}")
+        required_keys = [self.google_api_key]
+        if self.vector_backend == "pinecone":
+            required_keys.append(self.pinecone_api_key)
+        if not all(required_keys):
             raise ValueError("Missing required API keys in environment variables")
 
         self._initialize_embeddings()
-        self._initialize_pinecone()
+        if self.file_type == 'pdf' and self.vector_backend == "pinecone":
+            self._initialize_pinecone()
         self._process_file()
 
         self.llm = GoogleGenerativeAI(
@@ -162,8 +180,9 @@ class DataQueryAssistant:
     def validate_query(self, query: str) -> bool:
         """Basic SQL injection prevention"""
         lower_query = query.lower()
-        forbidden = ['drop', 'truncate', 'delete', 'update', 'insert', 'alter', 'create']
-        return not any(word in lower_query for word in forbidden)
+        forbidden = ['drop', 'truncate', 'delete', 'update', 'insert', 'alter', 'create',
+                     'copy', 'attach', 'export']
+        return not any(re.search(rf"\b{word}\b", lower_query) for word in forbidden)
 
     # def execute_query(self, query: str) -> pd.DataFrame:
     #     """Execute SQL query and return results"""
@@ -186,15 +205,14 @@ class DataQueryAssistant:
             if not self.validate_query(cleaned_query):
                 raise ValueError("Invalid query: Only SELECT statements are allowed")
             
-            with self.sql_connection as conn:
-                result = pd.read_sql_query(cleaned_query, conn)
-                
-                # Handle row count queries specially
-                if 'row_count' in result.columns:
-                    print(f"Total rows: {result['row_count'].values[0]}")
-                    return result
-                
+            result = self.csv_engine.query(cleaned_query)
+
+            # Handle row count queries specially
+            if 'row_count' in result.columns:
+                print(f"Total rows: {result['row_count'].values[0]}")
                 return result
+
+            return result
         
         except sqlite3.Error as e:
             error_msg = f"SQLite Error: {str(e)}\nQuery: {query}"
@@ -214,9 +232,21 @@ class DataQueryAssistant:
         raise ValueError("Unsupported file type. Only CSV and PDF files are supported.")
 
     def _initialize_embeddings(self):
-        self.embeddings = HuggingFaceEmbeddings(model_name=model_path)
+        model = HuggingFaceEmbeddings(model_name=model_path, encode_kwargs={"batch_size": 64})
+        # Cached vectors belong to the model loaded from model_path, not to a configured name
+        self.embedding_model_id = model_identity(
+            model_path, model_kwargs=model.model_kwargs, normalize=model.encode_kwargs.get("normalize_embeddings")
+        )
+        self.embeddings = CachedEmbeddings(
+            model,
+            model_name=self.embedding_model_id,
+            path=EMBEDDING_CACHE_PATH,
+            batch_size=EMBED_BATCH_SIZE
+        )
 
     def _initialize_pinecone(self):
+        from pinecone import Pinecone as PineconeClient, ServerlessSpec
+
         self.pinecone_client = PineconeClient(api_key=self.pinecone_api_key)
         if self.pinecone_index_name not in self.pinecone_client.list_indexes().names():
             print(f"Creating new Pinecone index: {self.pinecone_index_name}")
@@ -237,20 +267,34 @@ class DataQueryAssistant:
             self._process_pdf()
 
     def _process_csv(self):
-        df = pd.read_csv(self.file_path)
-        self.sql_connection = sqlite3.connect(':memory:')
-        df.to_sql('data_table', self.sql_connection, index=False, if_exists='replace')
-        self.table_name = 'data_table'
-        self.csv_schema = str(df.dtypes)
-        print("CSV data loaded into in-memory SQLite database.")
+        self.csv_engine = load_csv_engine(self.file_path, CSV_ENGINE, CSV_CACHE_DIR)
+        self.table_name = self.csv_engine.table_name
+        self.csv_schema = f"SQL dialect: {self.csv_engine.dialect}\n{self.csv_engine.schema}"
+        print(f"CSV data ready to query with {self.csv_engine.dialect}.")
 
     def _process_pdf(self):
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1500,
-            chunk_overlap=200,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
-        )
-        
+        if self.vector_backend == "local":
+            self.vector_store = LocalVectorStore(self.embeddings, VECTOR_STORE_DIR, self.namespace)
+            info = {"source_hash": file_hash(self.file_path), "embedding_model": self.embedding_model_id}
+            if len(self.vector_store) and all(self.vector_store.info.get(key) == value for key, value in info.items()):
+                print(f"Using existing document: {self.namespace}")
+                return
+
+            # New or modified file, or a different model: only chunks missing from the embedding cache are embedded
+            splits = self._split_pdf()
+            texts = [split.page_content for split in splits]
+            self.vector_store.replace(
+                texts,
+                self.embeddings.embed_documents(texts),
+                metadatas=[split.metadata for split in splits],
+                ids=[split.metadata["chunk_id"] for split in splits],
+                info=info
+            )
+            self._print_ingestion_stats(splits)
+            return
+
+        from langchain_community.vectorstores import Pinecone
+
         index = self.pinecone_client.Index(self.pinecone_index_name)
         stats = index.describe_index_stats()
 
@@ -262,25 +306,50 @@ class DataQueryAssistant:
                 namespace=self.namespace
             )
             return
-        
-        with open(self.file_path, 'rb') as file:
-            pdf_reader = PdfReader(file)
-            text_parts = []
-            for page in pdf_reader.pages:
-                text = page.extract_text()
-                cleaned_text = self._clean_text(text)
-                text_parts.append(cleaned_text)
-            
-            full_text = ' '.join(text_parts)
-            doc = Document(page_content=full_text, metadata={"source": self.file_path})
-        
-        splits = text_splitter.split_documents([doc])
+
+        splits = self._split_pdf()
         self.vector_store = Pinecone.from_documents(
             documents=splits,
             embedding=self.embeddings,
             index_name=self.pinecone_index_name,
             namespace=self.namespace,
         )
+        self._print_ingestion_stats(splits)
+
+    def _print_ingestion_stats(self, splits):
+        run = self.embeddings.last_run
+        pages = len({split.metadata["page"] for split in splits})
+        print(
+            f"Ingested {run.get('chunks', 0)} chunks from {pages} pages in {run.get('seconds', 0)}s "
+            f"({run.get('chunks_per_second', 0)} chunks/s): {run.get('from_cache', 0)} from cache, "
+            f"{run.get('embedded', 0)} embedded ({run.get('embedded_per_second', 0)} chunks/s)"
+        )
+
+    def _split_pdf(self):
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1500,
+            chunk_overlap=200,
+            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+        )
+
+        # Split page by page so every chunk knows its page and edits stay local to it
+        with open(self.file_path, 'rb') as file:
+            pdf_reader = PdfReader(file)
+            pages = []
+            for page_number, page in enumerate(pdf_reader.pages, start=1):
+                cleaned_text = self._clean_text(page.extract_text())
+                if cleaned_text:
+                    pages.append(Document(
+                        page_content=cleaned_text,
+                        metadata={"source": self.file_path, "page": page_number}
+                    ))
+
+        splits = {}
+        for split in text_splitter.split_documents(pages):
+            split.metadata["chunk_hash"] = chunk_hash(split.page_content)
+            split.metadata["chunk_id"] = f"{split.metadata['page']}:{split.metadata['chunk_hash']}"
+            splits.setdefault(split.metadata["chunk_id"], split)
+        return list(splits.values())
 
     def _clean_text(self, text: str) -> str:
         if not text:
@@ -1,13 +1,17 @@
 import gradio as gr
 import pandas as pd
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine, text
 from langchain_google_genai import GoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 import warnings
 from typing import List, Dict
 from dataclasses import dataclass
+from query_utils import limit_query, summarize_results
+from schema_catalog import SchemaCatalog, STALE_SCHEMA_ERRORS
+from query_cache import QueryCache
 import re
+import time
 
 warnings.filterwarnings("ignore")
 
@@ -18,12 +22,17 @@ class Config:
     DB_CONNECTION_STRING: str
     LLM_MODEL: str = 'gemini-pro'
     MAX_ROWS: int = 1000  # Limit for safety
+    FETCH_SIZE: int = 500  # Rows read from the cursor at a time
+    SAMPLE_ROWS: int = 20  # Rows shown to the model; larger results are summarized
+    SCHEMA_CACHE_TTL: int = 3600  # Seconds before the schema is introspected again
+    SCHEMA_TOP_K: int = 8  # Tables included in the SQL generation prompt
+    QUERY_CACHE_PATH: str = '.query_cache.db'  # Validated question-to-SQL templates
 
 class DatabaseManager:
     def __init__(self, config: Config):
         self.config = config
         self.engine = create_engine(config.DB_CONNECTION_STRING)
-        self.inspector = inspect(self.engine)
+        self.schema_catalog = SchemaCatalog(self.engine, ttl=config.SCHEMA_CACHE_TTL)
         
         # Initialize LLM
         self.llm = GoogleGenerativeAI(
@@ -34,14 +43,11 @@ class DatabaseManager:
 
     def get_schema_info(self) -> Dict:
         """Get database schema information"""
-        schema_info = {}
-        for table_name in self.inspector.get_table_names():
-            columns = self.inspector.get_columns(table_name)
-            schema_info[table_name] = {
-                'columns': [{'name': col['name'], 'type': str(col['type'])} 
-                          for col in columns]
-            }
-        return schema_info
+        return self.schema_catalog.tables()
+
+    def get_relevant_schema(self, question: str) -> str:
+        """Schema of the tables most relevant to the question"""
+        return self.schema_catalog.relevant_schema(question, top_k=self.config.SCHEMA_TOP_K)
 
     def clean_sql_query(self, query: str) -> str:
         """Clean and format SQL query"""
@@ -58,25 +64,47 @@ class DatabaseManager:
         return not any(word in lower_query for word in forbidden)
 
     def execute_query(self, query: str) -> pd.DataFrame:
-        """Execute SQL query and return results"""
+        """Execute SQL query and return at most MAX_ROWS rows"""
         cleaned_query = self.clean_sql_query(query)
         if not self.validate_query(cleaned_query):
             raise ValueError("Invalid query: Only SELECT statements are allowed")
-        
+
+        # One extra row tells us whether the result was cut off
+        cleaned_query = limit_query(cleaned_query, self.config.MAX_ROWS + 1, self.engine.dialect.name)
         try:
             with self.engine.connect() as conn:
-                result = conn.execute(text(cleaned_query))
-                df = pd.DataFrame(result.fetchall(), columns=result.keys())
-                return df.head(self.config.MAX_ROWS)
+                # Server-side cursor where the driver supports it, read in chunks
+                result = conn.execution_options(stream_results=True).execute(text(cleaned_query))
+                columns = list(result.keys())
+                rows = []
+                while len(rows) <= self.config.MAX_ROWS:
+                    chunk = result.fetchmany(self.config.FETCH_SIZE)
+                    if not chunk:
+                        break
+                    rows.extend(chunk)
+                result.close()
         except Exception as e:
+            if STALE_SCHEMA_ERRORS.search(str(e)):
+                # The schema may have changed since it was cached
+                self.schema_catalog.invalidate()
             raise Exception(f"Query execution error: {str(e)}\nQuery: {cleaned_query}")
 
+        df = pd.DataFrame(rows[:self.config.MAX_ROWS], columns=columns)
+        df.attrs["truncated"] = len(rows) > self.config.MAX_ROWS
+        return df
+
 class QueryBot:
     def __init__(self, config: Config):
         self.config = config
         self.db_manager = DatabaseManager(config)
         self._setup_prompts()
-        self.schema_info = self.db_manager.get_schema_info()
+        # Load the schema catalog now so the first question doesn't wait for it
+        self.db_manager.get_schema_info()
+        # Cached SQL is only valid for the same database and model
+        self.query_cache = QueryCache(
+            config.QUERY_CACHE_PATH,
+            scope=f"{self.db_manager.engine.url.render_as_string(hide_password=True)}|{config.LLM_MODEL}"
+        )
 
     def _setup_prompts(self):
         """Initialize prompt templates"""
@@ -115,30 +143,52 @@ class QueryBot:
             input_variables=["data", "question"]
         )
 
+    def generate_sql(self, message: str) -> str:
+        """Generate a SQL query for the question with the LLM"""
+        sql_chain = LLMChain(llm=self.db_manager.llm, prompt=self.sql_generation_prompt)
+        sql_response = sql_chain.invoke({
+            "schema": self.db_manager.get_relevant_schema(message),
+            "question": message
+        })
+        return sql_response['text'].strip()
+
+    def run_sql(self, message: str):
+        """Return (sql, results, cached), reusing a cached translation of the question if possible"""
+        sql_query = self.query_cache.lookup(message)
+        if sql_query is not None:
+            try:
+                return sql_query, self.db_manager.execute_query(sql_query), True
+            except Exception:
+                # The cached SQL doesn't work here any more; generate it again
+                self.query_cache.discard(message)
+
+        started = time.perf_counter()
+        sql_query = self.generate_sql(message)
+        generation_seconds = time.perf_counter() - started
+        results_df = self.db_manager.execute_query(sql_query)
+        self.query_cache.store(message, self.db_manager.clean_sql_query(sql_query), generation_seconds)
+        return sql_query, results_df, False
+
     def respond(self, message: str, history: List) -> str:
         """Generate response to user query"""
         try:
-            sql_chain = LLMChain(llm=self.db_manager.llm, prompt=self.sql_generation_prompt)
-            sql_response = sql_chain.invoke({
-                "schema": self.schema_info,
-                "question": message
-            })
-            sql_query = sql_response['text'].strip()
-            
-            results_df = self.db_manager.execute_query(sql_query)
+            sql_query, results_df, cached = self.run_sql(message)
             
             if results_df.empty:
                 return "No data found for your query."
             
             response_chain = LLMChain(llm=self.db_manager.llm, prompt=self.response_prompt)
             response = response_chain.invoke({
-                "data": results_df.to_string(),
+                "data": summarize_results(
+                    results_df, results_df.attrs["truncated"], self.config.SAMPLE_ROWS
+                ),
                 "question": message
             })['text']
             
             result_text = "\nResults:\n" + results_df.to_string()
             
-            return f"{response}\n\nSQL Query Used:\n```sql\n{sql_query}\n```{result_text}"
+            source = " (reused from an earlier question)" if cached else ""
+            return f"{response}\n\nSQL Query Used{source}:\n```sql\n{sql_query}\n```{result_text}"
             
         except Exception as e:
             return f"Error processing query: {str(e)}"
@@ -187,6 +237,15 @@ def create_interface() -> gr.Blocks:
 
         connect_button.click(on_connect, inputs=db_connection_input, outputs=status_output)
 
+        with gr.Accordion("Query cache", open=False):
+            cache_stats_output = gr.JSON(label="Cache statistics")
+            cache_stats_button = gr.Button("Refresh")
+
+        def on_cache_stats():
+            return querybot.query_cache.stats() if querybot else {}
+
+        cache_stats_button.click(on_cache_stats, outputs=cache_stats_output)
+
     return interface
 
 def main():
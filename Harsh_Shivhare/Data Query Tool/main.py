@@ -2,10 +2,13 @@ from langchain_google_genai import GoogleGenerativeAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine, text
 import pandas as pd
 from typing import List, Dict, Generator
 from dataclasses import dataclass
+from query_utils import limit_query, summarize_results
+from schema_catalog import SchemaCatalog, STALE_SCHEMA_ERRORS
+from query_cache import QueryCache
 import re
 import warnings
 import os
@@ -21,6 +24,11 @@ class Config:
     DB_CONNECTION_STRING: str
     LLM_MODEL: str = 'gemini-2.0-flash'
     MAX_ROWS: int = 1000  # Limit for safety
+    FETCH_SIZE: int = 500  # Rows read from the cursor at a time
+    SAMPLE_ROWS: int = 20  # Rows shown to the model; larger results are summarized
+    SCHEMA_CACHE_TTL: int = 3600  # Seconds before the schema is introspected again
+    SCHEMA_TOP_K: int = 8  # Tables included in the SQL generation prompt
+    QUERY_CACHE_PATH: str = '.query_cache.db'  # Validated question-to-SQL templates
 
 class StreamPrinter:
     """Handles streaming output with typewriter effect"""
@@ -38,7 +46,7 @@ class DatabaseManager:
     def __init__(self, config: Config):
         self.config = config
         self.engine = create_engine(config.DB_CONNECTION_STRING)
-        self.inspector = inspect(self.engine)
+        self.schema_catalog = SchemaCatalog(self.engine, ttl=config.SCHEMA_CACHE_TTL)
         
         # Initialize LLM with streaming
         self.llm = GoogleGenerativeAI(
@@ -50,14 +58,11 @@ class DatabaseManager:
 
     def get_schema_info(self) -> Dict:
         """Get database schema information"""
-        schema_info = {}
-        for table_name in self.inspector.get_table_names():
-            columns = self.inspector.get_columns(table_name)
-            schema_info[table_name] = {
-                'columns': [{'name': col['name'], 'type': str(col['type'])} 
-                          for col in columns]
-            }
-        return schema_info
+        return self.schema_catalog.tables()
+
+    def get_relevant_schema(self, question: str) -> str:
+        """Schema of the tables most relevant to the question"""
+        return self.schema_catalog.relevant_schema(question, top_k=self.config.SCHEMA_TOP_K)
 
     def clean_sql_query(self, query: str) -> str:
         """Clean and format SQL query"""
@@ -74,25 +79,47 @@ class DatabaseManager:
         return not any(word in lower_query for word in forbidden)
 
     def execute_query(self, query: str) -> pd.DataFrame:
-        """Execute SQL query and return results"""
+        """Execute SQL query and return at most MAX_ROWS rows"""
         cleaned_query = self.clean_sql_query(query)
         if not self.validate_query(cleaned_query):
             raise ValueError("Invalid query: Only SELECT statements are allowed")
-        
+
+        # One extra row tells us whether the result was cut off
+        cleaned_query = limit_query(cleaned_query, self.config.MAX_ROWS + 1, self.engine.dialect.name)
         try:
             with self.engine.connect() as conn:
-                result = conn.execute(text(cleaned_query))
-                df = pd.DataFrame(result.fetchall(), columns=result.keys())
-                return df.head(self.config.MAX_ROWS)
+                # Server-side cursor where the driver supports it, read in chunks
+                result = conn.execution_options(stream_results=True).execute(text(cleaned_query))
+                columns = list(result.keys())
+                rows = []
+                while len(rows) <= self.config.MAX_ROWS:
+                    chunk = result.fetchmany(self.config.FETCH_SIZE)
+                    if not chunk:
+                        break
+                    rows.extend(chunk)
+                result.close()
         except Exception as e:
+            if STALE_SCHEMA_ERRORS.search(str(e)):
+                # The schema may have changed since it was cached
+                self.schema_catalog.invalidate()
             raise Exception(f"Query execution error: {str(e)}\nQuery: {cleaned_query}")
 
+        df = pd.DataFrame(rows[:self.config.MAX_ROWS], columns=columns)
+        df.attrs["truncated"] = len(rows) > self.config.MAX_ROWS
+        return df
+
 class QueryBot:
     def __init__(self, config: Config):
         self.config = config
         self.db_manager = DatabaseManager(config)
         self._setup_prompts()
-        self.schema_info = self.db_manager.get_schema_info()
+        # Load the schema catalog now so the first question doesn't wait for it
+        self.db_manager.get_schema_info()
+        # Cached SQL is only valid for the same database and model
+        self.query_cache = QueryCache(
+            config.QUERY_CACHE_PATH,
+            scope=f"{self.db_manager.engine.url.render_as_string(hide_password=True)}|{config.LLM_MODEL}"
+        )
         self.stream_printer = StreamPrinter()
 
     def _setup_prompts(self):
@@ -169,22 +196,43 @@ db.sales.aggregate([
                 response_tokens.append(chunk['text'])
                 yield chunk['text']
 
+    def generate_sql(self, user_question: str) -> str:
+        """Generate a SQL query for the question with the LLM"""
+        sql_chain = LLMChain(llm=self.db_manager.llm, prompt=self.sql_generation_prompt)
+        sql_query = ""
+        print("\nGenerating SQL query...\n")
+        for chunk in self.stream_response(sql_chain, {
+            "schema": self.db_manager.get_relevant_schema(user_question),
+            "question": user_question
+        }):
+            sql_query += chunk
+        return sql_query
+
+    def run_sql(self, question: str):
+        """Return (sql, results, cached), reusing a cached translation of the question if possible"""
+        sql_query = self.query_cache.lookup(question)
+        if sql_query is not None:
+            try:
+                return sql_query, self.db_manager.execute_query(sql_query), True
+            except Exception:
+                # The cached SQL doesn't work here any more; generate it again
+                self.query_cache.discard(question)
+
+        started = time.perf_counter()
+        sql_query = self.generate_sql(question)
+        generation_seconds = time.perf_counter() - started
+        results_df = self.db_manager.execute_query(sql_query)
+        self.query_cache.store(question, self.db_manager.clean_sql_query(sql_query), generation_seconds)
+        return sql_query, results_df, False
+
     def query(self, user_question: str):
         """Process a single user query and stream the response"""
         try:
-            # Generate SQL query
-            sql_chain = LLMChain(llm=self.db_manager.llm, prompt=self.sql_generation_prompt)
-            sql_query = ""
-            print("\nGenerating SQL query...\n")
-            for chunk in self.stream_response(sql_chain, {
-                "schema": self.schema_info,
-                "question": user_question
-            }):
-                sql_query += chunk
-                
-            # Clean and execute the SQL query
-            results_df = self.db_manager.execute_query(sql_query)
-            
+            # Reuse or generate the SQL query, then execute it
+            sql_query, results_df, cached = self.run_sql(user_question)
+            if cached:
+                print("\nReusing SQL from an earlier question...\n")
+
             if results_df.empty:
                 self.stream_printer.print_stream("No data found for your query.")
                 return
@@ -193,7 +241,9 @@ db.sales.aggregate([
             response_chain = LLMChain(llm=self.db_manager.llm, prompt=self.response_prompt)
             print("\nAnalyzing results...\n")
             for chunk in self.stream_response(response_chain, {
-                "data": results_df.to_string(),
+                "data": summarize_results(
+                    results_df, results_df.attrs["truncated"], self.config.SAMPLE_ROWS
+                ),
                 "question": user_question
             }):
                 self.stream_printer.print_stream(chunk)
@@ -245,6 +295,12 @@ def main():
                 break
                 
             query_bot.query(user_question)
+
+        stats = query_bot.query_cache.stats()
+        print(
+            f"\nQuery cache: {stats['hits']}/{stats['lookups']} questions answered from cache "
+            f"({stats['hit_rate']:.0%}), about {stats['saved_seconds']}s of SQL generation saved."
+        )
             
     except Exception as e:
         print(f"\nError initializing QueryBot: {str(e)}")
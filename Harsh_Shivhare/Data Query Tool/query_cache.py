@@ -0,0 +1,260 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+
+# Literals lifted out of questions, in the order they are searched for
+LITERAL_PATTERNS = [
+    ("str", re.compile(r"'([^']+)'|\"([^\"]+)\"")),
+    ("date", re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")),
+    # "may" is only a month when capitalised
+    ("month", re.compile(r"\b((?i:" + "|".join(m for m in MONTHS if m != "may") + r")|May)\b")),
+    ("num", re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)(?![\w.])")),
+]
+
+# A number right after one of these words is a row count ("top 5"), which belongs in LIMIT
+COUNT_WORD = re.compile(r"\b(top|first|bottom|last|limit)\s*$", re.IGNORECASE)
+# SQL that a row count follows
+LIMIT_CONTEXT = re.compile(r"\b(LIMIT|TOP|FIRST|NEXT)\s*\(?\s*$", re.IGNORECASE)
+
+# Words that don't change what a question asks for
+FILLER_WORDS = {"please", "show", "me", "give", "list", "tell", "what", "which", "is", "are",
+                "the", "a", "an", "of", "for", "in", "all", "can", "you", "i", "want", "to", "see"}
+
+
+def extract_literals(question: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Replace literal values in a question with ``<kind>`` placeholders.
+    Returns the masked question and the ``(kind, value)`` pairs in question order.
+    Numbers used as row counts ("top 5") get the kind ``count``.
+    """
+    spans = []
+    remaining = question
+    for kind, pattern in LITERAL_PATTERNS:
+        for match in pattern.finditer(remaining):
+            value = next(group for group in match.groups() if group is not None)
+            if kind == "num" and COUNT_WORD.search(question[:match.start()]):
+                spans.append((match.start(), match.end(), "count", value))
+            else:
+                spans.append((match.start(), match.end(), kind, value))
+        # Blank out what was matched so later patterns don't match inside it
+        remaining = pattern.sub(lambda m: " " * len(m.group(0)), remaining)
+    spans.sort()
+
+    masked, position = [], 0
+    for start, end, kind, _ in spans:
+        masked.append(question[position:start])
+        masked.append(f" <{kind}> ")
+        position = end
+    masked.append(question[position:])
+    return "".join(masked), [(kind, value) for _, _, kind, value in spans]
+
+
+def fingerprint(masked_question: str) -> str:
+    words = re.findall(r"<\w+>|[a-z0-9_]+", masked_question.lower())
+    # Drop filler words and a plural "s" so small rewordings share a key
+    return " ".join(
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in words if word not in FILLER_WORDS
+    )
+
+
+def _month_number(value: str) -> int:
+    return MONTHS.index(value.lower()) + 1
+
+
+def _month_patterns(value: str):
+    """Ways a month from the question can appear in SQL: (form, regex)."""
+    number = _month_number(value)
+    return [
+        ("name", re.compile(rf"\b{re.escape(value)}\b", re.IGNORECASE)),
+        # '2024-03' or '2024-03-01'
+        ("pad", re.compile(rf"(?<=\d{{4}}-){number:02d}(?![\d])")),
+        # MONTH(sale_date) = 3, EXTRACT(MONTH FROM sale_date) = 3
+        ("num", re.compile(rf"(?i)(?<=month)([^=;]*?=\s*)({number})(?!\d)")),
+    ]
+
+
+def _lift(sql: str, kind: str, value: str, marker: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Replace ``value`` in the SQL with ``marker``; returns (template, form) or (None, None).
+
+    A value is only lifted when it appears exactly once in the SQL, and a number
+    only when its place matches the question: row counts inside LIMIT/TOP/FETCH,
+    other numbers outside them. Otherwise the copy in the SQL may not be the one
+    from the question (``active = 1 ... LIMIT 1``).
+    """
+    if kind == "month":
+        found = [(form, match) for form, pattern in _month_patterns(value) for match in pattern.finditer(sql)]
+        if len(found) != 1:
+            return None, None
+        form, match = found[0]
+        if form == "num":
+            return sql[:match.start(2)] + marker + sql[match.end(2):], form
+        if form == "name":
+            text = match.group(0)
+            form = "upper" if text.isupper() else "lower" if text.islower() else "title"
+        return sql[:match.start()] + marker + sql[match.end():], form
+
+    if kind == "str":
+        pattern = re.compile(rf"'{re.escape(value.replace(chr(39), chr(39) * 2))}'")
+        replacement, form = f"'{marker}'", "quoted"
+    else:
+        pattern = re.compile(rf"(?<![\w.]){re.escape(value)}(?![\w.])")
+        replacement, form = marker, "plain"
+    matches = list(pattern.finditer(sql))
+    if len(matches) != 1:
+        return None, None
+    match = matches[0]
+    if kind in ("num", "count"):
+        in_limit = bool(LIMIT_CONTEXT.search(sql[:match.start()]))
+        if in_limit != (kind == "count"):
+            return None, None
+    return sql[:match.start()] + replacement + sql[match.end():], form
+
+
+def _bind(kind: str, form: str, value: str) -> Optional[str]:
+    if kind == "month":
+        if value.lower() not in MONTHS:
+            return None
+        number = _month_number(value)
+        return {
+            "upper": value.upper(), "lower": value.lower(), "title": value.title(),
+            "pad": f"{number:02d}", "num": str(number),
+        }[form]
+    if kind == "count":
+        return value if re.fullmatch(r"\d+", value) else None
+    if kind == "num":
+        return value if re.fullmatch(r"\d+(?:\.\d+)?", value) else None
+    if kind == "date":
+        return value if re.fullmatch(r"\d{4}-\d{2}-\d{2}", value) else None
+    # Quoted strings go back inside SQL quotes
+    return value.replace("'", "''")
+
+
+class QueryCache:
+    """
+    Cache of validated NL-to-SQL translations, persisted in SQLite.
+
+    Literals in the question (quoted strings, dates, month names, numbers) are
+    lifted into parameters, so "sales in March 2023" and "sales in June 2024"
+    share one SQL template and only differ in the values bound into it. The
+    masked question must match exactly once filler words are dropped; any other
+    changed word, like "active"/"inactive" or "highest"/"lowest", is a miss.
+    Entries are scoped per database and model. When a literal can't be located
+    unambiguously in the SQL the entry only serves the exact same question.
+    """
+
+    def __init__(self, path: str = ".query_cache.db", scope: str = ""):
+        self.scope = hashlib.sha256(scope.encode("utf-8")).hexdigest()[:16]
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "exact_hits": 0, "template_hits": 0, "saved_seconds": 0.0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sql_templates (
+                    scope TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    kinds TEXT NOT NULL,
+                    template TEXT NOT NULL,
+                    forms TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    generation_seconds REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (scope, fingerprint)
+                )
+            """)
+
+    def _keys(self, question: str):
+        masked, literals = extract_literals(question)
+        kinds = ",".join(kind for kind, _ in literals)
+        return fingerprint(masked), kinds, literals
+
+    def _find(self, key: str, kinds: str):
+        return self._conn.execute(
+            "SELECT fingerprint, template, forms, generation_seconds FROM sql_templates "
+            "WHERE scope = ? AND fingerprint = ? AND kinds = ?",
+            (self.scope, key, kinds)
+        ).fetchone()
+
+    def lookup(self, question: str) -> Optional[str]:
+        """SQL for the question with its literals bound, or None on a miss."""
+        key, kinds, literals = self._keys(question)
+        with self._lock:
+            self._stats["lookups"] += 1
+            # Parameterised entries first, then an entry for this exact question
+            row = self._find(key, kinds) or self._conn.execute(
+                "SELECT fingerprint, template, forms, generation_seconds FROM sql_templates "
+                "WHERE scope = ? AND fingerprint = ?",
+                (self.scope, self._exact_key(question))
+            ).fetchone()
+            if row is None:
+                return None
+            _, template, forms, generation_seconds = row
+            forms = json.loads(forms)
+
+            sql = template
+            if forms:
+                for index, ((kind, value), form) in enumerate(zip(literals, forms)):
+                    bound = _bind(kind, form, value)
+                    if bound is None:
+                        return None
+                    sql = sql.replace(f"{{{{p{index}}}}}", bound)
+                self._stats["template_hits"] += 1
+            else:
+                self._stats["exact_hits"] += 1
+            self._stats["saved_seconds"] += generation_seconds
+            return sql
+
+    @staticmethod
+    def _exact_key(question: str) -> str:
+        return "exact:" + " ".join(question.lower().split())
+
+    def store(self, question: str, sql: str, generation_seconds: float) -> None:
+        """Remember SQL that executed successfully for the question."""
+        key, kinds, literals = self._keys(question)
+        template, forms = sql, []
+        for index, (kind, value) in enumerate(literals):
+            template, form = _lift(template, kind, value, f"{{{{p{index}}}}}")
+            if template is None:
+                break
+            forms.append(form)
+        if template is None:
+            # Not every literal could be located, so only reuse for this exact question
+            key, kinds, template, forms = self._exact_key(question), "", sql, []
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_templates VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.scope, key, kinds, template, json.dumps(forms), question, generation_seconds, time.time())
+            )
+
+    def discard(self, question: str) -> None:
+        """Drop the entries a question maps to, e.g. after its cached SQL failed."""
+        key, _, _ = self._keys(question)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sql_templates WHERE scope = ? AND fingerprint IN (?, ?)",
+                (self.scope, key, self._exact_key(question))
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM sql_templates WHERE scope = ?", (self.scope,)
+            ).fetchone()[0]
+            hits = self._stats["exact_hits"] + self._stats["template_hits"]
+            lookups = self._stats["lookups"]
+            return {
+                **self._stats,
+                "saved_seconds": round(self._stats["saved_seconds"], 2),
+                "hits": hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": entries,
+            }
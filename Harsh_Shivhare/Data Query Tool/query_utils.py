@@ -0,0 +1,101 @@
+import re
+
+import pandas as pd
+
+# A LIMIT at the very end of the statement: "LIMIT n", "LIMIT offset, n" or "LIMIT n OFFSET m"
+TRAILING_LIMIT = re.compile(
+    r'\bLIMIT\s+(\d+)(?:\s*,\s*(\d+))?(?:\s+OFFSET\s+\d+)?\s*$',
+    re.IGNORECASE
+)
+
+# Row caps written in other syntaxes, which a LIMIT can't be combined with
+OTHER_ROW_CAP = re.compile(
+    r'\bSELECT\s+(?:ALL\s+|DISTINCT\s+)?TOP\b|\bFETCH\s+(?:FIRST|NEXT)\b',
+    re.IGNORECASE
+)
+
+# String literals, quoted identifiers, and the tokens that end the statement's code
+STATEMENT_TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--|;")
+
+# SQLAlchemy dialect names (``engine.dialect.name``) that accept a trailing LIMIT
+LIMIT_DIALECTS = {
+    'sqlite', 'mysql', 'mariadb', 'postgresql', 'duckdb', 'snowflake', 'redshift',
+    'bigquery', 'databricks', 'trino', 'presto', 'clickhouse', 'hive', 'cockroachdb',
+}
+
+
+def first_statement(query: str) -> str:
+    """
+    The query up to its first ``;`` or ``--`` comment outside quotes. Queries are
+    joined onto one line before they get here, so a comment runs to the end.
+    """
+    for match in STATEMENT_TOKENS.finditer(query):
+        if match.group() in (';', '--'):
+            return query[:match.start()]
+    return query
+
+
+def limit_query(query: str, max_rows: int, dialect: str = 'sqlite') -> str:
+    """
+    Make the database stop after ``max_rows`` rows.
+
+    A trailing LIMIT larger than ``max_rows`` is lowered, and a query without one
+    gets one appended, so the row cap is applied by the server instead of after
+    the whole result has been transferred. Queries for dialects without LIMIT
+    (MSSQL, Oracle) and queries already capped with TOP or FETCH FIRST are left
+    unchanged; the caller's ``fetchmany`` cap still applies to them. Anything
+    after the first statement, such as a trailing comment, is dropped, so the
+    LIMIT can't end up inside it.
+    """
+    query = first_statement(query).strip()
+    if not re.match(r'^\(?\s*(SELECT|WITH)\b', query, re.IGNORECASE):
+        return query + ';'
+    if dialect not in LIMIT_DIALECTS or OTHER_ROW_CAP.search(query):
+        return query + ';'
+
+    match = TRAILING_LIMIT.search(query)
+    if match is None:
+        return f"{query} LIMIT {max_rows};"
+
+    # In "LIMIT offset, n" the row count is the second number
+    count_group = 2 if match.group(2) else 1
+    if int(match.group(count_group)) <= max_rows:
+        return query + ';'
+    start, end = match.span(count_group)
+    return f"{query[:start]}{max_rows}{query[end:]};"
+
+
+def summarize_results(df: pd.DataFrame, truncated: bool = False, sample_rows: int = 20) -> str:
+    """
+    Describe a result set for the response prompt: columns, row count, per-column
+    aggregates and a sample. Results that fit in the sample are included whole.
+    """
+    row_count = f"{len(df)}"
+    if truncated:
+        row_count += " (row limit reached; the full result has more rows)"
+    lines = [
+        f"Rows returned: {row_count}",
+        "Columns: " + ", ".join(f"{column} ({dtype})" for column, dtype in df.dtypes.items()),
+    ]
+
+    if len(df) <= sample_rows:
+        lines += ["", "All rows:", df.to_string(index=False)]
+        return "\n".join(lines)
+
+    lines += ["", "Column summary:"]
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            lines.append(
+                f"- {column}: min {values.min()}, max {values.max()}, mean {values.mean():.4g}, "
+                f"sum {values.sum():.6g}, nulls {values.isna().sum()}"
+            )
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            lines.append(f"- {column}: from {values.min()} to {values.max()}, nulls {values.isna().sum()}")
+        else:
+            top = values.astype(str).value_counts().head(5)
+            common = ", ".join(f"{value} ({count})" for value, count in top.items())
+            lines.append(f"- {column}: {values.nunique()} distinct, most common: {common}")
+
+    lines += ["", f"First {sample_rows} rows:", df.head(sample_rows).to_string(index=False)]
+    return "\n".join(lines)
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect
+
+# Errors that suggest the cached schema no longer matches the database
+STALE_SCHEMA_ERRORS = re.compile(
+    r"no such (table|column)|doesn't exist|does not exist|unknown column|undefined (table|column)",
+    re.IGNORECASE
+)
+
+# Columns kept for a relevant table even when the question doesn't mention them
+KEY_COLUMN = re.compile(r"^(id|.*_id|.*_(date|at|time)|date|name)$", re.IGNORECASE)
+
+
+def _tokens(text: str) -> List[str]:
+    """Lower-case word tokens, splitting snake_case and camelCase, with plural 's' dropped."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+            for word in words]
+
+
+class SchemaCatalog:
+    """
+    Database schema introspected once and reused until ``ttl`` seconds pass.
+
+    The catalog is kept in memory and in a JSON file per database, so restarts
+    skip introspection too. ``relevant_schema`` ranks tables against a question
+    by the words they share (table names count double, rarer words count more)
+    and formats only the top ``top_k`` tables for the prompt.
+    """
+
+    def __init__(self, engine, ttl: int = 3600, cache_dir: Optional[str] = ".schema_cache"):
+        self.engine = engine
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tables: Optional[Dict] = None
+        self._fetched_at = 0.0
+        self._index: Dict[str, Counter] = {}
+        self._idf: Dict[str, float] = {}
+        self.cache_path = None
+        if cache_dir:
+            url = engine.url.render_as_string(hide_password=True)
+            key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+            self.cache_path = os.path.join(cache_dir, f"{key}.json")
+
+    def _introspect(self) -> Dict:
+        inspector = inspect(self.engine)
+        tables = {}
+        try:
+            # One round trip for every table's columns where the dialect supports it
+            multi = inspector.get_multi_columns()
+            for (_, table_name), columns in multi.items():
+                tables[table_name] = {
+                    'columns': [{'name': col['name'], 'type': str(col['type'])} for col in columns]
+                }
+        except (AttributeError, NotImplementedError):
+            for table_name in inspector.get_table_names():
+                columns = inspector.get_columns(table_name)
+                tables[table_name] = {
+                    'columns': [{'name': col['name'], 'type': str(col['type'])} for col in columns]
+                }
+        return tables
+
+    def _load_file(self) -> bool:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if time.time() - cached["fetched_at"] > self.ttl:
+            return False
+        self._tables, self._fetched_at = cached["tables"], cached["fetched_at"]
+        return True
+
+    def _save_file(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": self._fetched_at, "tables": self._tables}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _build_index(self):
+        self._index = {}
+        for table_name, info in self._tables.items():
+            words = Counter({token: 2 for token in _tokens(table_name)})
+            for column in info['columns']:
+                words.update(_tokens(column['name']))
+            self._index[table_name] = words
+        document_frequency = Counter(word for words in self._index.values() for word in words)
+        total = len(self._index)
+        self._idf = {word: math.log(1 + total / count) for word, count in document_frequency.items()}
+
+    def tables(self) -> Dict:
+        """``{table: {'columns': [{'name', 'type'}, ...]}}``, refreshed once the TTL has passed."""
+        with self._lock:
+            fresh = self._tables is not None and time.time() - self._fetched_at <= self.ttl
+            if not fresh and not (self._tables is None and self._load_file()):
+                self._tables = self._introspect()
+                self._fetched_at = time.time()
+                self._save_file()
+                self._index = {}
+            if not self._index:
+                self._build_index()
+            return self._tables
+
+    def invalidate(self):
+        """Forget the catalog so the next lookup introspects the database again."""
+        with self._lock:
+            self._tables = None
+            self._index = {}
+            if self.cache_path and os.path.exists(self.cache_path):
+                os.remove(self.cache_path)
+
+    def rank_tables(self, question: str) -> List[Tuple[str, float]]:
+        """``(table, score)`` pairs ordered by relevance to the question, best first."""
+        tables = self.tables()
+        question_tokens = set(_tokens(question))
+        scores = {
+            table_name: sum(self._idf[token] * min(self._index[table_name][token], 2)
+                            for token in question_tokens if token in self._index[table_name])
+            for table_name in tables
+        }
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def relevant_schema(self, question: str, top_k: int = 8, max_columns: int = 30) -> str:
+        """Compact schema text with only the tables and columns that matter for the question."""
+        tables = self.tables()
+        question_tokens = set(_tokens(question))
+        ranked = self.rank_tables(question)
+        # Tables sharing no word with the question are only sent when nothing matches
+        selected = [table_name for table_name, score in ranked if score > 0][:top_k]
+        selected = selected or [table_name for table_name, _ in ranked[:top_k]]
+        lines = []
+        for table_name in selected:
+            columns = tables[table_name]['columns']
+            if len(columns) > max_columns:
+                # Keep columns named in the question plus keys and dates
+                columns = [
+                    column for column in columns
+                    if question_tokens & set(_tokens(column['name'])) or KEY_COLUMN.match(column['name'])
+                ][:max_columns]
+            column_text = ", ".join(f"{column['name']} {column['type']}" for column in columns)
+            lines.append(f"{table_name}({column_text})")
+        if len(tables) > len(selected):
+            lines.append(f"-- {len(tables) - len(selected)} less relevant tables omitted")
+        return "\n".join(lines)
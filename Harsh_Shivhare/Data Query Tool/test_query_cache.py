@@ -0,0 +1,69 @@
+from query_cache import QueryCache
+
+
+def make_cache(tmp_path):
+    return QueryCache(str(tmp_path / "query_cache.db"), scope="test")
+
+
+def test_template_reused_for_new_literals(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store(
+        "total sales in 'North' region for 2023",
+        "SELECT SUM(amount) FROM sales WHERE region = 'North' AND year = 2023;",
+        1.0
+    )
+    assert cache.lookup("total sales in 'South' region for 2024") == (
+        "SELECT SUM(amount) FROM sales WHERE region = 'South' AND year = 2024;"
+    )
+
+
+def test_row_count_bound_into_limit(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store(
+        "top 3 customers by revenue",
+        "SELECT name FROM customers ORDER BY revenue DESC LIMIT 3;",
+        1.0
+    )
+    assert cache.lookup("top 10 customers by revenue") == (
+        "SELECT name FROM customers ORDER BY revenue DESC LIMIT 10;"
+    )
+
+
+def test_number_repeated_in_sql_is_not_lifted(tmp_path):
+    cache = make_cache(tmp_path)
+    question = "top 1 customers by revenue for active accounts in March 2024"
+    sql = ("SELECT name FROM customers WHERE active = 1 AND strftime('%Y-%m', signup) = '2024-03' "
+           "ORDER BY revenue DESC LIMIT 1;")
+    cache.store(question, sql, 1.0)
+    assert cache.lookup("top 5 customers by revenue for active accounts in June 2023") is None
+    assert cache.lookup(question) == sql
+
+
+def test_number_in_other_context_is_not_lifted(tmp_path):
+    cache = make_cache(tmp_path)
+    # "top 1" is a row count, but the only 1 in the SQL is a flag
+    cache.store(
+        "top 1 active customer",
+        "SELECT name FROM customers WHERE active = 1 ORDER BY revenue DESC;",
+        1.0
+    )
+    assert cache.lookup("top 5 active customer") is None
+
+
+def test_changed_content_word_is_a_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store(
+        "list the customers for active accounts in 'Texas' sorted by highest revenue",
+        "SELECT name FROM customers WHERE active = 1 AND state = 'Texas' ORDER BY revenue DESC;",
+        1.0
+    )
+    assert cache.lookup("list the customers for inactive accounts in 'Texas' sorted by highest revenue") is None
+    assert cache.lookup("list the customers for active accounts in 'Texas' sorted by lowest revenue") is None
+    assert cache.lookup("list the customers for active accounts in 'Texas' not sorted by highest revenue") is None
+
+
+def test_filler_words_still_match(tmp_path):
+    cache = make_cache(tmp_path)
+    sql = "SELECT name FROM customers WHERE state = 'Texas';"
+    cache.store("list the customers in 'Texas'", sql, 1.0)
+    assert cache.lookup("please show me all customers in 'Texas'") == sql
@@ -0,0 +1,28 @@
+from query_utils import limit_query
+
+
+def test_limit_appended():
+    assert limit_query("SELECT * FROM t;", 1001) == "SELECT * FROM t LIMIT 1001;"
+
+
+def test_larger_limit_lowered():
+    assert limit_query("SELECT * FROM t LIMIT 5000;", 1001) == "SELECT * FROM t LIMIT 1001;"
+
+
+def test_trailing_comment_dropped_before_limit():
+    assert limit_query("select * from t; -- top rows;", 1001) == "select * from t LIMIT 1001;"
+    assert limit_query("select * from t -- top rows;", 1001) == "select * from t LIMIT 1001;"
+
+
+def test_only_first_statement_kept():
+    assert limit_query("SELECT * FROM t; SELECT * FROM u;", 1001) == "SELECT * FROM t LIMIT 1001;"
+
+
+def test_quoted_semicolon_and_dashes_kept():
+    assert limit_query("SELECT * FROM t WHERE note = 'a; -- b';", 10) == (
+        "SELECT * FROM t WHERE note = 'a; -- b' LIMIT 10;"
+    )
+
+
+def test_dialect_without_limit_unchanged():
+    assert limit_query("SELECT TOP 5 * FROM t;", 1001, dialect="mssql") == "SELECT TOP 5 * FROM t;"
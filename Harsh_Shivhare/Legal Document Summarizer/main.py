@@ -1,10 +1,5 @@
 import os
-import io
-import cv2
-import numpy as np
 import PyPDF2
-from PIL import Image
-import easyocr
 from dotenv import load_dotenv
 from typing import Generator, Dict
 import sys
@@ -17,45 +12,60 @@ from langchain_core.output_parsers import StrOutputParser
 import warnings
 warnings.filterwarnings("ignore")
 
+from map_reduce import ChunkSummarizer, SummaryCache, split_document
+from ocr_pool import OCRPool
+
+MODEL_NAME = 'gemini-pro'
+# Documents longer than this are summarized part by part before the final summary
+SUMMARY_CHUNK_CHARS = int(os.getenv('SUMMARY_CHUNK_CHARS', '12000'))
+SUMMARY_MAX_WORKERS = int(os.getenv('SUMMARY_MAX_WORKERS', '4'))
+SUMMARY_REQUESTS_PER_MINUTE = float(os.getenv('SUMMARY_REQUESTS_PER_MINUTE', '60'))
+SUMMARY_CACHE_PATH = os.getenv('SUMMARY_CACHE_PATH', 'summary_cache.db')
+# OCR worker processes, each holding its own EasyOCR reader
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Pages with at least this much extractable text are not OCRed
+OCR_DENSE_TEXT_CHARS = int(os.getenv('OCR_DENSE_TEXT_CHARS', '1000'))
+OCR_MAX_IMAGE_SIDE = int(os.getenv('OCR_MAX_IMAGE_SIDE', '2000'))
+
 class LegalDocumentSummarizer:
     def __init__(self, api_key=None):
         load_dotenv()
         self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
-        self.reader = easyocr.Reader(['en'])
+        self.ocr = OCRPool(
+            ['en'],
+            workers=OCR_WORKERS,
+            dense_text_chars=OCR_DENSE_TEXT_CHARS,
+            max_image_side=OCR_MAX_IMAGE_SIDE
+        )
         self.llm = GoogleGenerativeAI(
-            model='gemini-pro',
+            model=MODEL_NAME,
             temperature=0.7,
             api_key=self.api_key
         )
+        self.chunk_summarizer = ChunkSummarizer(
+            self.llm,
+            MODEL_NAME,
+            cache=SummaryCache(SUMMARY_CACHE_PATH),
+            max_workers=SUMMARY_MAX_WORKERS,
+            requests_per_minute=SUMMARY_REQUESTS_PER_MINUTE
+        )
 
     def extract_text_from_pdf(self, pdf_file, lang=['en']):
+        """Page text plus OCR of embedded images; per-page timings are in ``self.ocr.last_run``."""
         text = ""
         pdf_reader = PyPDF2.PdfReader(pdf_file)
-        for page_num, page in enumerate(pdf_reader.pages, 1):
+        for page_num, (page_text, image_text) in enumerate(self.ocr.extract_pages(pdf_reader.pages), 1):
             text += f"--- Page {page_num} ---\n"
-            text += page.extract_text() + "\n"
-            text += self._extract_images_from_page(page, page_num)
+            text += page_text + "\n"
+            text += image_text
         return text
 
-    def _extract_images_from_page(self, page, page_num):
-        image_text = ""
-        if '/XObject' in page['/Resources']:
-            xObject = page['/Resources']['/XObject'].get_object()
-            for obj in xObject:
-                if xObject[obj]['/Subtype'] == '/Image':
-                    try:
-                        image = xObject[obj]
-                        data = image.get_data()
-                        img = Image.open(io.BytesIO(data)).convert('RGB')
-                        img_np = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-                        result = self.reader.readtext(img_np)
-                        image_text += " ".join(detection[1] for detection in result) + "\n"
-                    except Exception as e:
-                        image_text += f"Error processing image on page {page_num}: {str(e)}\n"
-        return image_text
-
-    def _create_summary_prompt(self, document_text, summary_detail="concise"):
+    def _create_summary_prompt(self, summary_detail="concise", from_notes=False):
         detail_instruction = f"Provide a {summary_detail} summary addressing the above points."
+        # The document text stays a template variable, so braces in it are never parsed
+        document_label = (
+            "Notes taken from each part of the document, in page order:" if from_notes else "Input Document:"
+        )
         return PromptTemplate.from_template(f"""
         You are an expert legal document analyzer tasked with providing a comprehensive summary.
 
@@ -92,14 +102,25 @@ class LegalDocumentSummarizer:
         - Potential strategic considerations
         - Noteworthy legal nuances
 
-        Input Document:
-        {document_text}
+        {document_label}
+        {{document_text}}
 
         {detail_instruction}
         """)
 
-    def summarize_document(self, document_text, summary_detail="concise"):
-        prompt = self._create_summary_prompt(document_text, summary_detail)
+    def summarize_document(self, document_text, summary_detail="concise", on_chunk=None):
+        """
+        Stream a structured summary of the document.
+
+        Documents longer than SUMMARY_CHUNK_CHARS are summarized part by part first
+        and the final summary is written from those notes. ``on_chunk(done, total,
+        label, summary, cached)`` reports each part's notes as they arrive.
+        """
+        chunks = split_document(document_text, SUMMARY_CHUNK_CHARS)
+        from_notes = len(chunks) > 1
+        if from_notes:
+            document_text = self.chunk_summarizer.summarize(chunks, SUMMARY_CHUNK_CHARS, on_chunk)
+        prompt = self._create_summary_prompt(summary_detail, from_notes)
         output_parser = StrOutputParser()
         chain = LLMChain(
             llm=self.llm,
@@ -107,7 +128,7 @@ class LegalDocumentSummarizer:
             output_parser=output_parser,
             verbose=False
         )
-        return self.stream_response(chain, {"document_text": document_text})
+        yield from self.stream_response(chain, {"document_text": document_text})
 
     def stream_response(self, chain: LLMChain, inputs: Dict) -> Generator[str, None, None]:
         """Stream the response from the LLM chain"""
@@ -140,17 +161,32 @@ def main():
     try:
         with open(pdf_file_path, 'rb') as pdf_file:
             extracted_text = summarizer.extract_text_from_pdf(pdf_file)
+            ocr_run = summarizer.ocr.last_run
+            print(f"Extracted {len(ocr_run['pages'])} pages in {ocr_run['seconds']}s "
+                  f"({ocr_run['ocr_images']} of {ocr_run['images']} images OCRed, "
+                  f"OCR skipped on {ocr_run['skipped_pages']} text-heavy pages)")
             print("\nGenerating summary...\n")
             stream_printer = StreamPrinter(delay=0.01)
             summary = ""
-            for chunk in summarizer.summarize_document(extracted_text, summary_detail="concise"):
+
+            def report_part(done, total, label, part_summary, cached):
+                print(f"Summarized {label} ({done}/{total}){' from cache' if cached else ''}")
+
+            for chunk in summarizer.summarize_document(extracted_text, summary_detail="concise",
+                                                       on_chunk=report_part):
                 summary += chunk
                 stream_printer.print_stream(chunk)
             print("\nSummary generated successfully!\n")
+            if summarizer.chunk_summarizer.last_run:
+                run = summarizer.chunk_summarizer.last_run
+                print(f"Parts: {run['chunks']}, model calls: {run['calls']}, "
+                      f"from cache: {run['from_cache']}, map step: {run['seconds']}s")
     except FileNotFoundError:
         print(f"The file at {pdf_file_path} was not found.")
     except Exception as e:
         print(f"An error occurred: {e}")
+    finally:
+        summarizer.ocr.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
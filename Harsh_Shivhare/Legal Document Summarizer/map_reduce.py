@@ -0,0 +1,278 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.prompts import PromptTemplate
+from langchain.chains import LLMChain
+from langchain_core.output_parsers import StrOutputParser
+
+PAGE_MARKER = re.compile(r"^--- Page (\d+) ---[ \t]*$", re.MULTILINE)
+
+# Bump a version when its prompt changes, so old summaries stop being reused
+MAP_PROMPT_VERSION = "1"
+COLLAPSE_PROMPT_VERSION = "1"
+
+MAP_PROMPT = """
+You are an expert legal analyst reading one part ({label}) of a longer legal document.
+
+Extract every fact from this part that matters for a later summary of the whole document:
+- Document type, parties, jurisdiction, dates and deadlines
+- Key clauses, rights, obligations and non-standard terms
+- Amounts, payment terms and other financial obligations
+- Ambiguities, risks and likely points of dispute
+- Termination conditions, breach consequences, compliance requirements and penalties
+
+Be specific, quote defined terms and clause numbers where they appear, and note the page for each point.
+Skip sections that do not appear in this part. Do not write an introduction or a conclusion.
+
+Document part:
+{chunk_text}
+"""
+
+COLLAPSE_PROMPT = """
+You are an expert legal analyst. The notes below were taken from consecutive parts ({label}) of one legal document.
+
+Merge them into a single set of notes: keep every party, date, clause, amount, risk, termination and
+compliance point with its page reference, and remove repetition. Do not write an introduction or a conclusion.
+
+Notes:
+{chunk_text}
+"""
+
+ChunkCallback = Callable[[int, int, str, str, bool], None]
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def _hard_split(text: str, max_chars: int) -> List[str]:
+    """Split text longer than ``max_chars`` at whitespace."""
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        cut = cut if cut > max_chars // 2 else max_chars
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def _paragraphs(text: str, max_chars: int) -> List[str]:
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if paragraph.strip():
+            paragraphs.extend(_hard_split(paragraph.strip(), max_chars))
+    return paragraphs
+
+
+def split_document(document_text: str, max_chars: int = 12000) -> List[Tuple[str, str]]:
+    """
+    Split a document into ``(label, text)`` chunks of at most about ``max_chars``.
+
+    Text from ``extract_text_from_pdf`` is split at its ``--- Page N ---`` markers
+    and consecutive pages are packed together, so each chunk is labelled with its
+    page range. Pages that are too long on their own, and pasted text without page
+    markers, are split at paragraph breaks instead.
+    """
+    markers = list(PAGE_MARKER.finditer(document_text))
+    units = []  # (page number or None, text)
+    if markers:
+        preamble = document_text[:markers[0].start()].strip()
+        if preamble:
+            units.extend((None, paragraph) for paragraph in _paragraphs(preamble, max_chars))
+        for index, marker in enumerate(markers):
+            end = markers[index + 1].start() if index + 1 < len(markers) else len(document_text)
+            page = int(marker.group(1))
+            page_text = document_text[marker.start():end].strip()
+            if len(page_text) <= max_chars:
+                units.append((page, page_text))
+            else:
+                units.extend((page, paragraph) for paragraph in _paragraphs(page_text, max_chars))
+    else:
+        units = [(None, paragraph) for paragraph in _paragraphs(document_text, max_chars)]
+
+    chunks, current, current_pages, size = [], [], [], 0
+    for page, text in units:
+        if current and size + len(text) + 2 > max_chars:
+            chunks.append((current_pages, "\n\n".join(current)))
+            current, current_pages, size = [], [], 0
+        current.append(text)
+        size += len(text) + 2
+        if page is not None:
+            current_pages.append(page)
+    if current:
+        chunks.append((current_pages, "\n\n".join(current)))
+
+    labelled = []
+    for index, (pages, text) in enumerate(chunks, 1):
+        if pages and min(pages) != max(pages):
+            label = f"pages {min(pages)}-{max(pages)}"
+        elif pages:
+            label = f"page {pages[0]}"
+        else:
+            label = f"part {index} of {len(chunks)}"
+        labelled.append((label, text))
+    return labelled
+
+
+class RateLimiter:
+    """Spaces calls evenly so that no more than ``requests_per_minute`` start per minute."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SummaryCache:
+    """Chunk summaries persisted in SQLite, keyed by (model, prompt, chunk hash)."""
+
+    def __init__(self, path: str = "summary_cache.db"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_summaries (
+                    model TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, prompt, chunk_hash)
+                )
+            """)
+
+    def get(self, model: str, prompt: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM chunk_summaries WHERE model = ? AND prompt = ? AND chunk_hash = ?",
+                (model, prompt, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, model: str, prompt: str, key: str, summary: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_summaries VALUES (?, ?, ?, ?, ?)",
+                (model, prompt, key, summary, time.time())
+            )
+
+
+class ChunkSummarizer:
+    """
+    Map step of the map-reduce summary.
+
+    Chunks are summarized concurrently on ``max_workers`` threads, with request
+    starts spaced by a shared rate limiter and failed calls retried with backoff.
+    The map prompt doesn't depend on the requested detail level, so summarizing
+    the same document again at another level only repeats the final reduce call.
+    """
+
+    def __init__(self, llm, model_name: str, cache: Optional[SummaryCache] = None, max_workers: int = 4,
+                 requests_per_minute: float = 60, max_retries: int = 3):
+        self.model_name = model_name
+        self.cache = cache
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.chains = {
+            f"map-v{MAP_PROMPT_VERSION}": LLMChain(
+                llm=llm, prompt=PromptTemplate.from_template(MAP_PROMPT),
+                output_parser=StrOutputParser(), verbose=False
+            ),
+            f"collapse-v{COLLAPSE_PROMPT_VERSION}": LLMChain(
+                llm=llm, prompt=PromptTemplate.from_template(COLLAPSE_PROMPT),
+                output_parser=StrOutputParser(), verbose=False
+            ),
+        }
+        self.last_run: Dict = {}
+
+    def _summarize(self, prompt: str, label: str, text: str) -> Tuple[str, bool]:
+        key = chunk_hash(f"{label}\n{text}")
+        if self.cache:
+            cached = self.cache.get(self.model_name, prompt, key)
+            if cached is not None:
+                return cached, True
+
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            try:
+                summary = self.chains[prompt].invoke({"label": label, "chunk_text": text})["text"].strip()
+                break
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(2 ** attempt)
+
+        if self.cache:
+            self.cache.set(self.model_name, prompt, key, summary)
+        return summary, False
+
+    def _run(self, prompt: str, chunks: List[Tuple[str, str]], on_chunk: Optional[ChunkCallback]) -> List[str]:
+        summaries = [None] * len(chunks)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._summarize, prompt, label, text): index
+                for index, (label, text) in enumerate(chunks)
+            }
+            done = 0
+            for future in as_completed(futures):
+                index = futures[future]
+                summary, cached = future.result()
+                summaries[index] = f"[{chunks[index][0].capitalize()}]\n{summary}"
+                self.last_run["calls"] += 0 if cached else 1
+                self.last_run["from_cache"] += 1 if cached else 0
+                done += 1
+                if on_chunk:
+                    on_chunk(done, len(chunks), chunks[index][0], summary, cached)
+        return summaries
+
+    def summarize(self, chunks: List[Tuple[str, str]], max_chars: int = 12000,
+                  on_chunk: Optional[ChunkCallback] = None) -> str:
+        """
+        Summarize every chunk, then merge the summaries in groups until they fit in
+        ``max_chars``. Returns the notes in document order, ready for the reduce prompt.
+        ``on_chunk(done, total, label, summary, cached)`` is called as each summary arrives.
+        """
+        started = time.perf_counter()
+        self.last_run = {"chunks": len(chunks), "calls": 0, "from_cache": 0, "collapse_rounds": 0}
+        summaries = self._run(f"map-v{MAP_PROMPT_VERSION}", chunks, on_chunk)
+
+        while len(summaries) > 1 and sum(len(summary) + 2 for summary in summaries) > max_chars:
+            groups, group, size = [], [], 0
+            for summary in summaries:
+                if group and size + len(summary) + 2 > max_chars:
+                    groups.append(group)
+                    group, size = [], 0
+                group.append(summary)
+                size += len(summary) + 2
+            groups.append(group)
+            if len(groups) == len(summaries):
+                # Every summary is already as large as the budget; merging pairs is the best we can do
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+
+            collapse_chunks = []
+            for group in groups:
+                first = group[0].split("\n", 1)[0].strip("[]")
+                last = group[-1].split("\n", 1)[0].strip("[]")
+                label = first if first == last else f"{first} to {last}"
+                collapse_chunks.append((label, "\n\n".join(group)))
+            self.last_run["collapse_rounds"] += 1
+            summaries = self._run(f"collapse-v{COLLAPSE_PROMPT_VERSION}", collapse_chunks, on_chunk)
+
+        self.last_run["seconds"] = round(time.perf_counter() - started, 2)
+        return "\n\n".join(summaries)
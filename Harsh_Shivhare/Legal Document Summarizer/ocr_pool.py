@@ -0,0 +1,187 @@
+import hashlib
+import io
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# One reader per worker process, loaded once by the pool initializer
+_reader = None
+
+
+def _init_worker(languages: List[str], gpu: bool):
+    global _reader
+    import easyocr
+    _reader = easyocr.Reader(languages, gpu=gpu)
+
+
+def _ocr_image(data: bytes, max_side: int) -> Tuple[str, float]:
+    """OCR one image in a worker; returns (text, seconds)."""
+    started = time.perf_counter()
+    img = Image.open(io.BytesIO(data))
+    # JPEGs can be decoded straight at a reduced scale
+    img.draft('RGB', (max_side, max_side))
+    img = img.convert('RGB')
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+    img_np = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    result = _reader.readtext(img_np)
+    return " ".join(detection[1] for detection in result), time.perf_counter() - started
+
+
+def page_images(page) -> Iterator[bytes]:
+    """Raw data of every image embedded in a PDF page."""
+    if '/XObject' not in page['/Resources']:
+        return
+    xObject = page['/Resources']['/XObject'].get_object()
+    for obj in xObject:
+        if xObject[obj]['/Subtype'] == '/Image':
+            yield xObject[obj].get_data()
+
+
+class OCRPool:
+    """
+    Text extraction for PDF pages, with OCR of embedded images in worker processes.
+
+    Each of the ``workers`` processes loads one EasyOCR reader when the pool starts
+    and keeps it for every document after that, so OCR runs in parallel instead
+    of contending for the GIL. Pages whose text layer already has at least
+    ``dense_text_chars`` characters are not OCRed. Identical images (logos,
+    signatures, stamps) are OCRed once and their text reused, including across
+    documents for the last ``cache_size`` images. Images larger than
+    ``max_image_side`` pixels are scaled down before OCR.
+    """
+
+    def __init__(self, languages: Optional[List[str]] = None, workers: int = 2, gpu: bool = False,
+                 dense_text_chars: int = 1000, max_image_side: int = 2000, cache_size: int = 1024):
+        self.languages = languages or ['en']
+        self.workers = workers
+        self.gpu = gpu
+        self.dense_text_chars = dense_text_chars
+        self.max_image_side = max_image_side
+        self.cache_size = cache_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+        self.last_run: Dict = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned rather than forked, so workers don't inherit torch state from this process
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.languages, self.gpu)
+                )
+            return self._executor
+
+    def _remember(self, key: str, text: str):
+        with self._lock:
+            self._texts[key] = text
+            self._texts.move_to_end(key)
+            while len(self._texts) > self.cache_size:
+                self._texts.popitem(last=False)
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._texts:
+                self._texts.move_to_end(key)
+                return self._texts[key]
+        return None
+
+    def extract_pages(self, pages) -> List[Tuple[str, str]]:
+        """
+        ``(text layer, OCR text)`` for each page, in order. Per-page timings and
+        counts are left in ``last_run["pages"]``.
+        """
+        started = time.perf_counter()
+        page_stats, text_layers, page_keys = [], [], []
+        pending: Dict[str, object] = {}
+        first_page: Dict[str, int] = {}
+        texts: Dict[str, str] = {}
+
+        for page_num, page in enumerate(pages, 1):
+            text_started = time.perf_counter()
+            text_layer = page.extract_text() or ""
+            stats = {
+                "page": page_num,
+                "text_chars": len(text_layer.strip()),
+                "text_seconds": round(time.perf_counter() - text_started, 3),
+                "images": 0,
+                "ocr_images": 0,
+                "duplicate_images": 0,
+                "ocr_seconds": 0.0,
+                "skipped": len(text_layer.strip()) >= self.dense_text_chars,
+            }
+            keys = []
+            if not stats["skipped"]:
+                try:
+                    images = list(page_images(page))
+                except Exception as e:
+                    images = []
+                    texts[f"page-{page_num}"] = f"Error processing image on page {page_num}: {str(e)}"
+                    keys.append(f"page-{page_num}")
+                for data in images:
+                    stats["images"] += 1
+                    key = hashlib.sha256(data).hexdigest()
+                    keys.append(key)
+                    if key not in texts and key not in first_page:
+                        cached = self._cached(key)
+                        if cached is not None:
+                            texts[key] = cached
+                    if key in texts or key in first_page:
+                        stats["duplicate_images"] += 1
+                        continue
+                    first_page[key] = page_num
+                    stats["ocr_images"] += 1
+                    try:
+                        pending[key] = self._pool().submit(_ocr_image, data, self.max_image_side)
+                    except BrokenProcessPool as e:
+                        self._executor = None
+                        texts[key] = f"Error processing image on page {page_num}: {str(e)}"
+            page_stats.append(stats)
+            text_layers.append(text_layer)
+            page_keys.append(keys)
+
+        for key, future in pending.items():
+            page_num = first_page[key]
+            try:
+                text, seconds = future.result()
+                texts[key] = text
+                self._remember(key, text)
+                page_stats[page_num - 1]["ocr_seconds"] += seconds
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._executor = None
+                texts[key] = f"Error processing image on page {page_num}: {str(e)}"
+
+        results = []
+        for text_layer, keys, stats in zip(text_layers, page_keys, page_stats):
+            stats["ocr_seconds"] = round(stats["ocr_seconds"], 3)
+            image_text = "".join(texts.get(key, "") + "\n" for key in keys)
+            results.append((text_layer, image_text))
+
+        self.last_run = {
+            "pages": page_stats,
+            "skipped_pages": sum(stats["skipped"] for stats in page_stats),
+            "images": sum(stats["images"] for stats in page_stats),
+            "ocr_images": len(pending),
+            "workers": self.workers,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        return results
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -1,17 +1,26 @@
 import os
-import io
-import cv2
-import numpy as np
 import streamlit as st
 import PyPDF2
-from PIL import Image
-import easyocr
 from dotenv import load_dotenv
 from langchain_google_genai import GoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from langchain_core.output_parsers import StrOutputParser
-from concurrent.futures import ThreadPoolExecutor
+
+from map_reduce import ChunkSummarizer, SummaryCache, split_document
+from ocr_pool import OCRPool
+
+MODEL_NAME = 'gemini-pro'
+# Documents longer than this are summarized part by part before the final summary
+SUMMARY_CHUNK_CHARS = int(os.getenv('SUMMARY_CHUNK_CHARS', '12000'))
+SUMMARY_MAX_WORKERS = int(os.getenv('SUMMARY_MAX_WORKERS', '4'))
+SUMMARY_REQUESTS_PER_MINUTE = float(os.getenv('SUMMARY_REQUESTS_PER_MINUTE', '60'))
+SUMMARY_CACHE_PATH = os.getenv('SUMMARY_CACHE_PATH', 'summary_cache.db')
+# OCR worker processes, each holding its own EasyOCR reader
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Pages with at least this much extractable text are not OCRed
+OCR_DENSE_TEXT_CHARS = int(os.getenv('OCR_DENSE_TEXT_CHARS', '1000'))
+OCR_MAX_IMAGE_SIDE = int(os.getenv('OCR_MAX_IMAGE_SIDE', '2000'))
 
 class LegalDocumentSummarizer:
     """
@@ -26,71 +35,58 @@ class LegalDocumentSummarizer:
         """
         load_dotenv()
         self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
-        self.reader = easyocr.Reader(['en'], gpu=False)  # Use CPU for broader compatibility
+        self.ocr = OCRPool(
+            ['en'],
+            workers=OCR_WORKERS,
+            gpu=False,  # Use CPU for broader compatibility
+            dense_text_chars=OCR_DENSE_TEXT_CHARS,
+            max_image_side=OCR_MAX_IMAGE_SIDE
+        )
         self.llm = GoogleGenerativeAI(
-            model='gemini-pro', 
+            model=MODEL_NAME, 
             temperature=0.7, 
             api_key=self.api_key
         )
+        self.chunk_summarizer = ChunkSummarizer(
+            self.llm,
+            MODEL_NAME,
+            cache=SummaryCache(SUMMARY_CACHE_PATH),
+            max_workers=SUMMARY_MAX_WORKERS,
+            requests_per_minute=SUMMARY_REQUESTS_PER_MINUTE
+        )
 
     def extract_text_from_pdf(self, pdf_file):
         """
         Extract text from a PDF file, including OCR for images.
 
+        Per-page timings are left in ``self.ocr.last_run``.
+
         :param pdf_file: Uploaded PDF file object
         :return: Extracted text from the PDF
         """
         pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text_pages = []
-
-        def process_page(page_num, page):
-            page_text = f"--- Page {page_num} ---\n"
-            page_text += page.extract_text() or ""
-            page_text += self._extract_images_from_page(page, page_num)
-            return page_text
-
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            results = executor.map(lambda p: process_page(*p), enumerate(pdf_reader.pages, 1))
-
-        text_pages.extend(results)
+        text_pages = [
+            f"--- Page {page_num} ---\n{page_text}{image_text}"
+            for page_num, (page_text, image_text) in enumerate(self.ocr.extract_pages(pdf_reader.pages), 1)
+        ]
         return "\n".join(text_pages)
 
-    def _extract_images_from_page(self, page, page_num):
+    def summarize_document(self, document_text, on_chunk=None):
         """
-        Extract text from images on a PDF page using OCR.
-
-        :param page: PDF page object
-        :param page_num: Page number for error logging
-        :return: Extracted text from images
-        """
-        image_text = ""
-
-        if '/XObject' in page['/Resources']:
-            xObject = page['/Resources']['/XObject'].get_object()
+        Stream a summary of the legal document.
 
-            for obj in xObject:
-                if xObject[obj]['/Subtype'] == '/Image':
-                    try:
-                        image = xObject[obj]
-                        data = image.get_data()
-                        img = Image.open(io.BytesIO(data)).convert('RGB')
-                        img_np = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-
-                        result = self.reader.readtext(img_np)
-                        image_text += " ".join(detection[1] for detection in result) + "\n"
-                    except Exception as e:
-                        image_text += f"Error processing image on page {page_num}: {str(e)}\n"
-
-        return image_text
-
-    def summarize_document(self, document_text):
-        """
-        Generate a summary of the legal document.
+        Documents longer than SUMMARY_CHUNK_CHARS are summarized part by part
+        first, and the final summary is written from those notes.
 
         :param document_text: Text of the document to summarize
-        :return: Formatted summary
+        :param on_chunk: Optional callback ``(done, total, label, summary, cached)`` for each part
+        :return: Generator of summary text as it is produced
         """
-        prompt = self._create_summary_prompt(document_text)
+        chunks = split_document(document_text, SUMMARY_CHUNK_CHARS)
+        from_notes = len(chunks) > 1
+        if from_notes:
+            document_text = self.chunk_summarizer.summarize(chunks, SUMMARY_CHUNK_CHARS, on_chunk)
+        prompt = self._create_summary_prompt(from_notes)
         output_parser = StrOutputParser()
 
         chain = LLMChain(
@@ -100,19 +96,20 @@ class LegalDocumentSummarizer:
             verbose=False
         )
 
-        try:
-            summary = chain.invoke(input={"document_text": document_text})
-            return self._format_summary(summary.get('text', ''))
-        except Exception as e:
-            return f"Error generating summary: {str(e)}"
+        for chunk in chain.stream({"document_text": document_text}):
+            if chunk.get('text'):
+                yield chunk['text']
 
-    def _create_summary_prompt(self, document_text):
+    def _create_summary_prompt(self, from_notes=False):
         """
         Create a structured prompt for document summarization.
 
-        :param document_text: Text to be summarized
+        :param from_notes: Whether the input is notes on each part rather than the document itself
         :return: Formatted prompt template
         """
+        document_label = (
+            "Notes taken from each part of the document, in page order:" if from_notes else "Input Document:"
+        )
         return PromptTemplate.from_template("""
         You are an expert legal document analyzer tasked with providing a comprehensive summary.
 
@@ -149,11 +146,11 @@ class LegalDocumentSummarizer:
         - Potential strategic considerations
         - Noteworthy legal nuances
 
-        Input Document:
+        {document_label}
         {document_text}
 
         Provide a structured, concise summary addressing the above points.
-        """)
+        """).partial(document_label=document_label)
 
     @staticmethod
     def _format_summary(text):
@@ -166,6 +163,43 @@ class LegalDocumentSummarizer:
         paragraphs = text.split('\n')
         return "\n\n".join(paragraph.strip() for paragraph in paragraphs if paragraph.strip())
 
+def render_summary(summarizer, document_text):
+    """
+    Summarize a document, showing each part's notes as they arrive and
+    streaming the final summary into the page.
+    """
+    progress = st.progress(0.0, text="Splitting document...")
+    notes = st.expander("Notes on each part", expanded=False)
+
+    def show_part(done, total, label, part_summary, cached):
+        progress.progress(done / total, text=f"Summarized {label} ({done}/{total})")
+        with notes:
+            st.markdown(f"**{label.capitalize()}**{' (cached)' if cached else ''}")
+            st.write(part_summary)
+
+    st.subheader("Summary:")
+    placeholder = st.empty()
+    summary = ""
+    try:
+        for chunk in summarizer.summarize_document(document_text, on_chunk=show_part):
+            progress.progress(1.0, text="Writing summary...")
+            summary += chunk
+            placeholder.markdown(summary)
+    except Exception as e:
+        progress.empty()
+        st.error(f"Error generating summary: {str(e)}")
+        return
+    progress.empty()
+    placeholder.markdown(summarizer._format_summary(summary))
+    st.success("Summary Generated Successfully!")
+
+
+@st.cache_resource
+def get_summarizer():
+    """One summarizer per server, so the OCR worker pool survives reruns."""
+    return LegalDocumentSummarizer()
+
+
 def main():
     """
     Streamlit application for legal document summarization.
@@ -173,7 +207,7 @@ def main():
     st.title("Legal Document Summarizer")
     st.write("Upload a PDF or paste a legal document text, and get a concise summary!")
 
-    summarizer = LegalDocumentSummarizer()
+    summarizer = get_summarizer()
 
     tab1, tab2 = st.tabs(["Upload PDF", "Paste Text"])
 
@@ -185,13 +219,15 @@ def main():
                 try:
                     extracted_text = summarizer.extract_text_from_pdf(uploaded_pdf)
                     st.text_area("Extracted Text", value=extracted_text, height=200)
+                    ocr_run = summarizer.ocr.last_run
+                    with st.expander(
+                        f"Extraction: {ocr_run['seconds']}s, {ocr_run['ocr_images']} of "
+                        f"{ocr_run['images']} images OCRed, OCR skipped on {ocr_run['skipped_pages']} text-heavy pages"
+                    ):
+                        st.dataframe(ocr_run['pages'])
 
                     if st.button("Summarize PDF Document"):
-                        with st.spinner("Summarizing..."):
-                            summary = summarizer.summarize_document(extracted_text)
-                            st.success("Summary Generated Successfully!")
-                            st.subheader("Summary:")
-                            st.write(summary)
+                        render_summary(summarizer, extracted_text)
 
                 except Exception as e:
                     st.error(f"Error extracting text from PDF: {e}")
@@ -201,11 +237,7 @@ def main():
 
         if st.button("Summarize Text Document"):
             if document_text.strip():
-                with st.spinner("Summarizing..."):
-                    summary = summarizer.summarize_document(document_text)
-                    st.success("Summary Generated Successfully!")
-                    st.subheader("Summary:")
-                    st.write(summary)
+                render_summary(summarizer, document_text)
             else:
                 st.warning("Please enter the text of the legal document to summarize.")
 
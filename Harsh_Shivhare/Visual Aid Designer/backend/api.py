@@ -1,45 +1,130 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from diagram_generator import generate_mermaid_code
-from mermaid_renderer import MermaidRenderer
-import tempfile
+from diagram_generator import generate_mermaid_code, prompt_version
+from mermaid_renderer import MermaidRenderer, RENDER_VERSION
+from diagram_cache import DiagramCache
 import os
-from fastapi.responses import FileResponse
-from typing import Optional
+from fastapi.responses import Response
+import asyncio
 
 app = FastAPI(title="Visual Aid Designer API")
 renderer = MermaidRenderer()
+diagram_cache = DiagramCache(
+    os.getenv("DIAGRAM_CACHE_PATH", "diagram_cache.db"),
+    max_codes=int(os.getenv("DIAGRAM_CODE_CACHE_SIZE", "1000")),
+    max_bytes=int(os.getenv("DIAGRAM_RENDER_CACHE_MB", "256")) * 1024 * 1024,
+    render_version=RENDER_VERSION
+)
+
+MEDIA_TYPES = {"svg": "image/svg+xml", "png": "image/png"}
+
+@app.on_event("startup")
+async def warm_renderer():
+    # Launch the browser sessions now instead of on the first requests
+    try:
+        await asyncio.to_thread(renderer.start)
+    except Exception as e:
+        print(f"Renderer warm-up failed: {str(e)}")
+
+@app.on_event("shutdown")
+async def close_renderer():
+    await asyncio.to_thread(renderer.close)
 
 class DiagramRequest(BaseModel):
     prompt: str
     diagram_type: str
 
+class RenderRequest(BaseModel):
+    mermaid_code: str
+
 class DiagramResponse(BaseModel):
     mermaid_code: str
-    image_path: Optional[str]
+    diagram_id: str
+    image_url: str
+    svg_url: str
+    png_url: str
     preview: str
+    cached: bool
+
+async def rendered_diagram(diagram_id, mermaid_code, fmt):
+    """Rendered file from the cache, rendering and storing it on a miss."""
+    data = await asyncio.to_thread(diagram_cache.get_render, diagram_id, fmt)
+    if data is None:
+        try:
+            data = await asyncio.to_thread(renderer.render, mermaid_code, fmt)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to render diagram: {str(e)}")
+        await asyncio.to_thread(diagram_cache.set_render, diagram_id, fmt, data)
+    return data
+
+async def diagram_response(mermaid_code, cached):
+    diagram_id = await asyncio.to_thread(diagram_cache.remember_source, mermaid_code)
+    # SVG is the default output; a PNG is only rendered when its URL is requested
+    await rendered_diagram(diagram_id, mermaid_code, "svg")
+    return DiagramResponse(
+        mermaid_code=mermaid_code,
+        diagram_id=diagram_id,
+        image_url=f"/diagrams/{diagram_id}.svg",
+        svg_url=f"/diagrams/{diagram_id}.svg",
+        png_url=f"/diagrams/{diagram_id}.png",
+        preview=f"```mermaid\n{mermaid_code}\n```",
+        cached=cached
+    )
 
 @app.post("/generate-diagram", response_model=DiagramResponse)
 async def generate_diagram(request: DiagramRequest):
     try:
-        mermaid_code = generate_mermaid_code(request.diagram_type, request.prompt)
-        
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-            output_path = temp_file.name
-        
-        success = renderer.render_diagram(mermaid_code, output_path)
-        
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to render diagram")
-        
-        return DiagramResponse(
-            mermaid_code=mermaid_code,
-            image_path=output_path,
-            preview=f"```mermaid\n{mermaid_code}\n```"
+        version = prompt_version(request.diagram_type)
+        mermaid_code = await asyncio.to_thread(
+            diagram_cache.get_code, request.diagram_type, request.prompt, version
         )
+        cached = mermaid_code is not None
+        if not cached:
+            mermaid_code = await asyncio.to_thread(generate_mermaid_code, request.diagram_type, request.prompt)
+
+        response = await diagram_response(mermaid_code, cached)
+        if not cached:
+            # Only code that rendered is cached, so invalid Mermaid is regenerated on the next request
+            await asyncio.to_thread(
+                diagram_cache.set_code, request.diagram_type, request.prompt, version, mermaid_code
+            )
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/render-diagram", response_model=DiagramResponse)
+async def render_diagram(request: RenderRequest):
+    """Render edited Mermaid code; unchanged code is served from the cache."""
+    if not request.mermaid_code.strip():
+        raise HTTPException(status_code=400, detail="mermaid_code is empty")
+    return await diagram_response(request.mermaid_code.strip(), cached=False)
+
+@app.get("/diagrams/{diagram_id}.{fmt}")
+async def get_diagram(diagram_id: str, fmt: str):
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}'. Use one of: {', '.join(MEDIA_TYPES)}")
+    data = await asyncio.to_thread(diagram_cache.get_render, diagram_id, fmt)
+    if data is None:
+        mermaid_code = await asyncio.to_thread(diagram_cache.get_source, diagram_id)
+        if mermaid_code is None:
+            raise HTTPException(status_code=404, detail="Diagram not found")
+        data = await rendered_diagram(diagram_id, mermaid_code, fmt)
+    return Response(
+        content=data,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return diagram_cache.stats()
+
+@app.get("/renderer/metrics")
+async def get_renderer_metrics():
+    return renderer.metrics()
+
 @app.get("/diagram-types")
 async def get_diagram_types():
     return [
@@ -0,0 +1,173 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace and case so trivially different prompts share an entry."""
+    return " ".join(prompt.split()).casefold()
+
+
+def code_hash(mermaid_code, render_version=""):
+    """Id of a diagram: a hash of its Mermaid code and the renderer setup that draws it."""
+    key = f"{render_version}\n{mermaid_code.strip()}" if render_version else mermaid_code.strip()
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class DiagramCache:
+    """
+    Two-level diagram cache persisted in SQLite.
+
+    Level one maps (diagram type, normalized prompt) to the generated Mermaid
+    code; level two maps a code hash and format (svg/png) to the rendered file.
+    Both levels evict the least recently used rows: level one past
+    ``max_codes`` entries, level two past ``max_bytes`` of rendered output.
+    Diagram ids include ``render_version``, so changing it retires old renders.
+    """
+
+    def __init__(self, path="diagram_cache.db", max_codes=1000, max_bytes=256 * 1024 * 1024, render_version=""):
+        self.max_codes = max_codes
+        self.render_version = render_version
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._misses = Counter()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS mermaid_codes (
+                    diagram_type TEXT NOT NULL,
+                    prompt_key TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    code TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (diagram_type, prompt_key)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rendered_diagrams (
+                    code_hash TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (code_hash, format)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS diagram_sources (
+                    code_hash TEXT PRIMARY KEY,
+                    code TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+
+    def get_code(self, diagram_type, prompt, version):
+        """Cached Mermaid code for a prompt, or None if missing or generated by an older prompt."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT code FROM mermaid_codes WHERE diagram_type = ? AND prompt_key = ? AND version = ?",
+                (diagram_type, normalize_prompt(prompt), version)
+            ).fetchone()
+            if row:
+                self._hits["code"] += 1
+                self._conn.execute(
+                    "UPDATE mermaid_codes SET last_used = ? WHERE diagram_type = ? AND prompt_key = ?",
+                    (time.time(), diagram_type, normalize_prompt(prompt))
+                )
+            else:
+                self._misses["code"] += 1
+        return row[0] if row else None
+
+    def set_code(self, diagram_type, prompt, version, mermaid_code):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mermaid_codes VALUES (?, ?, ?, ?, ?)",
+                (diagram_type, normalize_prompt(prompt), version, mermaid_code, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM mermaid_codes WHERE rowid IN ("
+                "SELECT rowid FROM mermaid_codes ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_codes,)
+            )
+
+    def remember_source(self, mermaid_code):
+        """Keep the code behind a diagram id so evicted renders can be redrawn on request."""
+        diagram_id = code_hash(mermaid_code, self.render_version)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO diagram_sources VALUES (?, ?, ?)",
+                (diagram_id, mermaid_code.strip(), time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM diagram_sources WHERE rowid IN ("
+                "SELECT rowid FROM diagram_sources ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_codes,)
+            )
+        return diagram_id
+
+    def get_source(self, diagram_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT code FROM diagram_sources WHERE code_hash = ?", (diagram_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_render(self, diagram_id, fmt):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data FROM rendered_diagrams WHERE code_hash = ? AND format = ?",
+                (diagram_id, fmt)
+            ).fetchone()
+            if row:
+                self._hits["render"] += 1
+                self._conn.execute(
+                    "UPDATE rendered_diagrams SET last_used = ? WHERE code_hash = ? AND format = ?",
+                    (time.time(), diagram_id, fmt)
+                )
+            else:
+                self._misses["render"] += 1
+        return bytes(row[0]) if row else None
+
+    def set_render(self, diagram_id, fmt, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rendered_diagrams VALUES (?, ?, ?, ?, ?)",
+                (diagram_id, fmt, sqlite3.Binary(data), len(data), time.time())
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM rendered_diagrams").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk from the least recently used row until enough space is freed
+                evict = []
+                for rowid, size in self._conn.execute(
+                    "SELECT rowid, size FROM rendered_diagrams ORDER BY last_used"
+                ):
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((rowid,))
+                    total -= size
+                self._conn.executemany("DELETE FROM rendered_diagrams WHERE rowid = ?", evict)
+
+    def stats(self):
+        """Hits, misses and hit rate per level since startup, plus what is stored."""
+        with self._lock:
+            codes = self._conn.execute("SELECT COUNT(*) FROM mermaid_codes").fetchone()[0]
+            renders, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM rendered_diagrams"
+            ).fetchone()
+            stats = {}
+            for level, entries in (("code", codes), ("render", renders)):
+                hits, misses = self._hits[level], self._misses[level]
+                stats[level] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                    "entries": entries
+                }
+            stats["render"]["bytes"] = size
+        return stats
+
@@ -6,6 +6,8 @@ from langchain_core.prompts import PromptTemplate
 import warnings
 warnings.filterwarnings("ignore")
 import re
+import hashlib
+import threading
 
 # Load environment variables
 load_dotenv()
@@ -14,7 +16,12 @@ if not api_key:
     raise ValueError("GOOGLE_API_KEY not found in environment variables")
 
 # Initialize Gemini model
-llm = GoogleGenerativeAI(model='gemini-pro', temperature=0.7, google_api_key=api_key)
+MODEL_NAME = 'gemini-pro'
+llm = GoogleGenerativeAI(model=MODEL_NAME, temperature=0.7, google_api_key=api_key)
+
+# One chain per diagram type, built on first use and reused afterwards
+_chains = {}
+_chains_lock = threading.Lock()
 
 def get_diagram_prompt(diagram_type):
     """
@@ -523,15 +530,26 @@ def clean_mermaid_response(response):
     cleaned = re.sub(r'\n\s*\n', '\n\n', cleaned)
     return cleaned
 
+def get_chain(diagram_type):
+    with _chains_lock:
+        chain = _chains.get(diagram_type)
+        if chain is None:
+            template = get_diagram_prompt(diagram_type)
+            # Convert all single braces to doubles except for the placeholder
+            template = template.replace("{", "{{").replace("}", "}}").replace("{{user_input}}", "{user_input}")
+
+            prompt = PromptTemplate(template=template, input_variables=["user_input"])
+            chain = _chains[diagram_type] = LLMChain(prompt=prompt, llm=llm)
+        return chain
+
+def prompt_version(diagram_type):
+    """Changes whenever the model or the diagram type's prompt changes."""
+    source = f"{MODEL_NAME}\n{get_diagram_prompt(diagram_type)}"
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
 def generate_mermaid_code(diagram_type, user_input):
     try:
-        template = get_diagram_prompt(diagram_type)
-        # Convert all single braces to doubles except for the placeholder
-        template = template.replace("{", "{{").replace("}", "}}").replace("{{user_input}}", "{user_input}")
-        
-        prompt = PromptTemplate(template=template, input_variables=["user_input"])
-        chain = LLMChain(prompt=prompt, llm=llm)
-        result = chain.run(user_input=user_input)
+        result = get_chain(diagram_type).run(user_input=user_input)
         
         # Clean response
         result = result.strip()
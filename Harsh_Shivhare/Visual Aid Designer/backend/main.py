@@ -55,6 +55,7 @@ def main():
     renderer = MermaidRenderer()
     output_path = f"{selected_diagram_type}_diagram.png"
     success = renderer.render_diagram(mermaid_code, output_path)
+    renderer.close()
 
     if success:
         print(f"\nDiagram successfully generated at: {output_path}")
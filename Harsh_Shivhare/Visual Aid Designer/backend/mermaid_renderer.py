@@ -1,72 +1,121 @@
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from collections import deque
+from contextlib import contextmanager
 from tempfile import NamedTemporaryFile
-from PIL import Image
 import os
+import queue
+import threading
 import time
 
-class MermaidRenderer:
-    def get_html_template(self, mermaid_code):
-        return f"""
+# Part of every diagram id, so renders made with an older page setup are never served again
+RENDER_VERSION = "mermaid-9.3.0-strict"
+
+# Loaded once per browser session; diagrams are rendered into it through renderDiagram().
+# Sessions are shared by all requests and render client-supplied code, so labels are
+# sanitized and click callbacks are disabled ('strict').
+PAGE_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
     <script src="https://cdn.jsdelivr.net/npm/mermaid@9.3.0/dist/mermaid.min.js"></script>
     <script>
-        window.onload = function() {{
-            mermaid.initialize({{
-                startOnLoad: true,
+        var renderCount = 0;
+        window.mermaidReady = false;
+        window.onload = function() {
+            mermaid.initialize({
+                startOnLoad: false,
                 theme: 'default',
-                securityLevel: 'loose',
-                themeVariables: {{
+                securityLevel: 'strict',
+                themeVariables: {
                     primaryColor: '#ffffff',
                     primaryTextColor: '#000000',
                     primaryBorderColor: '#000000',
                     lineColor: '#000000',
                     secondaryColor: '#e0e0e0',
                     tertiaryColor: '#f5f5f5'
-                }},
-                flowchart: {{ 
+                },
+                flowchart: {
                     curve: 'basis',
                     padding: 20,
                     htmlLabels: true
-                }},
-                sequence: {{ 
+                },
+                sequence: {
                     useMaxWidth: false,
                     width: 1200,
                     height: 800
-                }}
-            }});
-        }}
+                }
+            });
+            window.mermaidReady = true;
+        };
+
+        // Calls done({svg, width, height}) once the diagram is in the page, or done({error})
+        function renderDiagram(code, done) {
+            var id = 'diagram' + (renderCount++);
+            var container = document.getElementById('diagram');
+            try {
+                mermaid.render(id, code, function(svg) {
+                    container.innerHTML = svg;
+                    var box = container.getBoundingClientRect();
+                    done({svg: svg, width: Math.ceil(box.width), height: Math.ceil(box.height)});
+                });
+            } catch (e) {
+                container.innerHTML = '';
+                done({error: String(e && e.message || e)});
+            } finally {
+                // Mermaid leaves its scratch element behind when parsing fails
+                var scratch = document.getElementById('d' + id);
+                if (scratch) scratch.remove();
+            }
+        }
     </script>
     <style>
-        body {{ 
-            margin: 0; 
-            padding: 20px; 
-            background: white; 
-        }}
-        #diagram {{
+        body {
+            margin: 0;
+            padding: 20px;
+            background: white;
+        }
+        #diagram {
+            display: inline-block;
             background: white;
             padding: 20px;
             min-width: 800px;
             max-width: 4000px;
-        }}
+        }
     </style>
 </head>
 <body>
-    <div id="diagram">
-        <pre class="mermaid">
-{mermaid_code}
-        </pre>
-    </div>
+    <div id="diagram"></div>
 </body>
 </html>"""
 
+RENDER_SCRIPT = "renderDiagram(arguments[0], arguments[arguments.length - 1]);"
+
+
+class MermaidRenderer:
+    """
+    Renders Mermaid code with a pool of long-lived headless Chrome sessions.
+
+    Each session keeps the Mermaid page loaded, so a render is a single script
+    call that returns the SVG as soon as Mermaid has drawn it. PNG output is a
+    screenshot of the diagram element, taken only when a PNG is asked for.
+    """
+
+    def __init__(self, pool_size=None, render_timeout=None):
+        self.pool_size = pool_size or int(os.getenv("MERMAID_POOL_SIZE", "2"))
+        self.render_timeout = render_timeout or float(os.getenv("MERMAID_RENDER_TIMEOUT", "15"))
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self._page_path = None
+        self._latencies = deque(maxlen=500)
+        self._counts = {"renders": 0, "failures": 0, "browser_launches": 0, "browser_restarts": 0}
+
     def setup_chrome_driver(self):
         chrome_options = Options()
         chrome_options.add_argument("--headless")
@@ -75,70 +124,168 @@ class MermaidRenderer:
         chrome_options.add_argument("--force-device-scale-factor=1")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
-        
+
         # Use system-installed ChromeDriver
-        service = Service('/usr/bin/chromedriver')
+        service = Service(os.getenv("CHROMEDRIVER_PATH", "/usr/bin/chromedriver"))
         return webdriver.Chrome(service=service, options=chrome_options)
 
-    def render_diagram(self, mermaid_code, output_path):
-        driver = None
-        temp_file_path = None
+    def _page_url(self):
+        with self._lock:
+            if self._page_path is None:
+                with NamedTemporaryFile(delete=False, suffix=".html", mode="w", encoding="utf-8") as page:
+                    page.write(PAGE_TEMPLATE)
+                    self._page_path = page.name
+            return f"file://{self._page_path}"
 
+    def _launch(self):
+        driver = self.setup_chrome_driver()
         try:
-            # Clean up the mermaid code
-            mermaid_code = mermaid_code.strip()
-            
-            # Create HTML file with the template
-            html_content = self.get_html_template(mermaid_code)
-            
-            with NamedTemporaryFile(delete=False, suffix=".html", mode="w", encoding="utf-8") as temp_file:
-                temp_file.write(html_content)
-                temp_file_path = temp_file.name
-
-            # Setup and start Chrome
-            driver = self.setup_chrome_driver()
-            driver.get(f"file://{temp_file_path}")
-
-            # Wait for rendering
-            time.sleep(2)  # Give time for JavaScript to execute
-            
+            driver.get(self._page_url())
+            WebDriverWait(driver, self.render_timeout).until(
+                lambda d: d.execute_script("return window.mermaidReady === true;")
+            )
+            driver.set_script_timeout(self.render_timeout)
+        except Exception:
+            driver.quit()
+            raise
+        with self._lock:
+            self._counts["browser_launches"] += 1
+        return driver
+
+    def start(self):
+        """Launch every session up front so the first requests don't pay for it."""
+        while True:
+            with self._lock:
+                if self._sessions >= self.pool_size:
+                    return
+                self._sessions += 1
             try:
-                # Wait for SVG to be present
-                wait = WebDriverWait(driver, 10)
-                svg = wait.until(EC.presence_of_element_located((By.TAG_NAME, "svg")))
-                
-                if not svg:
-                    raise Exception("No SVG element found - diagram may have failed to render")
-
-                # Get dimensions
-                width = max(svg.size['width'], 800)
-                height = max(svg.size['height'], 400)
-
-                # Set window size to match content
-                driver.set_window_size(width + 100, height + 100)
-                
-                # Take screenshot
-                driver.save_screenshot(output_path)
-
-                # Process the image
-                img = Image.open(output_path)
-                img = img.crop((20, 20, width + 60, height + 60))  # Crop with padding
-                img.save(output_path, quality=95, optimize=True)
-
-                return True
-            
-            except Exception as e:
-                print(f"SVG Error: {str(e)}")
-                # Take a screenshot of the error state for debugging
-                driver.save_screenshot(output_path)
-                return False
+                self._idle.put(self._launch())
+            except Exception:
+                with self._lock:
+                    self._sessions -= 1
+                raise
+
+    @contextmanager
+    def session(self):
+        """Borrow a browser, launching one if the pool isn't full yet."""
+        driver = None
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_launch = self._sessions < self.pool_size
+                if can_launch:
+                    self._sessions += 1
+            if can_launch:
+                try:
+                    driver = self._launch()
+                except Exception:
+                    with self._lock:
+                        self._sessions -= 1
+                    raise
+            else:
+                driver = self._idle.get()
+
+        try:
+            yield driver
+        except WebDriverException:
+            # The browser itself misbehaved; replace it rather than hand it out again
+            driver.quit()
+            with self._lock:
+                self._sessions -= 1
+                self._counts["browser_restarts"] += 1
+            driver = None
+            raise
+        finally:
+            if driver is not None:
+                self._idle.put(driver)
+
+    def _render(self, driver, mermaid_code):
+        result = driver.execute_async_script(RENDER_SCRIPT, mermaid_code)
+        if result.get("error"):
+            raise ValueError(f"Invalid Mermaid code: {result['error']}")
+        return result
+
+    def _timed(self, render):
+        started = time.perf_counter()
+        try:
+            result = render()
+        except Exception:
+            with self._lock:
+                self._counts["failures"] += 1
+            raise
+        with self._lock:
+            self._counts["renders"] += 1
+            self._latencies.append(time.perf_counter() - started)
+        return result
 
+    def render_svg(self, mermaid_code):
+        """Return the diagram as an SVG string."""
+        def render():
+            with self.session() as driver:
+                return self._render(driver, mermaid_code.strip())["svg"]
+        return self._timed(render)
+
+    def render_png(self, mermaid_code):
+        """Return the diagram as PNG bytes, cropped to the diagram."""
+        def render():
+            with self.session() as driver:
+                result = self._render(driver, mermaid_code.strip())
+                # Element screenshots are clipped to the window, so grow it for large diagrams
+                window = driver.get_window_size()
+                width, height = result["width"] + 100, result["height"] + 100
+                if width > window["width"] or height > window["height"]:
+                    driver.set_window_size(max(width, window["width"]), max(height, window["height"]))
+                return driver.find_element(By.ID, "diagram").screenshot_as_png
+        return self._timed(render)
+
+    def render(self, mermaid_code, fmt="svg"):
+        if fmt == "svg":
+            return self.render_svg(mermaid_code).encode("utf-8")
+        if fmt == "png":
+            return self.render_png(mermaid_code)
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    def render_diagram(self, mermaid_code, output_path):
+        """Write the diagram to ``output_path`` (SVG for .svg paths, PNG otherwise)."""
+        fmt = "svg" if output_path.lower().endswith(".svg") else "png"
+        try:
+            data = self.render(mermaid_code, fmt)
+            with open(output_path, "wb") as f:
+                f.write(data)
+            return True
         except Exception as e:
             print(f"Rendering Error: {str(e)}")
             return False
 
-        finally:
-            if driver:
-                driver.quit()
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
\ No newline at end of file
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "pool_size": self.pool_size,
+                "sessions": self._sessions,
+                "idle_sessions": self._idle.qsize(),
+                **self._counts
+            }
+        if latencies:
+            stats["latency_ms"] = {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1)
+            }
+        return stats
+
+    def close(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            driver.quit()
+            with self._lock:
+                self._sessions -= 1
+        if self._page_path and os.path.exists(self._page_path):
+            os.unlink(self._page_path)
+            self._page_path = None
@@ -21,7 +21,8 @@ def generate_and_render_diagram(prompt, diagram_type):
             return str(response.json()["detail"]), None, ""
         
         result = response.json()
-        return result["mermaid_code"], result["image_path"], result["preview"]
+        # gr.Image needs a raster image; the backend renders the PNG on this first request
+        return result["mermaid_code"], f"{API_URL}{result['png_url']}", result["preview"]
     except Exception as e:
         return str(e), None, ""
 
@@ -1,9 +1,14 @@
 import os
+import glob
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 import pydub
 from moviepy.video.io.VideoFileClip import VideoFileClip
 from yt_dlp import YoutubeDL
 
+# Parallel ffmpeg re-encodes in resize_chunks; each one gets an equal share of the cores
+REFORMAT_WORKERS = int(os.getenv("REFORMAT_WORKERS", max(1, (os.cpu_count() or 1) // 2)))
+
 def download_and_merge_ffmpeg(link, output_path="downloads"):
     # Create output directory if it doesn't exist
     os.makedirs(output_path, exist_ok=True)
@@ -73,38 +78,27 @@ def split_video_by_duration(input_video, chunk_duration, output_folder):
     # Create output folder if it doesn't exist
     os.makedirs(output_folder, exist_ok=True)
 
-    # Get video duration using FFmpeg
-    cmd_duration = [
-        "ffprobe", "-v", "error", "-show_entries", "format=duration", 
-        "-of", "default=noprint_wrappers=1:nokey=1", input_video
-    ]
-    result = subprocess.run(cmd_duration, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    total_duration = float(result.stdout.decode().strip())
-
-    print(f"Total video duration: {total_duration:.2f} seconds")
     print(f"Splitting into chunks of {chunk_duration} seconds each...")
 
-    # Initialize variables
-    chunk_index = 1
-    start_time = 0
-
-    # Loop through and split the video
-    while start_time < total_duration:
-        output_file = os.path.join(output_folder, f"chunk_{chunk_index:03d}.mp4")
-
-        # Calculate the duration for the current chunk
-        current_duration = min(chunk_duration, total_duration - start_time)
+    # One pass with the segment muxer: the file is read once and every chunk is
+    # stream-copied, so cuts land on the nearest keyframe after each boundary
+    cmd_split = [
+        "ffmpeg", "-y", "-i", input_video,
+        "-map", "0", "-c", "copy",
+        "-f", "segment",
+        "-segment_time", str(chunk_duration),
+        # Tolerates keyframe timestamps a hair before the boundary (B-frame/audio offsets)
+        "-segment_time_delta", "0.05",
+        "-segment_start_number", "1",
+        "-reset_timestamps", "1",
+        os.path.join(output_folder, "chunk_%03d.mp4")
+    ]
+    subprocess.run(cmd_split, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-        cmd_split = [
-            "ffmpeg", "-i", input_video, "-ss", str(start_time),
-            "-t", str(current_duration), "-c", "copy", output_file
-        ]
-        subprocess.run(cmd_split, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    chunks = sorted(glob.glob(os.path.join(output_folder, "chunk_*.mp4")))
+    for output_file in chunks:
         print(f"Created: {output_file}")
-
-        # Update start time and chunk index
-        start_time += chunk_duration
-        chunk_index += 1
+    return chunks
 def clear_folders(directories_to_clear):
     for directory in directories_to_clear:
     # Check if directory exists
@@ -115,42 +109,79 @@ def clear_folders(directories_to_clear):
                 if os.path.isfile(file_path):
                     os.remove(file_path)
         print(f"Cleared all files in {directory}")
-def adjust_aspect_ratio(input_video, output_video,fill):
-    # Desired aspect ratio
-    command=None
+def aspect_ratio_filter(fill):
+    # 9:16 at 1080x1920, either cropping to fill the frame or padding to fit it
     if fill:
-        command = [
-        "ffmpeg",
+        return "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920"
+    return "scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:(ow-iw)/2:(oh-ih)/2"
+
+def adjust_aspect_ratio(input_video, output_video,fill,threads=0):
+    # threads=0 lets ffmpeg use every core; parallel callers pass their share
+    command = [
+        "ffmpeg", "-y",
         "-i", input_video,
-        "-vf", "scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920",
+        "-vf", aspect_ratio_filter(fill),
         "-c:v", "libx264",
         "-crf", "23",
         "-preset", "fast",
-        "-c:a", "copy",  # Include audio
+        "-threads", str(threads),
+        "-c:a", "copy",  # Include audio, or replace with '-an' to remove
         output_video
     ]
-    else:
-        command = [
-    "ffmpeg", 
-    "-i", input_video,
-    "-vf", "scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:(ow-iw)/2:(oh-ih)/2", 
-    "-c:v", "libx264", 
-    "-crf", "23", 
-    "-preset", "fast", 
-    "-c:a", "copy",  # Include audio, or replace with '-an' to remove
-    output_video
-    ]
 
 # Execute the command
-    subprocess.run(command)
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return result.returncode == 0
 
-def resize_chunks(folder,outfolder,fill):
+def resize_chunks(folder,outfolder,fill,workers=None):
     clear_folders([outfolder])
-    for filename in os.listdir(folder):
-        if filename.endswith(".mp4"):
-            input_video = os.path.join(folder, filename)
-            output_video = os.path.join(outfolder, f"resized_{filename}")
-            adjust_aspect_ratio(input_video,output_video,fill)
+    os.makedirs(outfolder, exist_ok=True)
+    workers = workers or REFORMAT_WORKERS
+    # Split the cores between the encoders instead of letting each one claim all of them
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    jobs = [
+        (os.path.join(folder, filename), os.path.join(outfolder, f"resized_{filename}"))
+        for filename in sorted(os.listdir(folder)) if filename.endswith(".mp4")
+    ]
+
+    def run(job):
+        input_video, output_video = job
+        ok = adjust_aspect_ratio(input_video, output_video, fill, threads)
+        print(f"{'Resized' if ok else 'Failed to resize'}: {input_video}")
+        return output_video if ok else None
+
+    # ffmpeg does the work in its own process, so threads are enough to run the encodes in parallel
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [output for output in executor.map(run, jobs) if output]
+
+def split_and_resize(input_video, chunk_duration, outfolder, fill):
+    # Fused mode: decode the source once, reformat it to 9:16 and cut the encoded
+    # stream into chunks. Keyframes are forced at every chunk boundary, so each
+    # chunk starts exactly on time, unlike the stream-copy split.
+    clear_folders([outfolder])
+    os.makedirs(outfolder, exist_ok=True)
+    command = [
+        "ffmpeg", "-y",
+        "-i", input_video,
+        "-vf", aspect_ratio_filter(fill),
+        "-c:v", "libx264",
+        "-crf", "23",
+        "-preset", "fast",
+        "-force_key_frames", f"expr:gte(t,n_forced*{chunk_duration})",
+        "-c:a", "copy",
+        "-f", "segment",
+        "-segment_time", str(chunk_duration),
+        # Tolerates keyframe timestamps a hair before the boundary (B-frame/audio offsets)
+        "-segment_time_delta", "0.05",
+        "-segment_start_number", "1",
+        "-reset_timestamps", "1",
+        os.path.join(outfolder, "resized_chunk_%03d.mp4")
+    ]
+    subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    chunks = sorted(glob.glob(os.path.join(outfolder, "resized_chunk_*.mp4")))
+    for output_file in chunks:
+        print(f"Created: {output_file}")
+    return chunks
 
 if __name__ == "__main__":
     # Input video file
@@ -162,6 +193,7 @@ if __name__ == "__main__":
     duration=get_video_duration(input_video)
     print(duration)
     output_folder = "chunks"
+    fused = False
     if duration>180:    # Output folder for chunks
     # User selects a duration
         platform=input("Enter Instagram or Youtube: ").lower()
@@ -173,8 +205,12 @@ if __name__ == "__main__":
 
         if chunk_duration not in [30,60,90,120,180]:
             print("Invalid choice. Please select [30,60,90,120,180] seconds.")
+        elif input("Split and resize in a single pass? (y/n): ").lower() == 'y':
+            split_and_resize(input_video, chunk_duration, "resized", False)
+            fused = True
         else:
             clear_folders(['chunks'])
             split_video_by_duration(input_video, chunk_duration, output_folder)
     
-    resize_chunks(output_folder, "resized",False)
\ No newline at end of file
+    if not fused:
+        resize_chunks(output_folder, "resized",False)
\ No newline at end of file
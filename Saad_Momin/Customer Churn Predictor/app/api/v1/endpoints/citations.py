@@ -43,6 +43,16 @@ async def generate_hyperlink(request: HyperlinkRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/validation-stats")
+async def get_validation_stats():
+    """
+    Report how many validations avoided the model and the cache hit rate per operation.
+    """
+    return {
+        **citation_service.validation_stats.to_dict(),
+        "cache": citation_service.cache.stats()
+    }
+
 @router.get("/styles", response_model=List[str])
 async def get_citation_styles():
     """
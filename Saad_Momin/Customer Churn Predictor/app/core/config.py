@@ -27,6 +27,9 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
     
+    # Persistent cache of model validation and hyperlink results
+    CITATION_CACHE_PATH: str = os.getenv("CITATION_CACHE_PATH", "citation_cache.db")
+    
     model_config = {
         "case_sensitive": True
     }
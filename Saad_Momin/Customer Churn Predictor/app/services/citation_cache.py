@@ -0,0 +1,92 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from app.services.citation_parser import normalize_citation
+
+class CitationCache:
+    """
+    Persistent store of model results (validation, hyperlink, reformat) backed by SQLite.
+
+    Rows are keyed by operation, style and citation. Validation and reformatting
+    judge the citation's exact formatting, so they are keyed on the exact string;
+    only hyperlink lookups use the normalized citation, so spelling variants of
+    one case share a link. Each operation carries a prompt version; rows written
+    under an older version are ignored and purged.
+    """
+
+    # Operations whose result doesn't depend on how the citation is written
+    NORMALIZED_OPERATIONS = {"hyperlink"}
+
+    def __init__(self, path: str = "citation_cache.db", versions: Optional[Dict[str, str]] = None):
+        self.versions = dict(versions or {})
+        self._lock = threading.Lock()
+        self._hits: Counter = Counter()
+        self._misses: Counter = Counter()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS citation_results (
+                    operation TEXT NOT NULL,
+                    style TEXT NOT NULL,
+                    citation_key TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (operation, style, citation_key)
+                )
+            """)
+            for operation in self.versions:
+                self._conn.execute(
+                    "DELETE FROM citation_results WHERE operation = ? AND version != ?",
+                    (operation, self._version(operation))
+                )
+
+    def _version(self, operation: str) -> str:
+        version = self.versions.get(operation, "")
+        # The key scheme is part of the version, so rows stored under normalized keys are purged
+        return version if operation in self.NORMALIZED_OPERATIONS else f"{version}:exact"
+
+    def _key(self, operation: str, citation: str) -> str:
+        return normalize_citation(citation) if operation in self.NORMALIZED_OPERATIONS else citation
+
+    def get(self, operation: str, style: str, citation: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM citation_results "
+                "WHERE operation = ? AND style = ? AND citation_key = ? AND version = ?",
+                (operation, style, self._key(operation, citation), self._version(operation))
+            ).fetchone()
+            if row:
+                self._hits[operation] += 1
+            else:
+                self._misses[operation] += 1
+        return json.loads(row[0]) if row else None
+
+    def set(self, operation: str, style: str, citation: str, result: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO citation_results VALUES (?, ?, ?, ?, ?, ?)",
+                (operation, style, self._key(operation, citation), self._version(operation),
+                 json.dumps(result), time.time())
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counts and hit rate per operation since startup, plus stored entries."""
+        with self._lock:
+            entries = dict(self._conn.execute(
+                "SELECT operation, COUNT(*) FROM citation_results GROUP BY operation"
+            ).fetchall())
+            stats = {}
+            for operation in sorted(set(self._hits) | set(self._misses) | set(entries)):
+                hits, misses = self._hits[operation], self._misses[operation]
+                stats[operation] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                    "entries": entries.get(operation, 0)
+                }
+        return stats
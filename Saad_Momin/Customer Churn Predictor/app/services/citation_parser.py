@@ -0,0 +1,215 @@
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Pattern
+
+# Optional "Party v. Party" case name in front of the reporter part, e.g. "Brown v. Board of Education, ".
+# Each party is a bounded run of words without commas or brackets, so a failed match can't backtrack far.
+# The separator and the comma are captured loosely here and checked against the style in validate_locally.
+_PARTY = r'[^\W\d_][^\s,\[\]]*(?:\s+[^\s,\[\]]+){0,15}'
+_CASE_NAME = (r'(?:(?P<case_name>' + _PARTY + r'\s+(?P<separator>vs?\.?)\s+' + _PARTY + r')'
+              r'(?P<comma>,)?\s+)?')
+
+@dataclass(frozen=True)
+class CitationGrammar:
+    """A well-formed citation format the local validator can settle without the model"""
+    name: str
+    jurisdiction: str
+    pattern: Pattern
+    first_year: int
+    styles: frozenset
+    markers: tuple
+    source_type: str = "case"
+    # Whether a comma follows the case name; None when the format has no such rule
+    name_comma: Optional[bool] = None
+
+US_STYLES = frozenset({"BLUEBOOK_US", "ALWD", "CHICAGO_MANUAL_LEGAL"})
+UK_STYLES = frozenset({"OSCOLA"})
+INDIAN_STYLES = frozenset({"INDIAN_LEGAL", "INDIAN_LAW_COMMISSION"})
+AU_STYLES = frozenset({"AGLC", "AUSTLII", "QUEENSLAND_STYLE", "FEDERAL_COURT_AU", "HIGH_COURT_AU"})
+EU_STYLES = frozenset({"ECJ", "OSCOLA"})
+
+# "v." or "v" between the parties; styles missing here are always left to the model
+CASE_NAME_SEPARATORS = {
+    "BLUEBOOK_US": "v.", "ALWD": "v.", "CHICAGO_MANUAL_LEGAL": "v.",
+    "INDIAN_LEGAL": "v.", "INDIAN_LAW_COMMISSION": "v.",
+    "OSCOLA": "v", "ECJ": "v",
+    "AGLC": "v", "AUSTLII": "v", "QUEENSLAND_STYLE": "v", "FEDERAL_COURT_AU": "v", "HIGH_COURT_AU": "v",
+}
+
+CITATION_GRAMMARS: List[CitationGrammar] = [
+    # Brown v. Board of Education, 347 U.S. 483, 495 (1954)
+    CitationGrammar(
+        "us_reports", "US_SUPREME_COURT",
+        re.compile(_CASE_NAME + r'(?P<volume>\d{1,3})\s+U\.\s?S\.\s+(?P<page>\d{1,4})'
+                   r'(?:,\s*(?P<pin>\d{1,4}(?:[-–]\d{1,4})?))?\s+\((?P<year>\d{4})\)'),
+        1790, US_STYLES, ("U.",), name_comma=True
+    ),
+    # Kesavananda Bharati v. State of Kerala, (1973) 4 SCC 225
+    CitationGrammar(
+        "scc", "INDIAN_SUPREME",
+        re.compile(_CASE_NAME + r'\((?P<year>\d{4})\)\s+(?P<volume>\d{1,2})\s+SCC\s+(?P<page>\d{1,4})'),
+        1969, INDIAN_STYLES, ("SCC",), name_comma=True
+    ),
+    # AIR 1973 SC 1461
+    CitationGrammar(
+        "air", "INDIAN_SUPREME",
+        re.compile(_CASE_NAME + r'AIR\s+(?P<year>\d{4})\s+SC\s+(?P<page>\d{1,5})'),
+        1950, INDIAN_STYLES, ("AIR",), name_comma=True
+    ),
+    # R (Miller) v Secretary of State for Exiting the European Union [2017] UKSC 5
+    CitationGrammar(
+        "uksc", "UK_SUPREME_COURT",
+        re.compile(_CASE_NAME + r'\[(?P<year>\d{4})\]\s+UKSC\s+(?P<case_number>\d{1,3})'),
+        2009, UK_STYLES, ("UKSC",), name_comma=False
+    ),
+    # Mabo v Queensland (No 2) (1992) 175 CLR 1
+    CitationGrammar(
+        "clr", "AU_HIGH_COURT",
+        re.compile(_CASE_NAME + r'\((?P<year>\d{4})\)\s+(?P<volume>\d{1,3})\s+'
+                   r'(?P<reporter>CLR|ALR)\s+(?P<page>\d{1,4})'),
+        1903, AU_STYLES, ("CLR", "ALR"), name_comma=False
+    ),
+    # Mabo v Queensland (No 2) [1992] HCA 23
+    CitationGrammar(
+        "hca", "AU_HIGH_COURT",
+        re.compile(_CASE_NAME + r'\[(?P<year>\d{4})\]\s+HCA\s+(?P<case_number>\d{1,3})'),
+        1903, AU_STYLES, ("HCA",), name_comma=False
+    ),
+    # Case C-26/62 Van Gend en Loos
+    CitationGrammar(
+        "eu_case", "EU_COURT_OF_JUSTICE",
+        re.compile(r'Case\s+(?P<court>[CT])-(?P<case_number>\d{1,4})/(?P<year>\d{2})'
+                   r'(?:\s+(?P<case_name>' + _PARTY + r'(?:\s+(?P<separator>vs?\.?)\s+' + _PARTY + r')?))?'),
+        1953, EU_STYLES, ("Case",)
+    ),
+]
+
+@dataclass
+class ParsedCitation:
+    """Components of a citation matched by one of the local grammars"""
+    grammar: CitationGrammar
+    components: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def jurisdiction(self) -> str:
+        if self.grammar.name == "eu_case" and self.components.get("court") == "T":
+            return "EU_GENERAL_COURT"
+        return self.grammar.jurisdiction
+
+    @property
+    def year(self) -> int:
+        year = int(self.components["year"])
+        if self.grammar.name == "eu_case":
+            # Two-digit EU case years: 53-99 are 19xx, the rest 20xx
+            year += 1900 if year >= 53 else 2000
+        return year
+
+def _clean(citation: str) -> str:
+    return re.sub(r'\s+', ' ', citation).strip().rstrip('.;')
+
+# Spelling variants of common reporters and "v." mapped to one canonical form
+REPORTER_ALIASES = [
+    (re.compile(r'\bU\.?\s?S\.?(?=\s+\d)'), 'U.S.'),
+    (re.compile(r'\bS\.?\s?Ct\.?(?=\s+\d)'), 'S. Ct.'),
+    (re.compile(r'\bL\.?\s?Ed\.?\s?2d\.?(?=\s+\d)'), 'L. Ed. 2d'),
+    (re.compile(r'\bL\.?\s?Ed\.?(?=\s+\d)'), 'L. Ed.'),
+    (re.compile(r'\bF\.?\s?Supp\.?\s?([23])d\.?(?=\s+\d)'), r'F. Supp. \1d'),
+    (re.compile(r'\bF\.?\s?Supp\.?(?=\s+\d)'), 'F. Supp.'),
+    (re.compile(r'\bF\.?\s?(2d|3d|4th)\.?(?=\s+\d)'), r'F.\1'),
+    (re.compile(r'\bA\.?\s?I\.?\s?R\.?(?=\s+\d)'), 'AIR'),
+    (re.compile(r'\bS\.?\s?C\.?\s?C\.?(?=\s+\d)'), 'SCC'),
+    (re.compile(r'\bvs?\.?\s', re.IGNORECASE), 'v. '),
+]
+
+def normalize_citation(citation: str) -> str:
+    """
+    Canonical key for a citation: Unicode, whitespace, punctuation spacing and
+    reporter abbreviations are normalized and the result is case-folded.
+    """
+    text = unicodedata.normalize('NFKC', citation)
+    text = text.replace('\u2013', '-').replace('\u2014', '-').replace('\u2019', "'")
+    text = _clean(text)
+    for pattern, replacement in REPORTER_ALIASES:
+        text = pattern.sub(replacement, text)
+    text = re.sub(r'\s*,\s*', ', ', text)
+    text = re.sub(r'\(\s+', '(', text)
+    text = re.sub(r'\s+\)', ')', text)
+    return text.casefold()
+
+def parse_citation(citation: str) -> Optional[ParsedCitation]:
+    """Match a citation against the compiled grammars; None when no format matches."""
+    text = _clean(citation)
+    for grammar in CITATION_GRAMMARS:
+        # Cheap substring check before running the full grammar
+        if not any(marker in text for marker in grammar.markers):
+            continue
+        match = grammar.pattern.fullmatch(text)
+        if match:
+            components = {k: v.strip() for k, v in match.groupdict().items() if v}
+            return ParsedCitation(grammar, components)
+    return None
+
+def validate_locally(citation: str, style_name: str) -> Optional[dict]:
+    """
+    Settle a citation without the model when it parses under a grammar of the
+    requested style. Returns None for anything ambiguous or malformed, which the
+    caller should send to the model instead. That includes loose matches: no
+    case name, a case name not starting with a capital, a party separator other
+    than the style's ("vs" never passes) or a misplaced comma after the name.
+    """
+    parsed = parse_citation(citation)
+    if parsed is None or style_name not in parsed.grammar.styles:
+        return None
+    components = parsed.components
+    separator = CASE_NAME_SEPARATORS.get(style_name)
+    case_name = components.get("case_name")
+    if separator is None or case_name is None or not case_name[0].isupper():
+        return None
+    if components.get("separator", separator) != separator:
+        return None
+    if parsed.grammar.name_comma is not None and parsed.grammar.name_comma != ("comma" in components):
+        return None
+
+    errors = []
+    year = parsed.year
+    if year < parsed.grammar.first_year or year > date.today().year:
+        errors.append(
+            f"Year {year} is outside the range covered by {parsed.grammar.name} "
+            f"({parsed.grammar.first_year}-{date.today().year})"
+        )
+
+    return {
+        "is_valid": not errors,
+        "error_details": errors,
+        "suggested_correction": _clean(citation),
+        "source_type": parsed.grammar.source_type,
+        "jurisdiction": parsed.jurisdiction
+    }
+
+class ValidationStats:
+    """Counts how many validations were settled locally, from the cache or by the model"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.cache = 0
+        self.model = 0
+
+    def record(self, source: str) -> None:
+        """Record one validation; ``source`` is "local", "cache" or "model"."""
+        with self._lock:
+            setattr(self, source, getattr(self, source) + 1)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            total = self.local + self.cache + self.model
+            return {
+                "total_validations": total,
+                "settled_locally": self.local,
+                "served_from_cache": self.cache,
+                "model_calls": self.model,
+                "model_avoided_ratio": (self.local + self.cache) / total if total else 0.0
+            }
@@ -2,18 +2,62 @@ from typing import Optional, Dict, Any
 import google.generativeai as genai
 from app.core.config import get_settings
 from app.models.citation import CitationStyle
+from app.services.citation_parser import validate_locally, ValidationStats
+from app.services.citation_cache import CitationCache
+import hashlib
 import re
 import json
 
 settings = get_settings()
 
+MODEL_NAME = 'gemini-pro'
+
+VALIDATION_PROMPT = """
+            Analyze this legal citation according to {style} rules:
+            Citation: {citation}{jurisdiction_context}
+            
+            Validation requirements:
+            1. Check citation format
+            2. Verify all required components
+            3. Check jurisdiction-specific rules
+            4. Identify any formatting errors
+            
+            Return a JSON object with:
+            {{
+                "is_valid": boolean,
+                "error_details": [list of specific errors],
+                "suggested_correction": "corrected citation if needed",
+                "source_type": "case/statute/regulation/treaty",
+                "jurisdiction": "detected jurisdiction"
+            }}
+            """
+
+HYPERLINK_PROMPT = """
+            For this legal citation: '{citation}'
+            Generate a direct public hyperlink based on jurisdiction:
+            - US Supreme Court/Federal: Use Google Scholar
+            - UK cases: Use BAILII
+            - EU cases: Use EUR-Lex
+            - International: Use official court databases
+            
+            Return only the URL, no additional text.
+            """
+
+# Editing a prompt changes its version and retires results cached under the old one
+PROMPT_VERSIONS = {
+    operation: hashlib.sha1(f"{MODEL_NAME}\n{template}".encode()).hexdigest()[:12]
+    for operation, template in (("validate", VALIDATION_PROMPT), ("hyperlink", HYPERLINK_PROMPT))
+}
+
 class CitationService:
     def __init__(self):
         if not settings.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY is not set in environment variables")
         
         genai.configure(api_key=settings.GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = genai.GenerativeModel(MODEL_NAME)
+        self.validation_stats = ValidationStats()
+        self.cache = CitationCache(settings.CITATION_CACHE_PATH, PROMPT_VERSIONS)
     
     async def validate_citation(
         self,
@@ -22,44 +66,41 @@ class CitationService:
         jurisdiction_type: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Validate a legal citation using the Gemini model.
+        Validate a legal citation, settling well-formed citations locally and
+        using the Gemini model only for ambiguous or malformed input.
         """
         try:
-            # Build the prompt
-            jurisdiction_context = f"\nJurisdiction: {jurisdiction_type}" if jurisdiction_type else ""
+            # Well-formed citations in a known format never reach the model
+            local_result = validate_locally(citation, style.name)
+            if local_result is not None:
+                self.validation_stats.record("local")
+                return self._check_jurisdiction(local_result, jurisdiction_type)
             
-            prompt = f"""
-            Analyze this legal citation according to {style.value} rules:
-            Citation: {citation}{jurisdiction_context}
-            
-            Validation requirements:
-            1. Check citation format
-            2. Verify all required components
-            3. Check jurisdiction-specific rules
-            4. Identify any formatting errors
+            # The jurisdiction is part of the prompt, so it is part of the cache key too
+            cache_style = f"{style.name}|{jurisdiction_type or ''}"
+            cached = self.cache.get("validate", cache_style, citation)
+            if cached is not None:
+                self.validation_stats.record("cache")
+                return self._check_jurisdiction(cached, jurisdiction_type)
             
-            Return a JSON object with:
-            {{
-                "is_valid": boolean,
-                "error_details": [list of specific errors],
-                "suggested_correction": "corrected citation if needed",
-                "source_type": "case/statute/regulation/treaty",
-                "jurisdiction": "detected jurisdiction"
-            }}
-            """
+            # Build the prompt
+            self.validation_stats.record("model")
+            jurisdiction_context = f"\nJurisdiction: {jurisdiction_type}" if jurisdiction_type else ""
+            prompt = VALIDATION_PROMPT.format(
+                style=style.value,
+                citation=citation,
+                jurisdiction_context=jurisdiction_context
+            )
             
             # Get response from model
             response = self.model.generate_content(prompt)
             result = self._parse_validation_response(response.text, citation)
             
-            # Validate jurisdiction if specified
-            if jurisdiction_type and result.get("jurisdiction") != jurisdiction_type:
-                result["is_valid"] = False
-                result["error_details"] = result.get("error_details", []) + [
-                    f"Citation jurisdiction '{result.get('jurisdiction')}' does not match specified jurisdiction: {jurisdiction_type}"
-                ]
+            # Unparseable replies are retried next time rather than remembered
+            if not any(str(error).startswith("Response parsing error") for error in result["error_details"]):
+                self.cache.set("validate", cache_style, citation, result)
             
-            return result
+            return self._check_jurisdiction(dict(result), jurisdiction_type)
             
         except Exception as e:
             return {
@@ -73,26 +114,31 @@ class CitationService:
         """
         Generate a hyperlink for a legal citation.
         """
+        cached = self.cache.get("hyperlink", style.name, citation)
+        if cached is not None:
+            return cached
+        
         try:
-            prompt = f"""
-            For this legal citation: '{citation}'
-            Generate a direct public hyperlink based on jurisdiction:
-            - US Supreme Court/Federal: Use Google Scholar
-            - UK cases: Use BAILII
-            - EU cases: Use EUR-Lex
-            - International: Use official court databases
-            
-            Return only the URL, no additional text.
-            """
-            
-            response = self.model.generate_content(prompt)
+            response = self.model.generate_content(HYPERLINK_PROMPT.format(citation=citation))
             urls = re.findall(r'https?://\S+', response.text)
             
-            return urls[0] if urls else "No hyperlink available"
+            if not urls:
+                return "No hyperlink available"
+            self.cache.set("hyperlink", style.name, citation, urls[0])
+            return urls[0]
             
         except Exception as e:
             return f"Error generating hyperlink: {str(e)}"
     
+    def _check_jurisdiction(self, result: Dict[str, Any], jurisdiction_type: Optional[str]) -> Dict[str, Any]:
+        """Invalidate the result if it does not match the requested jurisdiction."""
+        if jurisdiction_type and result.get("jurisdiction") != jurisdiction_type:
+            result["is_valid"] = False
+            result["error_details"] = result.get("error_details", []) + [
+                f"Citation jurisdiction '{result.get('jurisdiction')}' does not match specified jurisdiction: {jurisdiction_type}"
+            ]
+        return result
+    
     def _parse_validation_response(self, text: str, original_citation: str) -> Dict[str, Any]:
         """Parse and clean the model's response."""
         try:
@@ -0,0 +1,162 @@
+import os
+import re
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Calendar length of the yfinance period strings the API accepts
+PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+
+def period_start(period: str, today: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+    """First date covered by a yfinance ``period``; None means the full history."""
+    today = (today or pd.Timestamp.now()).normalize()
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(year=today.year, month=1, day=1)
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported period: {period}")
+    return today - PERIOD_OFFSETS[period]
+
+
+def _naive_index(index: pd.Index) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize(None) if index.tz is not None else index
+
+
+def flatten_download(data: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """Single-symbol frame with plain OHLCV columns, whatever layout yfinance returned."""
+    if isinstance(data.columns, pd.MultiIndex):
+        for level in range(data.columns.nlevels):
+            if symbol in data.columns.get_level_values(level):
+                data = data.xs(symbol, axis=1, level=level)
+                break
+        else:
+            raise KeyError(symbol)
+    data = data.dropna(how='all')
+    data.index = _naive_index(data.index)
+    return data
+
+
+class PriceCache:
+    """
+    Daily price history per symbol shared by every endpoint.
+
+    Each symbol keeps the longest history fetched so far. Requests for a shorter
+    period are served by slicing it; once an entry is older than ``ttl`` only the
+    bars since the last cached date are downloaded and appended.
+    Entries are pickled to ``cache_dir`` so restarts start warm.
+    """
+
+    def __init__(self, download: Callable[..., pd.DataFrame], cache_dir: str, ttl: timedelta = timedelta(minutes=15)):
+        self.download = download
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._entries: Dict[str, dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.cache_dir, re.sub(r'[^A-Za-z0-9_.-]', '_', symbol) + '.pkl')
+
+    def _lock_for(self, symbol: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _load(self, symbol: str) -> Optional[dict]:
+        entry = self._entries.get(symbol)
+        if entry is None and os.path.exists(self._path(symbol)):
+            try:
+                entry = pd.read_pickle(self._path(symbol))
+                self._entries[symbol] = entry
+            except Exception as e:
+                logger.warning(f"Discarding unreadable price cache for {symbol}: {e}")
+        return entry
+
+    def _store(self, symbol: str, frame: pd.DataFrame, start: Optional[pd.Timestamp]) -> dict:
+        entry = {'frame': frame, 'start': start, 'fetched_at': datetime.now()}
+        self._entries[symbol] = entry
+        pd.to_pickle(entry, self._path(symbol))
+        return entry
+
+    @staticmethod
+    def _covers(entry: dict, start: Optional[pd.Timestamp]) -> bool:
+        if entry['start'] is None:
+            return True
+        return start is not None and entry['start'] <= start
+
+    def _fetch_full(self, symbol: str, period: str, start: Optional[pd.Timestamp]) -> dict:
+        frame = flatten_download(self.download(symbol, period=period), symbol)
+        if frame.empty:
+            # Unknown symbols and failed downloads are not cached
+            return {'frame': frame, 'start': start, 'fetched_at': datetime.now()}
+        return self._store(symbol, frame, start)
+
+    def _top_up(self, symbol: str, entry: dict) -> dict:
+        frame = entry['frame']
+        # Re-fetch the last cached bar too, it may have been an intraday snapshot
+        fresh = flatten_download(self.download(symbol, start=frame.index[-1].strftime('%Y-%m-%d')), symbol)
+        if fresh.empty:
+            return self._store(symbol, frame, entry['start'])
+        combined = pd.concat([frame[frame.index < frame.index[-1]], fresh])
+        combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+        return self._store(symbol, combined, entry['start'])
+
+    def get(self, symbol: str, period: str = '2y') -> pd.DataFrame:
+        symbol = symbol.upper()
+        start = period_start(period)
+        with self._lock_for(symbol):
+            entry = self._load(symbol)
+            if entry is None or not self._covers(entry, start):
+                entry = self._fetch_full(symbol, period, start)
+            elif datetime.now() - entry['fetched_at'] >= self.ttl:
+                entry = self._top_up(symbol, entry)
+        frame = entry['frame']
+        # Callers get their own copy, so changing it can't corrupt the cached frame
+        return frame.copy() if start is None else frame[frame.index >= start].copy()
+
+    def get_many(self, symbols: List[str], period: str = '2y') -> Dict[str, pd.DataFrame]:
+        """Serve several symbols, downloading every uncovered one in a single request."""
+        start = period_start(period)
+        symbols = [symbol.upper() for symbol in symbols]
+        missing = []
+        for symbol in symbols:
+            entry = self._load(symbol)
+            if entry is None or not self._covers(entry, start):
+                missing.append(symbol)
+
+        if missing:
+            data = self.download(missing, period=period, group_by='ticker')
+            for symbol in missing:
+                try:
+                    frame = flatten_download(data, symbol)
+                except KeyError:
+                    continue
+                if not frame.empty:
+                    self._store(symbol, frame, start)
+
+        frames = {}
+        for symbol in symbols:
+            if self._load(symbol) is None:
+                continue
+            frame = self.get(symbol, period)
+            if not frame.empty:
+                frames[symbol] = frame
+        return frames
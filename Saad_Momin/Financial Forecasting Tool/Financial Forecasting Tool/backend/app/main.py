@@ -1,13 +1,18 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .models import FinancialData, RiskMetrics, MLPrediction, AIPrediction, ChartData
+from .models import FinancialData, RiskMetrics, MLPrediction, AIPrediction, ChartData, BatchSymbolsRequest
 from .utils import (
     load_financial_data,
+    price_frame_to_json,
     calculate_risk_metrics,
+    cached_risk_metrics,
+    batch_risk_metrics,
     ml_enhanced_prediction,
+    ml_batch_prediction,
     get_ai_prediction
 )
 from typing import List, Dict
+import asyncio
 import pandas as pd
 from datetime import datetime
 
@@ -27,22 +32,11 @@ async def root():
     return {"message": "Financial Forecast API is running"}
 
 @app.get("/financial-data/{symbol}")
-async def get_financial_data(symbol: str, period: str = "2y") -> List[dict]:
+async def get_financial_data(symbol: str, period: str = "2y", format: str = "records") -> Response:
     try:
         df = load_financial_data(symbol, period)
-        # Convert DataFrame to list of dictionaries with proper formatting
-        records = []
-        for index, row in df.reset_index().iterrows():
-            record = {
-                "date": row["Date"].isoformat(),
-                "open": float(row["Open"]),
-                "high": float(row["High"]),
-                "low": float(row["Low"]),
-                "close": float(row["Close"]),
-                "volume": int(row["Volume"])
-            }
-            records.append(record)
-        return records
+        # "records" is a list of rows, "columns" an object of equal-length arrays
+        return Response(content=price_frame_to_json(df, format), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -50,7 +44,7 @@ async def get_financial_data(symbol: str, period: str = "2y") -> List[dict]:
 async def get_risk_metrics(symbol: str, period: str = "2y") -> Dict:
     try:
         df = load_financial_data(symbol, period)
-        metrics = calculate_risk_metrics(df)
+        metrics = cached_risk_metrics({symbol: df}, period)[symbol]
         
         # Create chart data for risk metrics
         chart_data = {
@@ -74,11 +68,21 @@ async def get_risk_metrics(symbol: str, period: str = "2y") -> Dict:
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/risk-metrics/batch")
+async def get_batch_risk_metrics(request: BatchSymbolsRequest) -> Dict:
+    try:
+        symbols = list(dict.fromkeys(s.strip().upper() for s in request.symbols if s.strip()))
+        if not symbols:
+            raise ValueError("No symbols provided")
+        return await asyncio.to_thread(batch_risk_metrics, symbols, request.period)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/ml-prediction/{symbol}")
 async def get_ml_prediction(symbol: str, period: str = "2y") -> Dict:
     try:
         df = load_financial_data(symbol, period)
-        prediction = ml_enhanced_prediction(df)
+        prediction = ml_enhanced_prediction(df, symbol=symbol, period=period)
         
         # Create chart data for ML prediction
         chart_data = {
@@ -97,6 +101,17 @@ async def get_ml_prediction(symbol: str, period: str = "2y") -> Dict:
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/ml-prediction/batch")
+async def get_ml_batch_prediction(request: BatchSymbolsRequest) -> Dict:
+    try:
+        symbols = list(dict.fromkeys(s.strip().upper() for s in request.symbols if s.strip()))
+        if not symbols:
+            raise ValueError("No symbols provided")
+        # Runs off the event loop; training several models can take a while
+        return await asyncio.to_thread(ml_batch_prediction, symbols, request.period)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/ai-prediction/{symbol}")
 async def get_ai_prediction_endpoint(
     symbol: str,
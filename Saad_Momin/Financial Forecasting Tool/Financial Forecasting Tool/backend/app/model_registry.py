@@ -0,0 +1,86 @@
+import os
+import re
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Trained forecasting models keyed by (symbol, period, feature set).
+
+    Entries are kept in memory and persisted with joblib so they survive restarts.
+    An entry older than ``max_age`` is considered stale and retrained on next use.
+    """
+
+    def __init__(self, cache_dir: str, max_age: timedelta = timedelta(hours=24)):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self._entries: Dict[str, dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _key(symbol: str, period: str, feature_set: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', f"{symbol.upper()}__{period}__{feature_set}")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.joblib")
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _is_fresh(self, entry: dict) -> bool:
+        return datetime.now() - entry['trained_at'] < self.max_age
+
+    def get(self, symbol: str, period: str, feature_set: str) -> Optional[dict]:
+        key = self._key(symbol, period, feature_set)
+        entry = self._entries.get(key)
+        if entry is None and os.path.exists(self._path(key)):
+            try:
+                entry = joblib.load(self._path(key))
+                self._entries[key] = entry
+            except Exception as e:
+                logger.warning(f"Discarding unreadable model cache {key}: {e}")
+                entry = None
+        if entry is not None and self._is_fresh(entry):
+            return entry
+        return None
+
+    def put(self, symbol: str, period: str, feature_set: str, entry: dict) -> dict:
+        key = self._key(symbol, period, feature_set)
+        entry = {**entry, 'trained_at': entry.get('trained_at', datetime.now())}
+        self._entries[key] = entry
+        joblib.dump(entry, self._path(key))
+        return entry
+
+    def get_or_train(
+        self,
+        symbol: str,
+        period: str,
+        feature_set: str,
+        train: Callable[[], dict]
+    ) -> Tuple[dict, bool]:
+        """Return ``(entry, cached)``, training at most once per key at a time."""
+        entry = self.get(symbol, period, feature_set)
+        if entry is not None:
+            return entry, True
+        with self._lock_for(self._key(symbol, period, feature_set)):
+            # Another request may have trained it while we waited
+            entry = self.get(symbol, period, feature_set)
+            if entry is not None:
+                return entry, True
+            return self.put(symbol, period, feature_set, train()), False
+
+    def invalidate(self, symbol: str, period: str, feature_set: str) -> None:
+        key = self._key(symbol, period, feature_set)
+        self._entries.pop(key, None)
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
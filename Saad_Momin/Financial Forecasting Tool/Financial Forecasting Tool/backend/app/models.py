@@ -21,6 +21,8 @@ class MLPrediction(BaseModel):
     feature_importance: Dict[str, float]
     data_points: int
     last_price: float
+    from_cache: bool = False
+    trained_at: Optional[datetime] = None
 
 class AIPrediction(BaseModel):
     trend: str
@@ -36,4 +38,8 @@ class ChartData(BaseModel):
     title: str
     x_label: str
     y_label: str
-    data: Dict[str, List[float]] 
\ No newline at end of file
+    data: Dict[str, List[float]]
+
+class BatchSymbolsRequest(BaseModel):
+    symbols: List[str]
+    period: str = "2y"
@@ -9,7 +9,13 @@ import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import json, logging
-from typing import List
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .data_cache import PriceCache
+from .model_registry import ModelRegistry
 
 # Load environment variables
 load_dotenv()
@@ -18,25 +24,98 @@ load_dotenv()
 genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
 model = genai.GenerativeModel('gemini-pro')
 
+RISK_METRIC_KEYS = ['value_at_risk', 'conditional_var', 'sharpe_ratio', 'max_drawdown']
+
+def calculate_risk_metrics_matrix(prices: pd.DataFrame, risk_free_rate: float = 0.02) -> pd.DataFrame:
+    """
+    Risk metrics for every column of a (dates x symbols) close-price matrix.
+
+    Columns may have gaps (different listings/trading calendars); returns are taken
+    between consecutive valid prices of each column, as ``pct_change().dropna()``
+    would per series.
+    """
+    values = prices.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    filled = prices.ffill().to_numpy(dtype=np.float64)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = filled[1:] / filled[:-1] - 1
+        returns[~valid[1:]] = np.nan
+        
+        # One quantile call covers VaR and the CVaR cut-off
+        value_at_risk = np.nanpercentile(returns, 5, axis=0)
+        conditional_var = np.nanmean(np.where(returns <= value_at_risk, returns, np.nan), axis=0)
+        
+        excess = returns - risk_free_rate / 252
+        sharpe_ratio = np.sqrt(252) * np.nanmean(excess, axis=0) / np.nanstd(excess, axis=0, ddof=1)
+        
+        # Drawdown from the running peak, starting at each column's first return as before
+        since_first_return = values.copy()
+        since_first_return[valid.argmax(axis=0), np.arange(values.shape[1])] = np.nan
+        peaks = np.fmax.accumulate(since_first_return, axis=0)
+        max_drawdown = np.nanmin(since_first_return / peaks - 1, axis=0)
+    
+    return pd.DataFrame(
+        {
+            'value_at_risk': value_at_risk,
+            'conditional_var': conditional_var,
+            'sharpe_ratio': sharpe_ratio,
+            'max_drawdown': max_drawdown
+        },
+        index=prices.columns
+    )
+
+def _metrics_dict(row: pd.Series) -> dict:
+    return {key: (None if pd.isna(row[key]) else float(row[key])) for key in RISK_METRIC_KEYS}
+
 def calculate_risk_metrics(financial_data: pd.DataFrame) -> dict:
     returns = financial_data['Close'].pct_change().dropna()
     
     if returns.empty:
-        return {
-            'value_at_risk': None,
-            'conditional_var': None,
-            'sharpe_ratio': None,
-            'max_drawdown': None
-        }
-
-    risk_metrics = {
-        'value_at_risk': float(np.percentile(returns, 5)),
-        'conditional_var': float(returns[returns <= np.percentile(returns, 5)].mean()),
-        'sharpe_ratio': float(calculate_sharpe_ratio(returns)),
-        'max_drawdown': float(calculate_max_drawdown(financial_data['Close']))
-    }
+        return {key: None for key in RISK_METRIC_KEYS}
+
+    matrix = calculate_risk_metrics_matrix(financial_data[['Close']])
+    return _metrics_dict(matrix.iloc[0])
+
+# Results keyed by (symbol, period, last bar date); a new bar produces a new key
+RISK_CACHE_SIZE = int(os.getenv('RISK_CACHE_SIZE', '5000'))
+_risk_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+_risk_cache_lock = threading.Lock()
+
+def _risk_cache_key(symbol: str, period: str, financial_data: pd.DataFrame) -> tuple:
+    return (symbol.upper(), period, financial_data.index[-1].isoformat())
+
+def cached_risk_metrics(frames: Dict[str, pd.DataFrame], period: str = '2y') -> Dict[str, dict]:
+    """Risk metrics for many symbols, computing only those without a cached result."""
+    results, pending = {}, {}
+    with _risk_cache_lock:
+        for symbol, frame in frames.items():
+            if frame.empty:
+                results[symbol] = {key: None for key in RISK_METRIC_KEYS}
+                continue
+            key = _risk_cache_key(symbol, period, frame)
+            if key in _risk_cache:
+                _risk_cache.move_to_end(key)
+                results[symbol] = _risk_cache[key]
+            else:
+                pending[symbol] = key
+    
+    if pending:
+        prices = pd.concat({symbol: frames[symbol]['Close'] for symbol in pending}, axis=1).sort_index()
+        matrix = calculate_risk_metrics_matrix(prices)
+        with _risk_cache_lock:
+            for symbol, key in pending.items():
+                results[symbol] = _risk_cache[key] = _metrics_dict(matrix.loc[symbol])
+            while len(_risk_cache) > RISK_CACHE_SIZE:
+                _risk_cache.popitem(last=False)
     
-    return risk_metrics
+    return results
+
+def batch_risk_metrics(symbols: List[str], period: str = '2y') -> dict:
+    frames = load_financial_data_batch(symbols, period)
+    metrics = cached_risk_metrics(frames, period)
+    errors = {symbol: "No data returned" for symbol in symbols if symbol not in frames}
+    return {'metrics': metrics, 'errors': errors}
 
 def calculate_sharpe_ratio(returns: pd.Series, risk_free_rate: float = 0.02) -> float:
     excess_returns = returns - (risk_free_rate / 252)
@@ -55,10 +134,24 @@ def calculate_rsi(prices: pd.Series, periods: int = 14) -> pd.Series:
     rs = gain / loss
     return 100 - (100 / (1 + rs))
 
-def ml_enhanced_prediction(financial_data: pd.DataFrame) -> dict:
-    if financial_data is None or financial_data.empty:
-        raise ValueError("Input financial data is empty")
+FEATURE_COLUMNS = ['ma_10', 'ma_50', 'rsi', 'volume']
+# Bump when the features or hyperparameters change so cached models are retrained
+FEATURE_SET = 'ma10-ma50-rsi14-volume.xgb-v1'
+
+# Shared by every endpoint so one symbol is downloaded once per PRICE_CACHE_TTL_MINUTES
+price_cache = PriceCache(
+    yf.download,
+    os.getenv('PRICE_CACHE_DIR', 'price_cache'),
+    ttl=timedelta(minutes=float(os.getenv('PRICE_CACHE_TTL_MINUTES', '15')))
+)
 
+# Shared across requests; models are reused until they are older than MODEL_MAX_AGE_HOURS
+model_registry = ModelRegistry(
+    os.getenv('MODEL_CACHE_DIR', 'model_cache'),
+    max_age=timedelta(hours=float(os.getenv('MODEL_MAX_AGE_HOURS', '24')))
+)
+
+def build_features(financial_data: pd.DataFrame) -> pd.DataFrame:
     # Create features with lowercase column names
     features = pd.DataFrame({
         'close': financial_data['Close'],
@@ -67,9 +160,9 @@ def ml_enhanced_prediction(financial_data: pd.DataFrame) -> dict:
         'rsi': calculate_rsi(financial_data['Close']),
         'volume': financial_data['Volume'].ffill()
     })
-    
-    features = features.dropna()
-    feature_columns = ['ma_10', 'ma_50', 'rsi', 'volume']
+    return features.dropna()
+
+def train_forecast_model(features: pd.DataFrame, feature_columns: List[str] = FEATURE_COLUMNS) -> dict:
     X = features[feature_columns]
     y = features['close']
     
@@ -81,63 +174,136 @@ def ml_enhanced_prediction(financial_data: pd.DataFrame) -> dict:
     xgb_model = XGBRegressor(n_estimators=100, learning_rate=0.1, max_depth=5, random_state=42)
     xgb_model.fit(X_train_scaled, y_train)
     
-    # Convert numpy types to Python native types
-    feature_importance = {k: float(v) for k, v in zip(feature_columns, xgb_model.feature_importances_)}
+    return {
+        'model': xgb_model,
+        'scaler': scaler,
+        'feature_columns': list(feature_columns),
+        # Convert numpy types to Python native types
+        'feature_importance': {k: float(v) for k, v in zip(feature_columns, xgb_model.feature_importances_)},
+        'data_points': int(len(features))
+    }
+
+def ml_enhanced_prediction(
+    financial_data: pd.DataFrame,
+    symbol: Optional[str] = None,
+    period: str = '2y',
+    registry: Optional[ModelRegistry] = None
+) -> dict:
+    if financial_data is None or financial_data.empty:
+        raise ValueError("Input financial data is empty")
+
+    features = build_features(financial_data)
+    
+    # Reuse a trained model for this symbol when one is cached and fresh
+    cached = False
+    if symbol is not None:
+        registry = registry or model_registry
+        trained, cached = registry.get_or_train(
+            symbol, period, FEATURE_SET, lambda: train_forecast_model(features)
+        )
+    else:
+        trained = train_forecast_model(features)
     
-    # Generate forecast values
-    last_data = X.iloc[-1:].copy()
+    # Generate forecast values from the latest feature row
+    last_data = features[trained['feature_columns']].iloc[-1].to_numpy(dtype=np.float64)
     last_close = float(financial_data['Close'].iloc[-1])
-    forecast_values = generate_forecast(xgb_model, scaler, last_data, last_close, feature_columns)
+    forecast_values = generate_forecast(
+        trained['model'], trained['scaler'], last_data, last_close, trained['feature_columns']
+    )
     
     return {
-        'forecast_values': [float(x) for x in forecast_values],  # Convert numpy floats to Python floats
-        'feature_importance': feature_importance,
+        'forecast_values': forecast_values,
+        'feature_importance': trained['feature_importance'],
         'data_points': int(len(features)),
-        'last_price': float(last_close)
+        'last_price': float(last_close),
+        'from_cache': cached,
+        'trained_at': trained['trained_at'].isoformat() if 'trained_at' in trained else None
     }
 
 def generate_forecast(model, scaler, last_data, last_close, feature_columns, forecast_period: int = 30) -> List[float]:
-    forecasted_values = [float(last_close)]  # Convert to Python float
-    current_data = last_data.copy()
-    
-    for _ in range(forecast_period):
-        # Scale the current data
-        scaled_data = scaler.transform(current_data)
-        # Make prediction and convert to Python float
-        prediction = float(model.predict(scaled_data)[0])
-        forecasted_values.append(prediction)
-        
-        # Update the current data for the next prediction
-        prev_ma10 = float(current_data['ma_10'].iloc[0])
-        prev_ma50 = float(current_data['ma_50'].iloc[0])
+    # Work on a plain feature vector and apply the MinMax scaling by hand
+    # instead of building and transforming a one-row DataFrame every step
+    current = np.asarray(last_data, dtype=np.float64).reshape(-1).copy()
+    scale, offset = scaler.scale_, scaler.min_
+    booster = model.get_booster()
+    ma10, ma50, rsi = (feature_columns.index(c) for c in ('ma_10', 'ma_50', 'rsi'))
+    rsi_lookback = 14
+    
+    forecasted_values = np.empty(forecast_period + 1)
+    forecasted_values[0] = last_close
+    
+    for step in range(1, forecast_period + 1):
+        prediction = float(booster.inplace_predict((current * scale + offset)[np.newaxis, :])[0])
+        forecasted_values[step] = prediction
         
         # Update moving averages based on the new prediction
-        current_data['ma_10'] = float((prev_ma10 * 9 + prediction) / 10)
-        current_data['ma_50'] = float((prev_ma50 * 49 + prediction) / 50)
+        current[ma10] = (current[ma10] * 9 + prediction) / 10
+        current[ma50] = (current[ma50] * 49 + prediction) / 50
         
-        # Calculate RSI using a simplified method
-        rsi_lookback = 14
-        if len(forecasted_values) >= rsi_lookback:
-            changes = pd.Series(forecasted_values[-rsi_lookback:]).diff().dropna()
-            gains = float(changes[changes > 0].mean() or 0)
-            losses = float(-changes[changes < 0].mean() or 0)
+        # Calculate RSI using a simplified method; volume is kept constant
+        if step + 1 >= rsi_lookback:
+            changes = np.diff(forecasted_values[step + 1 - rsi_lookback:step + 1])
+            # A side with no moves has no mean (NaN), exactly as the pandas ".mean() or 0" left it
+            gains = changes[changes > 0].mean() if (changes > 0).any() else np.nan
+            losses = -changes[changes < 0].mean() if (changes < 0).any() else np.nan
             rs = gains / losses if losses != 0 else 0
-            current_data['rsi'] = float(100 - (100 / (1 + rs)) if rs != 0 else 50)
+            current[rsi] = 100 - (100 / (1 + rs)) if rs != 0 else 50
         else:
-            current_data['rsi'] = 50.0
-        
-        # Keep volume constant
-        current_data['volume'] = float(current_data['volume'].iloc[0])
+            current[rsi] = 50.0
+    
+    return forecasted_values.tolist()
+
+def ml_batch_prediction(symbols: List[str], period: str = '2y', max_workers: int = 4) -> dict:
+    """Forecast several symbols with one download and cached per-symbol models."""
+    data = load_financial_data_batch(symbols, period)
+    predictions, errors = {}, {}
+    
+    def predict(symbol: str) -> dict:
+        return ml_enhanced_prediction(data[symbol], symbol=symbol, period=period)
+    
+    # XGBoost releases the GIL while training/predicting, so threads overlap well
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(predict, symbol): symbol for symbol in data}
+        for future, symbol in futures.items():
+            try:
+                predictions[symbol] = future.result()
+            except Exception as e:
+                errors[symbol] = str(e)
+    
+    for symbol in symbols:
+        if symbol not in data:
+            errors[symbol] = "No data returned"
     
-    return forecasted_values
+    return {'predictions': predictions, 'errors': errors}
 
 def load_financial_data(symbol: str, period: str = '2y') -> pd.DataFrame:
     try:
-        data = yf.download(symbol, period=period)
-        return data
+        return price_cache.get(symbol, period)
     except Exception as e:
         raise ValueError(f"Error fetching data for {symbol}: {str(e)}")
 
+def load_financial_data_batch(symbols: List[str], period: str = '2y') -> Dict[str, pd.DataFrame]:
+    try:
+        return price_cache.get_many(symbols, period)
+    except Exception as e:
+        raise ValueError(f"Error fetching data for {', '.join(symbols)}: {str(e)}")
+
+def price_frame_to_json(financial_data: pd.DataFrame, orient: str = 'records') -> str:
+    """Serialize OHLCV data in one vectorized pass, as records or as column arrays."""
+    frame = pd.DataFrame({
+        'date': financial_data.index.strftime('%Y-%m-%dT%H:%M:%S'),
+        'open': financial_data['Open'].astype(float).to_numpy(),
+        'high': financial_data['High'].astype(float).to_numpy(),
+        'low': financial_data['Low'].astype(float).to_numpy(),
+        'close': financial_data['Close'].astype(float).to_numpy(),
+        'volume': financial_data['Volume'].fillna(0).astype('int64').to_numpy()
+    })
+    if orient == 'columns':
+        # Missing bars become null; json.dumps would write bare NaN, which isn't valid JSON
+        columns = frame.astype(object).where(frame.notna(), None).to_dict(orient='list')
+        return json.dumps(columns)
+    return frame.to_json(orient='records', double_precision=15)
+
 def get_ai_prediction(financial_data: pd.DataFrame, context: str, asset_type: str) -> dict:
     # Format the data for AI analysis
     recent_data = financial_data.tail(30)
@@ -10,7 +10,10 @@ import json
 API_BASE_URL = "http://localhost:8000"  # FastAPI backend URL
 
 def load_financial_data(symbol: str, period: str = "2y"):
-    response = requests.get(f"{API_BASE_URL}/financial-data/{symbol}", params={"period": period})
+    response = requests.get(
+        f"{API_BASE_URL}/financial-data/{symbol}",
+        params={"period": period, "format": "columns"}
+    )
     if response.status_code == 200:
         data = response.json()
         # Convert ISO format dates back to datetime
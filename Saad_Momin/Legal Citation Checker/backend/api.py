@@ -1,10 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 import os
 import re
+import json
 import requests
-from main import CitationStyle, JurisdictionType, LegalCitationProcessor, CitationValidationResult
+from urllib.parse import quote_plus
+from main import CitationStyle, JurisdictionType, LegalCitationProcessor, CitationValidationResult, PROMPT_VERSIONS
+from citation_parser import parse_citation
+from citation_cache import CitationCache
+from document_pipeline import AsyncRateLimiter, validate_document
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,8 +22,17 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Persistent model results, invalidated whenever a prompt changes
+citation_cache = CitationCache(os.getenv('CITATION_CACHE_PATH', 'citation_cache.db'), PROMPT_VERSIONS)
+
 # Initialize the citation processor
-citation_processor = LegalCitationProcessor(api_key=os.getenv('GOOGLE_API_KEY'))
+citation_processor = LegalCitationProcessor(api_key=os.getenv('GOOGLE_API_KEY'), cache=citation_cache)
+
+# Global model budget shared by document-level requests
+model_rate_limiter = AsyncRateLimiter(
+    requests_per_minute=int(os.getenv('MODEL_REQUESTS_PER_MINUTE', '60')),
+    max_concurrency=int(os.getenv('DOCUMENT_MAX_CONCURRENCY', '4'))
+)
 
 # Citation source mapping
 CITATION_SOURCES = {
@@ -51,6 +66,13 @@ CITATION_SOURCES = {
 
 def extract_citation_components(citation: str) -> Dict[str, str]:
     """Extract components from citation text"""
+    parsed = parse_citation(citation)
+    if parsed is not None:
+        components = dict(parsed.components)
+        if 'case_name' in components:
+            components['case_name'] = quote_plus(components['case_name'])
+        return components
+    
     components = {}
     
     # US Supreme Court pattern (simplified)
@@ -174,6 +196,14 @@ async def validate_citation(request: CitationRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/stats")
+async def get_validation_stats():
+    """How many validations avoided the model, and cache hit rates per operation"""
+    return {
+        **citation_processor.validation_stats.to_dict(),
+        "cache": citation_cache.stats()
+    }
+
 @app.post("/hyperlink")
 async def get_hyperlink(request: CitationRequest):
     """Generate hyperlink for a citation with multiple fallback sources"""
@@ -196,6 +226,29 @@ async def get_hyperlink(request: CitationRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/validate-document")
+async def validate_document_citations(
+    style: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    text: Optional[str] = Form(None)
+):
+    """Extract every citation from a document and stream validation results as NDJSON"""
+    try:
+        citation_style = CitationStyle[style]
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown citation style: {style}")
+    
+    if text is None:
+        if file is None:
+            raise HTTPException(status_code=400, detail="Provide a file or text")
+        text = (await file.read()).decode('utf-8', errors='replace')
+    
+    events = validate_document(text, citation_style, citation_processor, model_rate_limiter)
+    return StreamingResponse(
+        (json.dumps(event) + "\n" async for event in events),
+        media_type="application/x-ndjson"
+    )
+
 @app.post("/reformat")
 async def reformat_citation(request: ReformatRequest):
     """Reformat a citation from one style to another"""
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from citation_parser import ExtractedCitation, extract_citations
+
+class AsyncRateLimiter:
+    """Caps concurrent model calls and spaces them to a requests-per-minute budget"""
+
+    def __init__(self, requests_per_minute: int = 60, max_concurrency: int = 4):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore.release()
+
+async def validate_document(
+    text: str,
+    style,
+    processor,
+    limiter: Optional[AsyncRateLimiter] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Extract and validate every unique citation in a document.
+
+    Yields a summary event, then one result event per unique citation in the order
+    validations complete, then a final event with counts per result source.
+    """
+    citations = extract_citations(text)
+    limiter = limiter or AsyncRateLimiter()
+    yield {
+        "type": "summary",
+        "total_citations": sum(entry.occurrences for entry in citations),
+        "unique_citations": len(citations)
+    }
+
+    async def validate(entry: ExtractedCitation) -> Tuple[ExtractedCitation, Dict[str, Any], str]:
+        local = processor.local_validation(entry.citation, style)
+        if local is not None:
+            return entry, local.to_dict(), "local"
+
+        # The processor's cache is keyed by citation and prompt version; SQLite stays off the event loop
+        cached = await asyncio.to_thread(processor.cached_validation, entry.citation, style)
+        if cached is not None:
+            return entry, cached.to_dict(), "cache"
+
+        async with limiter:
+            validation = await asyncio.to_thread(processor.validate_with_model, entry.citation, style)
+        return entry, validation.to_dict(), "model"
+
+    counts = {"cache": 0, "local": 0, "model": 0}
+    tasks = [asyncio.create_task(validate(entry)) for entry in citations]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            entry, result, source = await next_done
+            counts[source] += 1
+            yield {
+                "type": "result",
+                "citation": entry.citation,
+                "format": entry.format,
+                "occurrences": entry.occurrences,
+                "offsets": entry.offsets,
+                "source": source,
+                "result": result
+            }
+    finally:
+        # If the client went away, drop validations still waiting for the limiter. Model calls
+        # already running in threads can't be interrupted; the limiter keeps them to
+        # max_concurrency, and their results still reach the cache.
+        for task in tasks:
+            task.cancel()
+
+    yield {"type": "done", **counts}
@@ -1,10 +1,60 @@
 import os
 import re
 import json
+import hashlib
 from typing import Dict, Any, Optional
 import google.generativeai as genai
 from dataclasses import dataclass, asdict
 from enum import Enum, auto
+from citation_parser import validate_locally, ValidationStats
+from citation_cache import CitationCache
+
+MODEL_NAME = 'gemini-1.5-flash'
+PARSE_FAILURE = "Failed to parse validation result"
+
+VALIDATION_PROMPT = """
+            Strictly Analyze the legal citation '{citation}' according to {style} rules.
+            
+            VALIDATION REQUIREMENTS:
+            1. Check citation format
+            2. Verify all required components are present
+            3. Identify any formatting errors
+            4. Consider jurisdiction-specific rules
+            
+            Output JSON format:
+            {{
+                "is_valid": boolean,
+                "error_details": [list of specific errors],
+                "suggested_correction": "corrected citation if needed",
+                "source_type": "case/statute/regulation/treaty",
+                "jurisdiction": "specific jurisdiction from the citation"
+            }}
+            """
+
+HYPERLINK_PROMPT = """
+            For citation '{citation}':
+            1. Identify jurisdiction and court level
+            2. Generate direct public hyperlink
+            3. Return only the URL
+            """
+
+REFORMAT_PROMPT = """
+            Reformat citation '{citation}' from {source_style} to {target_style}:
+            - Preserve source integrity
+            - Apply {target_style} formatting rules
+            - Maintain all critical case information
+            """
+
+# Cached results are tied to the model and prompt that produced them;
+# editing a prompt changes its version and retires the old cache rows
+PROMPT_VERSIONS = {
+    operation: hashlib.sha1(f"{MODEL_NAME}\n{template}".encode()).hexdigest()[:12]
+    for operation, template in (
+        ("validate", VALIDATION_PROMPT),
+        ("hyperlink", HYPERLINK_PROMPT),
+        ("reformat", REFORMAT_PROMPT),
+    )
+}
 
 class CitationStyle(Enum):
     # US Citation Styles
@@ -96,7 +146,7 @@ class CitationValidationResult:
         return {k: v for k, v in asdict(self).items() if v is not None}
 
 class LegalCitationProcessor:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[CitationCache] = None):
         """Initialize the Legal Citation Processor"""
         if not api_key:
             api_key = os.getenv('GOOGLE_API_KEY')
@@ -106,74 +156,106 @@ class LegalCitationProcessor:
         
         try:
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            self.model = genai.GenerativeModel(MODEL_NAME)
         except Exception as e:
             raise RuntimeError(f"Failed to initialize Gemini model: {e}")
+        
+        self.validation_stats = ValidationStats()
+        self.cache = cache
 
     def validate_citation(self, citation: str, style: CitationStyle) -> CitationValidationResult:
         """Validate legal citations"""
+        # Well-formed citations in a known format are settled without the model
+        local = self.local_validation(citation, style)
+        if local is not None:
+            return local
+        
+        cached = self.cached_validation(citation, style)
+        if cached is not None:
+            return cached
+        return self.validate_with_model(citation, style)
+
+    def local_validation(self, citation: str, style: CitationStyle) -> Optional[CitationValidationResult]:
+        """Verdict from the local parser for well-formed citations, if it can settle one"""
+        local_result = validate_locally(citation, style.name)
+        if local_result is None:
+            return None
+        self.validation_stats.record("local")
+        return CitationValidationResult(**local_result)
+
+    def cached_validation(self, citation: str, style: CitationStyle) -> Optional[CitationValidationResult]:
+        """Previously stored model verdict for this citation and style, if any"""
+        if self.cache is None:
+            return None
+        cached = self.cache.get("validate", style.name, citation)
+        if cached is None:
+            return None
+        self.validation_stats.record("cache")
+        return CitationValidationResult(**cached)
+
+    def validate_with_model(self, citation: str, style: CitationStyle) -> CitationValidationResult:
+        """Validate with the model and store the verdict"""
+        self.validation_stats.record("model")
         try:
-            prompt = f"""
-            Strictly Analyze the legal citation '{citation}' according to {style.value} rules.
-            
-            VALIDATION REQUIREMENTS:
-            1. Check citation format
-            2. Verify all required components are present
-            3. Identify any formatting errors
-            4. Consider jurisdiction-specific rules
-            
-            Output JSON format:
-            {{
-                "is_valid": boolean,
-                "error_details": [list of specific errors],
-                "suggested_correction": "corrected citation if needed",
-                "source_type": "case/statute/regulation/treaty",
-                "jurisdiction": "specific jurisdiction from the citation"
-            }}
-            """
-            
+            prompt = VALIDATION_PROMPT.format(citation=citation, style=style.value)
             response = self.model.generate_content(prompt)
             result = self._extract_validation_result(response.text, citation)
-            return CitationValidationResult(**result)
+            validation = CitationValidationResult(**result)
         
         except Exception as e:
             return CitationValidationResult(
                 is_valid=False, 
                 error_details=[f"Validation error: {str(e)}"]
             )
+        
+        # Unparseable replies are retried next time rather than remembered
+        if self.cache is not None and result.get("error_details") != [PARSE_FAILURE]:
+            self.cache.set("validate", style.name, citation, validation.to_dict())
+        return validation
 
     def hyperlink_citation(self, citation: str) -> str:
         """Generate hyperlink for citation"""
+        if self.cache is not None:
+            cached = self.cache.get("hyperlink", "", citation)
+            if cached is not None:
+                return cached
+        
         try:
-            prompt = f"""
-            For citation '{citation}':
-            1. Identify jurisdiction and court level
-            2. Generate direct public hyperlink
-            3. Return only the URL
-            """
-            
-            response = self.model.generate_content(prompt)
+            response = self.model.generate_content(HYPERLINK_PROMPT.format(citation=citation))
             urls = re.findall(r'https?://\S+', response.text)
-            return urls[0] if urls else 'No reliable hyperlink found'
         
         except Exception as e:
             return f"Hyperlink generation error: {str(e)}"
+        
+        if not urls:
+            return 'No reliable hyperlink found'
+        if self.cache is not None:
+            self.cache.set("hyperlink", "", citation, urls[0])
+        return urls[0]
 
     def reformat_citation(self, citation: str, source_style: CitationStyle, target_style: CitationStyle) -> str:
         """Reformat citation between styles"""
+        style_pair = f"{source_style.name}>{target_style.name}"
+        if self.cache is not None:
+            cached = self.cache.get("reformat", style_pair, citation)
+            if cached is not None:
+                return cached
+        
         try:
-            prompt = f"""
-            Reformat citation '{citation}' from {source_style.value} to {target_style.value}:
-            - Preserve source integrity
-            - Apply {target_style.value} formatting rules
-            - Maintain all critical case information
-            """
-            
+            prompt = REFORMAT_PROMPT.format(
+                citation=citation,
+                source_style=source_style.value,
+                target_style=target_style.value
+            )
             response = self.model.generate_content(prompt)
-            return response.text.strip()
+            reformatted = response.text.strip()
         
         except Exception as e:
             return f"Citation reformatting error: {str(e)}"
+        
+        if self.cache is not None and reformatted:
+            self.cache.set("reformat", style_pair, citation, reformatted)
+        return reformatted
 
     def _extract_validation_result(self, text: str, original_citation: str) -> dict:
         """Extract validation result from AI response"""
@@ -199,6 +281,6 @@ class LegalCitationProcessor:
         except Exception:
             return {
                 "is_valid": False,
-                "error_details": ["Failed to parse validation result"],
+                "error_details": [PARSE_FAILURE],
                 "suggested_correction": original_citation
             }
\ No newline at end of file
@@ -1,8 +1,14 @@
 import google.generativeai as genai
 import os
-from typing import Dict, List, Union
+import time
+import threading
+from typing import Dict, List, Optional, Union
 import logging
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, ACTIVITY_LIBRARY_PATH
+from activity_library import (
+    ActivityLibrary, TRIGGER_CATEGORIES, STRESS_BUCKETS, ENERGY_BUCKETS,
+    activity_key, stress_key, sleep_key, warm_order
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,10 +18,108 @@ logger = logging.getLogger(__name__)
 genai.configure(api_key=GEMINI_API_KEY)
 model = genai.GenerativeModel('gemini-pro')
 
+ACTIVITY_PROMPT = """
+            Create a mindful activity for someone who:
+            - Current mood: {mood}
+            - Energy level: {energy_level}/10
+            - Stress level: {stress_level}/10
+            - Has {time_available} minutes available
+            - Interests: {interests}
+
+            Format the response as a structured activity with:
+            1. A title
+            2. Clear step-by-step instructions
+            3. Expected benefits
+            4. Duration: {time_available} minutes
+            """
+
+STRESS_RELIEF_PROMPT = """
+            Create a quick stress relief practice for someone who:
+            - Is experiencing stress from: {stress_trigger}
+            - Current stress level: {stress_level}/10
+
+            Format as a short, practical exercise with:
+            1. Immediate action steps
+            2. Breathing technique
+            3. Positive affirmation
+            4. Duration: 2-5 minutes
+            """
+
+SLEEP_PROMPT = """
+            Create a bedtime practice for someone who:
+            - Reports {sleep_quality} sleep quality
+            - Has a stress level of {stress_level}/10
+
+            Format as a gentle routine with:
+            1. Pre-bed activities
+            2. Relaxation technique
+            3. Mindful breathing exercise
+            4. Duration: 5-10 minutes
+            """
+
+def _level_range(label: str, buckets) -> str:
+    _, low, high = next(bucket for bucket in buckets if bucket[0] == label)
+    return f"{low}-{high}"
+
+def prompt_for_key(key: str) -> str:
+    """Prompt that generates the library entry for a bucketed key."""
+    kind, *parts = key.split("|")
+    if kind == "activity":
+        mood, energy, stress, duration, interests = parts
+        return ACTIVITY_PROMPT.format(
+            mood=mood,
+            energy_level=_level_range(energy, ENERGY_BUCKETS),
+            stress_level=_level_range(stress, STRESS_BUCKETS),
+            time_available=duration,
+            interests=", ".join(interests.split("+"))
+        )
+    if kind == "stress":
+        category, stress = parts
+        return STRESS_RELIEF_PROMPT.format(
+            stress_trigger=TRIGGER_CATEGORIES[category][0],
+            stress_level=_level_range(stress, STRESS_BUCKETS)
+        )
+    sleep_quality, stress = parts
+    return SLEEP_PROMPT.format(sleep_quality=sleep_quality, stress_level=_level_range(stress, STRESS_BUCKETS))
+
 class MindfulnessActivityGenerator:
-    def __init__(self):
+    def __init__(self, library: Optional[ActivityLibrary] = None):
         """Initialize the activity generator."""
         self.model = model
+        self.library = library or ActivityLibrary(ACTIVITY_LIBRARY_PATH)
+
+    def _generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    def _from_library(self, key: str) -> str:
+        """Serve a bucketed request from the library, generating the entry on a miss."""
+        text = self.library.get(key)
+        if text is None:
+            text = self._generate(prompt_for_key(key))
+            self.library.put(key, text)
+        return text
+
+    def warm_library(self, limit: int = 200, interval: float = 1.0, stop: Optional[threading.Event] = None) -> int:
+        """
+        Generate up to ``limit`` missing library entries, most common inputs first.
+        Stops early after repeated model failures (e.g. no API key or quota exhausted).
+        """
+        generated = failures = 0
+        for key in warm_order():
+            if generated >= limit or failures >= 3 or (stop and stop.is_set()):
+                break
+            if key in self.library:
+                continue
+            try:
+                self.library.put(key, self._generate(prompt_for_key(key)))
+                generated += 1
+                failures = 0
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Could not pre-generate {key}: {str(e)}")
+            time.sleep(interval)
+        logger.info(f"Activity library warmed with {generated} new entries ({len(self.library)} total)")
+        return generated
         
     def generate_personalized_activity(
         self,
@@ -28,23 +132,18 @@ class MindfulnessActivityGenerator:
     ) -> Dict:
         """Generate a personalized mindfulness activity."""
         try:
-            prompt = f"""
-            Create a mindful activity for someone who:
-            - Current mood: {mood}
-            - Energy level: {energy_level}/10
-            - Stress level: {stress_level}/10
-            - Has {time_available} minutes available
-            - Interests: {', '.join(interests)}
-
-            Format the response as a structured activity with:
-            1. A title
-            2. Clear step-by-step instructions
-            3. Expected benefits
-            4. Duration: {time_available} minutes
-            """
-
-            response = self.model.generate_content(prompt)
-            activity_text = response.text
+            key = activity_key(mood, energy_level, stress_level, time_available, interests)
+            if key is not None:
+                activity_text = self._from_library(key)
+            else:
+                # Free-text mood or custom interests have no library bucket
+                activity_text = self._generate(ACTIVITY_PROMPT.format(
+                    mood=mood,
+                    energy_level=energy_level,
+                    stress_level=stress_level,
+                    time_available=time_available,
+                    interests=', '.join(interests)
+                ))
             
             return {
                 "text": activity_text,
@@ -84,20 +183,10 @@ Press Enter to start the practice...
     def generate_stress_relief_practice(self, stress_trigger: str, stress_level: int) -> str:
         """Generate a stress relief practice based on the trigger and level."""
         try:
-            prompt = f"""
-            Create a quick stress relief practice for someone who:
-            - Is experiencing stress from: {stress_trigger}
-            - Current stress level: {stress_level}/10
-
-            Format as a short, practical exercise with:
-            1. Immediate action steps
-            2. Breathing technique
-            3. Positive affirmation
-            4. Duration: 2-5 minutes
-            """
-
-            response = self.model.generate_content(prompt)
-            return response.text
+            key = stress_key(stress_trigger, stress_level)
+            if key is not None:
+                return self._from_library(key)
+            return self._generate(STRESS_RELIEF_PROMPT.format(stress_trigger=stress_trigger, stress_level=stress_level))
             
         except Exception as e:
             logger.error(f"Error generating stress relief practice: {str(e)}")
@@ -114,20 +203,10 @@ Quick Stress Relief Practice (2-5 minutes):
     def generate_sleep_recommendation(self, sleep_quality: str, stress_level: int) -> str:
         """Generate sleep practice recommendations."""
         try:
-            prompt = f"""
-            Create a bedtime practice for someone who:
-            - Reports {sleep_quality} sleep quality
-            - Has a stress level of {stress_level}/10
-
-            Format as a gentle routine with:
-            1. Pre-bed activities
-            2. Relaxation technique
-            3. Mindful breathing exercise
-            4. Duration: 5-10 minutes
-            """
-
-            response = self.model.generate_content(prompt)
-            return response.text
+            key = sleep_key(sleep_quality, stress_level)
+            if key is not None:
+                return self._from_library(key)
+            return self._generate(SLEEP_PROMPT.format(sleep_quality=sleep_quality, stress_level=stress_level))
             
         except Exception as e:
             logger.error(f"Error generating sleep recommendation: {str(e)}")
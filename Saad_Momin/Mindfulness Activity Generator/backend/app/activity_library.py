@@ -0,0 +1,173 @@
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Discrete inputs offered by the frontend, most common first
+MOODS = ["Neutral", "Low", "Good", "Very Low", "Excellent"]
+DURATIONS = [10, 5, 15, 20, 30, 45, 60]
+INTERESTS = ["Meditation", "Breathing", "Yoga", "Nature", "Walking", "Body Scan", "Music", "Reading", "Journaling", "Art"]
+SLEEP_QUALITIES = ["Fair", "Poor", "Good", "Excellent"]
+
+# (label, lowest level, highest level) on the 1-10 scales
+STRESS_BUCKETS = [("moderate", 4, 6), ("high", 7, 8), ("low", 1, 3), ("severe", 9, 10)]
+ENERGY_BUCKETS = [("medium", 4, 7), ("low", 1, 3), ("high", 8, 10)]
+
+# Stress trigger categories and the words that map free text onto them
+TRIGGER_CATEGORIES = {
+    "general": ("general everyday pressure", ()),
+    "work": ("work, deadlines and career pressure",
+             ("work", "job", "boss", "deadline", "meeting", "office", "career", "colleague", "coworker", "project")),
+    "study": ("exams and studies",
+              ("exam", "school", "study", "studies", "test", "homework", "class", "college", "university", "assignment")),
+    "relationships": ("relationships and family",
+                      ("partner", "family", "friend", "relationship", "argument", "breakup", "marriage", "kids", "parent")),
+    "health": ("health worries",
+               ("health", "sick", "pain", "illness", "doctor", "hospital", "injury", "diagnosis")),
+    "finances": ("money and finances",
+                 ("money", "bill", "bills", "debt", "rent", "finance", "finances", "loan", "salary", "budget")),
+    "social": ("social situations",
+               ("social", "party", "public speaking", "presentation", "crowd", "interview", "people")),
+}
+
+
+def _bucket(level: int, buckets: List[Tuple[str, int, int]]) -> Tuple[str, int, int]:
+    level = min(max(int(level), 1), 10)
+    return next(bucket for bucket in buckets if bucket[1] <= level <= bucket[2])
+
+
+def stress_bucket(level: int) -> Tuple[str, int, int]:
+    return _bucket(level, STRESS_BUCKETS)
+
+
+def energy_bucket(level: int) -> Tuple[str, int, int]:
+    return _bucket(level, ENERGY_BUCKETS)
+
+
+def duration_bucket(minutes: int) -> int:
+    """Nearest duration option offered by the frontend."""
+    return min(DURATIONS, key=lambda option: (abs(option - minutes), option))
+
+
+def trigger_category(trigger: Optional[str]) -> Optional[str]:
+    """Category for a stress trigger, or None when free text matches no category."""
+    text = (trigger or "").strip().lower()
+    if not text:
+        return "general"
+    for category, (_, keywords) in TRIGGER_CATEGORIES.items():
+        if any(re.search(rf"\b{re.escape(keyword)}", text) for keyword in keywords):
+            return category
+    return None
+
+
+def activity_key(mood: str, energy_level: int, stress_level: int, time_available: int,
+                 interests: List[str]) -> Optional[str]:
+    """
+    Library key for a personalized activity, or None when the request contains
+    free text (an unknown mood or a custom interest) that has no bucket.
+    Every selected interest is part of the key, in a fixed order.
+    """
+    if mood not in MOODS or any(interest not in INTERESTS for interest in interests):
+        return None
+    selected = "+".join(sorted(set(interests))) if interests else "Meditation"
+    return "|".join([
+        "activity", mood, energy_bucket(energy_level)[0], stress_bucket(stress_level)[0],
+        str(duration_bucket(time_available)), selected
+    ])
+
+
+def stress_key(stress_trigger: str, stress_level: int) -> Optional[str]:
+    category = trigger_category(stress_trigger)
+    if category is None:
+        return None
+    return f"stress|{category}|{stress_bucket(stress_level)[0]}"
+
+
+def sleep_key(sleep_quality: str, stress_level: int) -> Optional[str]:
+    if sleep_quality not in SLEEP_QUALITIES:
+        return None
+    return f"sleep|{sleep_quality}|{stress_bucket(stress_level)[0]}"
+
+
+def warm_order() -> Iterator[str]:
+    """Every library key, the most commonly requested combinations first."""
+    for quality, stress in itertools.product(SLEEP_QUALITIES, STRESS_BUCKETS):
+        yield f"sleep|{quality}|{stress[0]}"
+    for category, stress in itertools.product(TRIGGER_CATEGORIES, STRESS_BUCKETS):
+        yield f"stress|{category}|{stress[0]}"
+
+    options = [MOODS, ENERGY_BUCKETS, STRESS_BUCKETS, DURATIONS, INTERESTS]
+    combinations = itertools.product(*[list(enumerate(values)) for values in options])
+    for combination in sorted(combinations, key=lambda combo: sum(rank for rank, _ in combo)):
+        mood, energy, stress, duration, interest = (value for _, value in combination)
+        yield "|".join(["activity", mood, energy[0], stress[0], str(duration), interest])
+
+
+class ActivityLibrary:
+    """
+    Pre-generated practices keyed by bucketed inputs, persisted as JSON Lines.
+
+    Reads are dictionary lookups. Each new entry is appended to the file as one
+    line, so a restart keeps everything generated so far without rewriting the
+    whole library; a later line for the same key wins.
+    """
+
+    def __init__(self, path: str = "activity_library.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    lines = f.readlines()
+                if lines and not lines[-1].endswith("\n"):
+                    # Start the next entry on a fresh line after a partial one
+                    with open(path, "a") as f:
+                        f.write("\n")
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry["text"]
+                    except (ValueError, KeyError, TypeError):
+                        # e.g. a line cut short by a crash mid-write
+                        continue
+            except OSError as e:
+                logger.warning(f"Ignoring unreadable activity library {path}: {e}")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return text
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._entries[key] = text
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"key": key, "text": text}) + "\n")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
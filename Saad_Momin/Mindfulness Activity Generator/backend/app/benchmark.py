@@ -0,0 +1,106 @@
+"""
+Load benchmark for the Database layer.
+
+Simulates concurrent users hitting the hot paths (stats, routines, mood data)
+with a share of activity completions mixed in, and reports throughput and
+latency percentiles per operation. Runs against a throwaway database file.
+
+    python benchmark.py --users 32 --requests 200 --pool-size 4
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from database import Database
+
+
+def seed(db: Database, users: int, days: int):
+    """Give every user a practice history, routines and mood entries."""
+    with db.pool.connection() as conn, conn:
+        for user_id in range(1, users + 1):
+            conn.executemany(
+                "INSERT INTO practice_history (user_id, duration, completed_at) "
+                "VALUES (?, ?, datetime('now', ?))",
+                [(user_id, random.randint(5, 30), f'-{day} days') for day in range(days)]
+            )
+            conn.executemany(
+                "INSERT INTO mood_tracker (user_id, mood, energy_level, stress_level, recorded_at) "
+                "VALUES (?, 'Calm', 5, 5, datetime('now', ?))",
+                [(user_id, f'-{day} days') for day in range(30)]
+            )
+            conn.executemany(
+                "INSERT INTO user_routines (user_id, name, steps, duration) VALUES (?, ?, '[]', 10)",
+                [(user_id, f'Routine {n}') for n in range(5)]
+            )
+    db.rebuild_stats()
+
+
+def simulate_user(db: Database, user_id: int, requests: int, write_ratio: float):
+    timings = defaultdict(list)
+    for _ in range(requests):
+        if random.random() < write_ratio:
+            operation = 'complete_activity'
+            started = time.perf_counter()
+            activity_id = db.save_activity(user_id, {'text': 'Breathe', 'duration': 10})
+            db.complete_activity(user_id, activity_id)
+        else:
+            operation = random.choice(['get_user_stats', 'get_user_routines', 'get_mood_data'])
+            started = time.perf_counter()
+            getattr(db, operation)(user_id)
+        timings[operation].append(time.perf_counter() - started)
+    return timings
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=32, help='concurrent simulated users')
+    parser.add_argument('--requests', type=int, default=200, help='requests per user')
+    parser.add_argument('--pool-size', type=int, default=4, help='database connections')
+    parser.add_argument('--history-days', type=int, default=365, help='seeded practice days per user')
+    parser.add_argument('--write-ratio', type=float, default=0.1, help='share of requests that complete an activity')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'benchmark.db'), pool_size=args.pool_size)
+        seed(db, args.users, args.history_days)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as executor:
+            results = list(executor.map(
+                lambda user_id: simulate_user(db, user_id, args.requests, args.write_ratio),
+                range(1, args.users + 1)
+            ))
+        elapsed = time.perf_counter() - started
+        db.pool.close()
+
+    timings = defaultdict(list)
+    for result in results:
+        for operation, values in result.items():
+            timings[operation].extend(values)
+
+    total = sum(len(values) for values in timings.values())
+    print(f"{args.users} users x {args.requests} requests, pool size {args.pool_size}")
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:,.0f} req/s)\n")
+    print(f"{'operation':<20}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for operation, values in sorted(timings.items()):
+        print(
+            f"{operation:<20}{len(values):>8}"
+            f"{statistics.mean(values) * 1000:>10.2f}"
+            f"{percentile(values, 0.50) * 1000:>10.2f}"
+            f"{percentile(values, 0.95) * 1000:>10.2f}"
+            f"{percentile(values, 0.99) * 1000:>10.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -15,4 +15,9 @@ logger = logging.getLogger(__name__)
 # Gemini API configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 if not GEMINI_API_KEY:
-    logger.warning("GEMINI_API_KEY not found in environment variables. Some features may not work.") 
\ No newline at end of file
+    logger.warning("GEMINI_API_KEY not found in environment variables. Some features may not work.")
+
+# Pre-generated activity library
+ACTIVITY_LIBRARY_PATH = os.getenv('ACTIVITY_LIBRARY_PATH', 'activity_library.jsonl')
+ACTIVITY_WARM_LIMIT = int(os.getenv('ACTIVITY_WARM_LIMIT', '200'))
+ACTIVITY_WARM_INTERVAL = float(os.getenv('ACTIVITY_WARM_INTERVAL', '1.0'))
@@ -1,26 +1,132 @@
+import os
+import queue
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import json
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, Iterator, List
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Hot read queries. sqlite3 keeps compiled statements per connection keyed by the
+# SQL text, so with long-lived pooled connections each is prepared only once.
+USER_STATS_QUERY = '''
+    SELECT total_minutes, current_streak, last_practice_date
+    FROM user_stats
+    WHERE user_id = ?
+'''
+
+TODAY_MINUTES_QUERY = '''
+    SELECT total_minutes
+    FROM daily_practice
+    WHERE user_id = ? AND practice_date = ?
+'''
+
+MONTHLY_PROGRESS_QUERY = '''
+    SELECT practice_date, total_minutes
+    FROM daily_practice
+    WHERE user_id = ?
+    AND practice_date >= date(?, '-30 days')
+    ORDER BY practice_date
+'''
+
+USER_ROUTINES_QUERY = '''
+    SELECT id, name, steps, duration, category, description,
+           created_at, last_practiced, practice_count
+    FROM user_routines
+    WHERE user_id = ?
+    ORDER BY created_at DESC
+'''
+
+MOOD_DATA_QUERY = '''
+    SELECT mood, energy_level, stress_level, recorded_at
+    FROM mood_tracker
+    WHERE user_id = ?
+    AND recorded_at >= date('now', ?)
+    ORDER BY recorded_at
+'''
+
+# Dummy parameters used to compile each hot query on every pooled connection
+HOT_QUERIES = [
+    (USER_STATS_QUERY, (-1,)),
+    (TODAY_MINUTES_QUERY, (-1, '1970-01-01')),
+    (MONTHLY_PROGRESS_QUERY, (-1, '1970-01-01')),
+    (USER_ROUTINES_QUERY, (-1,)),
+    (MOOD_DATA_QUERY, (-1, '-0 days')),
+]
+
+class ConnectionPool:
+    """
+    Fixed set of WAL-mode SQLite connections handed out one request at a time.
+
+    WAL lets readers proceed while a writer commits; writers wait on each other
+    for up to ``busy_timeout`` seconds instead of failing with "database is locked".
+    """
+
+    def __init__(self, path: str, size: int = 4, busy_timeout: float = 5.0):
+        self.path = path
+        self.size = size
+        self._idle: queue.Queue = queue.Queue(maxsize=size)
+        self._all: List[sqlite3.Connection] = []
+        for _ in range(size):
+            conn = self._connect(busy_timeout)
+            self._all.append(conn)
+            self._idle.put(conn)
+
+    def _connect(self, busy_timeout: float) -> sqlite3.Connection:
+        # Connections move between worker threads, but only one thread uses each at a time
+        conn = sqlite3.connect(
+            self.path, timeout=busy_timeout, check_same_thread=False, cached_statements=256
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def prepare(self, statements) -> None:
+        """Compile the given statements on every connection (call at startup)."""
+        conns = [self._idle.get() for _ in range(self.size)]
+        try:
+            for conn in conns:
+                for sql, params in statements:
+                    conn.execute(sql, params).fetchall()
+        finally:
+            for conn in conns:
+                self._idle.put(conn)
+
+    def close(self) -> None:
+        for conn in self._all:
+            conn.close()
+
 class Database:
-    def __init__(self):
+    def __init__(self, path: str = None, pool_size: int = None):
         """Initialize database and create tables if they don't exist."""
         try:
             # Connect to database without deleting it
-            self.conn = sqlite3.connect('mindfulness.db', check_same_thread=False)
+            self.path = path or os.getenv('DATABASE_PATH', 'mindfulness.db')
+            self.pool = ConnectionPool(self.path, pool_size or int(os.getenv('DB_POOL_SIZE', '4')))
             self.create_tables()
             
             # Initialize default user only if users table is empty
-            cursor = self.conn.execute('SELECT COUNT(*) FROM users')
-            if cursor.fetchone()[0] == 0:
+            with self.pool.connection() as conn:
+                user_count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+            if user_count == 0:
                 self._initialize_default_data()
+            
+            self.pool.prepare(HOT_QUERIES)
                 
         except Exception as e:
             logger.error(f"Database initialization error: {str(e)}")
@@ -29,9 +135,9 @@ class Database:
     def _initialize_default_data(self):
         """Initialize default user and sample data."""
         try:
-            with self.conn:
+            with self.pool.connection() as conn, conn:
                 # Create default user if not exists
-                self.conn.execute('''
+                conn.execute('''
                     INSERT OR IGNORE INTO users (id, name, age, stress_level, interests)
                     VALUES (1, 'Guest', 25, 'Moderate', '["Meditation"]')
                 ''')
@@ -42,9 +148,9 @@ class Database:
     def create_tables(self):
         """Create necessary database tables if they don't exist."""
         try:
-            with self.conn:
+            with self.pool.connection() as conn, conn:
                 # Users table with enhanced settings and goals
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS users (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         name TEXT,
@@ -66,7 +172,7 @@ class Database:
                 ''')
                 
                 # Activities table with enhanced tracking
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS activities (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         user_id INTEGER,
@@ -88,7 +194,7 @@ class Database:
                 ''')
                 
                 # Mood tracking table
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS mood_tracker (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         user_id INTEGER,
@@ -102,7 +208,7 @@ class Database:
                 ''')
                 
                 # User routines table
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS user_routines (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         user_id INTEGER,
@@ -119,7 +225,7 @@ class Database:
                 ''')
                 
                 # Practice history
-                self.conn.execute('''
+                conn.execute('''
                     CREATE TABLE IF NOT EXISTS practice_history (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         user_id INTEGER,
@@ -135,55 +241,115 @@ class Database:
                         FOREIGN KEY (routine_id) REFERENCES user_routines(id)
                     )
                 ''')
+
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_practice_history_user_completed
+                    ON practice_history (user_id, completed_at)
+                ''')
+
+                # Minutes and sessions per user per day, maintained by complete_activity
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS daily_practice (
+                        user_id INTEGER NOT NULL,
+                        practice_date TEXT NOT NULL,
+                        total_minutes INTEGER DEFAULT 0,
+                        sessions INTEGER DEFAULT 0,
+                        PRIMARY KEY (user_id, practice_date),
+                        FOREIGN KEY (user_id) REFERENCES users(id)
+                    )
+                ''')
+
+                # Running totals; current_streak counts consecutive days ending at last_practice_date
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS user_stats (
+                        user_id INTEGER PRIMARY KEY,
+                        total_minutes INTEGER DEFAULT 0,
+                        current_streak INTEGER DEFAULT 0,
+                        last_practice_date TEXT,
+                        FOREIGN KEY (user_id) REFERENCES users(id)
+                    )
+                ''')
+
+            # Databases created before the rollup tables existed are backfilled once
+            with self.pool.connection() as conn:
+                has_history = conn.execute('SELECT 1 FROM practice_history LIMIT 1').fetchone()
+                has_stats = conn.execute('SELECT 1 FROM user_stats LIMIT 1').fetchone()
+            if has_history and not has_stats:
+                self.rebuild_stats()
         except Exception as e:
             logger.error(f"Error creating tables: {str(e)}")
             raise
 
+    def rebuild_stats(self):
+        """Recompute the daily rollup and cached totals from the full practice history."""
+        try:
+            with self.pool.connection() as conn, conn:
+                conn.execute('DELETE FROM daily_practice')
+                conn.execute('DELETE FROM user_stats')
+                conn.execute('''
+                    INSERT INTO daily_practice (user_id, practice_date, total_minutes, sessions)
+                    SELECT user_id, date(completed_at), COALESCE(SUM(duration), 0), COUNT(*)
+                    FROM practice_history
+                    WHERE completed_at IS NOT NULL
+                    GROUP BY user_id, date(completed_at)
+                ''')
+
+                rows = conn.execute('''
+                    SELECT user_id, practice_date, total_minutes
+                    FROM daily_practice
+                    ORDER BY user_id, practice_date DESC
+                ''').fetchall()
+
+                # Walk each user's days newest first; the streak ends at the first gap
+                stats = {}
+                for user_id, practice_date, minutes in rows:
+                    day = datetime.strptime(practice_date, '%Y-%m-%d').date()
+                    entry = stats.get(user_id)
+                    if entry is None:
+                        stats[user_id] = entry = {'total': 0, 'streak': 1, 'last': practice_date, 'counting': True}
+                    elif entry['counting'] and day == entry['expected']:
+                        entry['streak'] += 1
+                    else:
+                        entry['counting'] = False
+                    entry['expected'] = day - timedelta(days=1)
+                    entry['total'] += minutes
+
+                conn.executemany(
+                    'INSERT INTO user_stats (user_id, total_minutes, current_streak, last_practice_date) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(user_id, e['total'], e['streak'], e['last']) for user_id, e in stats.items()]
+                )
+        except Exception as e:
+            logger.error(f"Error rebuilding stats: {str(e)}")
+            raise
+
     def get_user_stats(self, user_id: int) -> Dict:
-        """Get user's statistics and progress."""
+        """Get user's statistics and progress from the maintained rollups."""
         try:
-            # Get previous total minutes (before today)
-            previous_total = self.conn.execute('''
-                SELECT COALESCE(SUM(duration), 0)
-                FROM practice_history
-                WHERE user_id = ? 
-                AND date(completed_at) < date('now')
-            ''', (user_id,)).fetchone()[0]
-
-            # Get today's total minutes
-            today_total = self.conn.execute('''
-                SELECT COALESCE(SUM(duration), 0)
-                FROM practice_history
-                WHERE user_id = ? 
-                AND date(completed_at) = date('now')
-            ''', (user_id,)).fetchone()[0]
-
-            # Calculate streak
-            streak = self.calculate_streak(user_id)
-            
-            # Get monthly progress
-            monthly_progress = self.conn.execute('''
-                SELECT date(completed_at) as practice_date,
-                       SUM(duration) as total_minutes
-                FROM practice_history
-                WHERE user_id = ?
-                AND completed_at >= date('now', '-30 days')
-                GROUP BY date(completed_at)
-                ORDER BY practice_date
-            ''', (user_id,)).fetchall()
-            
-            progress_data = [
-                {"date": row[0], "minutes": row[1]}
-                for row in monthly_progress
-            ]
-            
-            return {
-                "total_minutes": previous_total + today_total,
-                "previous_total": previous_total,
-                "today_total": today_total,
-                "current_streak": streak,
-                "monthly_progress": progress_data
-            }
+            with self.pool.connection() as conn:
+                today = _utc_today()
+                stats = conn.execute(USER_STATS_QUERY, (user_id,)).fetchone()
+                total_minutes, streak, last_practice = stats or (0, 0, None)
+
+                # Get today's total minutes
+                today_row = conn.execute(TODAY_MINUTES_QUERY, (user_id, today)).fetchone()
+                today_total = today_row[0] if today_row else 0
+
+                # Get monthly progress (a primary-key range of at most 31 rows)
+                monthly_progress = conn.execute(MONTHLY_PROGRESS_QUERY, (user_id, today)).fetchall()
+                
+                progress_data = [
+                    {"date": row[0], "minutes": row[1]}
+                    for row in monthly_progress
+                ]
+                
+                return {
+                    "total_minutes": total_minutes,
+                    "previous_total": total_minutes - today_total,
+                    "today_total": today_total,
+                    "current_streak": _live_streak(streak, last_practice, today),
+                    "monthly_progress": progress_data
+                }
         except Exception as e:
             logger.error(f"Error getting user stats: {str(e)}")
             return {
@@ -195,41 +361,14 @@ class Database:
             }
 
     def calculate_streak(self, user_id: int) -> int:
-        """Calculate current streak of consecutive days with completed activities."""
+        """Current streak of consecutive days with completed activities."""
         try:
-            # Get all practice dates in reverse order
-            dates = self.conn.execute('''
-                SELECT DISTINCT date(completed_at) as practice_date
-                FROM practice_history
-                WHERE user_id = ?
-                ORDER BY practice_date DESC
-            ''', (user_id,)).fetchall()
-            
-            if not dates:
-                return 0
-            
-            from datetime import datetime, timedelta
-            
-            streak = 0
-            current_date = datetime.now().date()
-            
-            for date_row in dates:
-                practice_date = datetime.strptime(date_row[0], '%Y-%m-%d').date()
-                
-                # If this is the first date we're checking
-                if streak == 0:
-                    # If the last practice was today or yesterday, start counting
-                    if practice_date >= current_date - timedelta(days=1):
-                        streak = 1
-                    else:
-                        return 0
-                # For subsequent dates
-                elif practice_date == current_date - timedelta(days=streak):
-                    streak += 1
-                else:
-                    break
-                
-            return streak
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    'SELECT current_streak, last_practice_date FROM user_stats WHERE user_id = ?',
+                    (user_id,)
+                ).fetchone()
+                return _live_streak(row[0], row[1], _utc_today()) if row else 0
         except Exception as e:
             logger.error(f"Error calculating streak: {str(e)}")
             return 0
@@ -237,18 +376,19 @@ class Database:
     def get_monthly_progress(self, user_id: int) -> List[Dict]:
         """Get user's monthly progress data."""
         try:
-            cursor = self.conn.execute('''
-                SELECT date(completed_at) as date,
-                       SUM(duration) as total_minutes
-                FROM activities
-                WHERE user_id = ?
-                AND completed = 1
-                AND completed_at >= date('now', '-30 days')
-                GROUP BY date(completed_at)
-                ORDER BY date(completed_at)
-            ''', (user_id,))
-            
-            return [{"date": row[0], "minutes": row[1]} for row in cursor.fetchall()]
+            with self.pool.connection() as conn:
+                cursor = conn.execute('''
+                    SELECT date(completed_at) as date,
+                           SUM(duration) as total_minutes
+                    FROM activities
+                    WHERE user_id = ?
+                    AND completed = 1
+                    AND completed_at >= date('now', '-30 days')
+                    GROUP BY date(completed_at)
+                    ORDER BY date(completed_at)
+                ''', (user_id,))
+                
+                return [{"date": row[0], "minutes": row[1]} for row in cursor.fetchall()]
         except Exception as e:
             logger.error(f"Error getting monthly progress: {str(e)}")
             return []
@@ -256,21 +396,22 @@ class Database:
     def save_activity(self, user_id: int, activity_data: Dict) -> int:
         """Save a new activity."""
         try:
-            cursor = self.conn.execute('''
-                INSERT INTO activities (
-                    user_id, activity_text, category, duration,
-                    mood_before, scheduled_for, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (
-                user_id,
-                activity_data.get('text'),
-                activity_data.get('category'),
-                activity_data.get('duration'),
-                activity_data.get('mood_before'),
-                activity_data.get('scheduled_for')
-            ))
-            self.conn.commit()
-            return cursor.lastrowid
+            with self.pool.connection() as conn:
+                cursor = conn.execute('''
+                    INSERT INTO activities (
+                        user_id, activity_text, category, duration,
+                        mood_before, scheduled_for, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (
+                    user_id,
+                    activity_data.get('text'),
+                    activity_data.get('category'),
+                    activity_data.get('duration'),
+                    activity_data.get('mood_before'),
+                    activity_data.get('scheduled_for')
+                ))
+                conn.commit()
+                return cursor.lastrowid
         except Exception as e:
             logger.error(f"Error saving activity: {str(e)}")
             raise
@@ -278,35 +419,30 @@ class Database:
     def get_user_routines(self, user_id: int) -> List[Dict]:
         """Get user's saved routines."""
         try:
-            cursor = self.conn.execute('''
-                SELECT id, name, steps, duration, category, description,
-                       created_at, last_practiced, practice_count
-                FROM user_routines
-                WHERE user_id = ?
-                ORDER BY created_at DESC
-            ''', (user_id,))
-            
-            routines = []
-            for row in cursor.fetchall():
-                try:
-                    steps = json.loads(row[2]) if row[2] else []
-                except json.JSONDecodeError:
-                    steps = row[2].split('\n') if row[2] else []
+            with self.pool.connection() as conn:
+                cursor = conn.execute(USER_ROUTINES_QUERY, (user_id,))
                 
-                routine = {
-                    'id': row[0],
-                    'name': row[1],
-                    'steps': steps,
-                    'duration': row[3],
-                    'category': row[4] or 'Custom',
-                    'description': row[5] or '',
-                    'created_at': row[6],
-                    'last_practiced': row[7],
-                    'practice_count': row[8] or 0
-                }
-                routines.append(routine)
-            
-            return routines
+                routines = []
+                for row in cursor.fetchall():
+                    try:
+                        steps = json.loads(row[2]) if row[2] else []
+                    except json.JSONDecodeError:
+                        steps = row[2].split('\n') if row[2] else []
+                
+                    routine = {
+                        'id': row[0],
+                        'name': row[1],
+                        'steps': steps,
+                        'duration': row[3],
+                        'category': row[4] or 'Custom',
+                        'description': row[5] or '',
+                        'created_at': row[6],
+                        'last_practiced': row[7],
+                        'practice_count': row[8] or 0
+                    }
+                    routines.append(routine)
+                
+                return routines
         except Exception as e:
             logger.error(f"Error getting user routines: {str(e)}")
             return []
@@ -314,21 +450,22 @@ class Database:
     def save_routine(self, user_id: int, routine: Dict):
         """Save a new routine."""
         try:
-            steps_json = json.dumps(routine['steps'])
-            self.conn.execute('''
-                INSERT INTO user_routines (
-                    user_id, name, steps, duration, category,
-                    description, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (
-                user_id,
-                routine['name'],
-                steps_json,
-                routine['duration'],
-                routine.get('category', 'Custom'),
-                routine.get('description', '')
-            ))
-            self.conn.commit()
+            with self.pool.connection() as conn:
+                steps_json = json.dumps(routine['steps'])
+                conn.execute('''
+                    INSERT INTO user_routines (
+                        user_id, name, steps, duration, category,
+                        description, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (
+                    user_id,
+                    routine['name'],
+                    steps_json,
+                    routine['duration'],
+                    routine.get('category', 'Custom'),
+                    routine.get('description', '')
+                ))
+                conn.commit()
         except Exception as e:
             logger.error(f"Error saving routine: {str(e)}")
             raise
@@ -336,50 +473,87 @@ class Database:
     def get_mood_data(self, user_id: int, days: int = 30) -> Dict:
         """Get user's mood tracking data."""
         try:
-            cursor = self.conn.execute('''
-                SELECT mood, energy_level, stress_level, recorded_at
-                FROM mood_tracker
-                WHERE user_id = ?
-                AND recorded_at >= date('now', ?)
-                ORDER BY recorded_at
-            ''', (user_id, f'-{days} days'))
-            
-            data = cursor.fetchall()
-            return {
-                'moods': [row[0] for row in data],
-                'energy_levels': [row[1] for row in data],
-                'stress_levels': [row[2] for row in data],
-                'dates': [row[3] for row in data]
-            }
+            with self.pool.connection() as conn:
+                cursor = conn.execute(MOOD_DATA_QUERY, (user_id, f'-{days} days'))
+                
+                data = cursor.fetchall()
+                return {
+                    'moods': [row[0] for row in data],
+                    'energy_levels': [row[1] for row in data],
+                    'stress_levels': [row[2] for row in data],
+                    'dates': [row[3] for row in data]
+                }
         except Exception as e:
             logger.error(f"Error getting mood data: {str(e)}")
             return {'moods': [], 'energy_levels': [], 'stress_levels': [], 'dates': []} 
 
     def complete_activity(self, user_id: int, activity_id: int, mood_after: str = None) -> bool:
-        """Mark an activity as completed."""
+        """Mark an activity as completed and update the stats rollups."""
         try:
-            self.conn.execute('''
-                UPDATE activities
-                SET completed = TRUE,
-                    completed_at = CURRENT_TIMESTAMP,
-                    mood_after = ?
-                WHERE id = ? AND user_id = ?
-            ''', (mood_after, activity_id, user_id))
-            
-            # Also record in practice history
-            self.conn.execute('''
-                INSERT INTO practice_history (
-                    user_id, activity_id, duration, completed_at,
-                    mood_before, mood_after
-                )
-                SELECT user_id, id, duration, CURRENT_TIMESTAMP,
-                       mood_before, ?
-                FROM activities
-                WHERE id = ? AND user_id = ?
-            ''', (mood_after, activity_id, user_id))
-            
-            self.conn.commit()
+            with self.pool.connection() as conn, conn:
+                conn.execute('''
+                    UPDATE activities
+                    SET completed = TRUE,
+                        completed_at = CURRENT_TIMESTAMP,
+                        mood_after = ?
+                    WHERE id = ? AND user_id = ?
+                ''', (mood_after, activity_id, user_id))
+                
+                # Also record in practice history
+                cursor = conn.execute('''
+                    INSERT INTO practice_history (
+                        user_id, activity_id, duration, completed_at,
+                        mood_before, mood_after
+                    )
+                    SELECT user_id, id, duration, CURRENT_TIMESTAMP,
+                           mood_before, ?
+                    FROM activities
+                    WHERE id = ? AND user_id = ?
+                ''', (mood_after, activity_id, user_id))
+                
+                if cursor.rowcount:
+                    duration = conn.execute(
+                        'SELECT COALESCE(duration, 0) FROM activities WHERE id = ?', (activity_id,)
+                    ).fetchone()[0]
+                    self._record_practice(conn, user_id, duration)
             return True
         except Exception as e:
             logger.error(f"Error completing activity: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+
+    def _record_practice(self, conn: sqlite3.Connection, user_id: int, duration: int):
+        """Add one session to today's rollup and advance the cached total and streak."""
+        today = _utc_today()
+        yesterday = (datetime.strptime(today, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        conn.execute('''
+            INSERT INTO daily_practice (user_id, practice_date, total_minutes, sessions)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT (user_id, practice_date) DO UPDATE SET
+                total_minutes = total_minutes + excluded.total_minutes,
+                sessions = sessions + 1
+        ''', (user_id, today, duration))
+        conn.execute('''
+            INSERT INTO user_stats (user_id, total_minutes, current_streak, last_practice_date)
+            VALUES (?, ?, 1, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_minutes = total_minutes + excluded.total_minutes,
+                current_streak = CASE
+                    WHEN last_practice_date = excluded.last_practice_date THEN current_streak
+                    WHEN last_practice_date = ? THEN current_streak + 1
+                    ELSE 1
+                END,
+                last_practice_date = excluded.last_practice_date
+        ''', (user_id, duration, today, yesterday))
+
+
+def _utc_today() -> str:
+    # Same calendar as date(CURRENT_TIMESTAMP), which SQLite evaluates in UTC
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+
+def _live_streak(streak: int, last_practice: str, today: str) -> int:
+    """A cached streak only counts while the last practice was today or yesterday."""
+    if not last_practice:
+        return 0
+    gap = (datetime.strptime(today, '%Y-%m-%d') - datetime.strptime(last_practice, '%Y-%m-%d')).days
+    return streak if gap <= 1 else 0
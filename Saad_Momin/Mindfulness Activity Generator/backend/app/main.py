@@ -1,7 +1,9 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
+import asyncio
 import json
+import threading
 from datetime import datetime
 
 from database import Database
@@ -11,6 +13,7 @@ from models import (
     MoodData, UserStats, UserProfile
 )
 from activity_generator import MindfulnessActivityGenerator
+from config import ACTIVITY_WARM_LIMIT, ACTIVITY_WARM_INTERVAL
 
 app = FastAPI(title="Mindful Moments API")
 
@@ -23,9 +26,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database and activity generator
+# Initialize database and activity generator.
+# Database calls run in worker threads, each on its own pooled connection.
 db = Database()
 generator = MindfulnessActivityGenerator()
+warm_stop = threading.Event()
+
+@app.on_event("startup")
+async def warm_activity_library():
+    # Pre-generate common practices in the background; requests are served meanwhile
+    threading.Thread(
+        target=generator.warm_library,
+        kwargs={"limit": ACTIVITY_WARM_LIMIT, "interval": ACTIVITY_WARM_INTERVAL, "stop": warm_stop},
+        daemon=True
+    ).start()
+
+@app.on_event("shutdown")
+async def stop_warming():
+    warm_stop.set()
 
 @app.get("/")
 async def root():
@@ -33,11 +51,11 @@ async def root():
 
 @app.get("/users/{user_id}/stats", response_model=UserStats)
 async def get_user_stats(user_id: int):
-    return db.get_user_stats(user_id)
+    return await asyncio.to_thread(db.get_user_stats, user_id)
 
 @app.get("/users/{user_id}/routines", response_model=List[Routine])
 async def get_user_routines(user_id: int):
-    routines = db.get_user_routines(user_id)
+    routines = await asyncio.to_thread(db.get_user_routines, user_id)
     # Add user_id to each routine
     for routine in routines:
         routine['user_id'] = user_id
@@ -47,7 +65,7 @@ async def get_user_routines(user_id: int):
 async def create_routine(user_id: int, routine: RoutineCreate):
     routine_dict = routine.dict()
     routine_dict['user_id'] = user_id
-    db.save_routine(user_id, routine_dict)
+    await asyncio.to_thread(db.save_routine, user_id, routine_dict)
     return {
         **routine_dict,
         "id": 1,
@@ -59,7 +77,7 @@ async def create_routine(user_id: int, routine: RoutineCreate):
 
 @app.get("/users/{user_id}/mood", response_model=dict)
 async def get_mood_data(user_id: int, days: Optional[int] = 30):
-    return db.get_mood_data(user_id, days)
+    return await asyncio.to_thread(db.get_mood_data, user_id, days)
 
 @app.post("/users/{user_id}/mood")
 async def record_mood(user_id: int, mood_data: MoodData):
@@ -69,7 +87,7 @@ async def record_mood(user_id: int, mood_data: MoodData):
 @app.post("/users/{user_id}/activities", response_model=Activity)
 async def create_activity(user_id: int, activity: ActivityCreate):
     activity_dict = activity.dict()
-    activity_id = db.save_activity(user_id, activity_dict)
+    activity_id = await asyncio.to_thread(db.save_activity, user_id, activity_dict)
     return {
         **activity_dict,
         "id": activity_id,
@@ -87,7 +105,7 @@ async def generate_activity(
     interests: str
 ):
     # Convert interests string to list
-    interests_list = interests.split(',') if interests else ["Meditation"]
+    interests_list = [i.strip() for i in interests.split(',') if i.strip()] if interests else ["Meditation"]
     
     user_profile = {
         'mood': mood,
@@ -97,7 +115,8 @@ async def generate_activity(
         'interests': interests_list
     }
     
-    activity = generator.generate_personalized_activity(
+    activity = await asyncio.to_thread(
+        generator.generate_personalized_activity,
         user_profile=user_profile,
         mood=mood,
         energy_level=energy_level,
@@ -114,14 +133,19 @@ async def generate_activity(
 
 @app.post("/generate-stress-relief")
 async def generate_stress_relief(stress_trigger: str, stress_level: int):
-    practice = generator.generate_stress_relief_practice(stress_trigger, stress_level)
+    practice = await asyncio.to_thread(generator.generate_stress_relief_practice, stress_trigger, stress_level)
     return {"practice": practice}
 
 @app.post("/generate-sleep-practice")
 async def generate_sleep_practice(sleep_quality: str, stress_level: int):
-    practice = generator.generate_sleep_recommendation(sleep_quality, stress_level)
+    practice = await asyncio.to_thread(generator.generate_sleep_recommendation, sleep_quality, stress_level)
     return {"practice": practice}
 
+@app.get("/activity-library/stats")
+async def get_activity_library_stats():
+    """Size of the pre-generated library and how often requests were served from it."""
+    return generator.library.stats()
+
 @app.post("/users/{user_id}/activities/{activity_id}/complete")
 async def complete_activity(
     user_id: int,
@@ -129,7 +153,7 @@ async def complete_activity(
     mood_after: Optional[str] = None
 ):
     """Complete an activity and record it in practice history."""
-    if db.complete_activity(user_id, activity_id, mood_after):
+    if await asyncio.to_thread(db.complete_activity, user_id, activity_id, mood_after):
         return {"status": "success"}
     raise HTTPException(status_code=400, message="Failed to complete activity")
 
@@ -2,10 +2,10 @@
 from fastapi import FastAPI, UploadFile, File
 from pydantic import BaseModel
 from typing import List
+import asyncio
 import pandas as pd
 import json
 import numpy as np
-from io import StringIO
 import os
 import sys
 
@@ -15,15 +15,23 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from backend.outlier_detector import OutlierDetector
-from backend.config import GEMINI_API_KEY
+from backend.streaming import stream_detect_outliers
+from backend.config import (
+    GEMINI_API_KEY, OUTLIER_METHODS, OUTLIER_MIN_VOTES, AI_BATCH_SIZE, AI_MAX_CONCURRENCY,
+    STREAM_CHUNK_ROWS, STREAM_MAX_FLAGGED
+)
 
 app = FastAPI()
-detector = OutlierDetector(GEMINI_API_KEY)
+detector = OutlierDetector(GEMINI_API_KEY, methods=OUTLIER_METHODS, min_votes=OUTLIER_MIN_VOTES)
 
 class DataInput(BaseModel):
     data: List[float]
     context: str = ""
 
+def looks_like_id(column: str) -> bool:
+    id_patterns = ['id', 'index', 'key', 'code']
+    return any(pattern in column.lower() for pattern in id_patterns)
+
 def should_analyze_column(df: pd.DataFrame, column: str) -> bool:
     series = df[column]
     
@@ -45,8 +53,7 @@ def should_analyze_column(df: pd.DataFrame, column: str) -> bool:
         return False
     
     # Skip if column name suggests it's an ID (common patterns)
-    id_patterns = ['id', 'index', 'key', 'code']
-    if any(pattern in column.lower() for pattern in id_patterns):
+    if looks_like_id(column):
         return False
     
     # Always include important financial/demographic columns
@@ -56,10 +63,28 @@ def should_analyze_column(df: pd.DataFrame, column: str) -> bool:
     
     return True
 
+def should_analyze_summary(column: str, summary: dict, total_rows: int) -> bool:
+    # Streaming counterpart of should_analyze_column, using running statistics only
+    if total_rows == 0 or 1 - summary["count"] / total_rows > 0.3:
+        return False
+    if summary["binary"]:
+        return False
+    if not summary["std"] > 0 or summary["std"] ** 2 < 1e-10:
+        return False
+    if looks_like_id(column):
+        return False
+    return True
+
+def read_upload(file: UploadFile) -> pd.DataFrame:
+    # Parse straight from the spooled upload instead of copying it into memory
+    if (file.filename or "").lower().endswith(".parquet"):
+        return pd.read_parquet(file.file)
+    return pd.read_csv(file.file)
+
 @app.post("/analyze_outliers")
 async def analyze_outliers(data_input: DataInput):
     try:
-        result = detector.analyze_outliers(data_input.data, data_input.context)
+        result = await asyncio.to_thread(detector.analyze_outliers, data_input.data, data_input.context)
         return result
     except Exception as e:
         return {"error": str(e)}
@@ -67,10 +92,8 @@ async def analyze_outliers(data_input: DataInput):
 @app.post("/analyze_file")
 async def analyze_file(file: UploadFile = File(...), context: str = ""):
     try:
-        # Read the file content
-        contents = await file.read()
-        # Convert to string and create DataFrame
-        df = pd.read_csv(StringIO(contents.decode('utf-8')))
+        # Read the file into a DataFrame
+        df = await asyncio.to_thread(read_upload, file)
         
         # Get numeric columns and filter them
         numeric_columns = df.select_dtypes(include=[np.number]).columns
@@ -89,32 +112,65 @@ async def analyze_file(file: UploadFile = File(...), context: str = ""):
         {context}
         """
         
-        results = {}
-        for column in columns_to_analyze:
-            # Calculate percentiles for better context
-            percentiles = df[column].quantile([0.25, 0.5, 0.75]).to_dict()
-            
-            column_context = f"""
-            Analysis for column: {column}
-            
-            Column type: {df[column].dtype}
-            Column statistics:
-            - Count: {df[column].count()}
-            - Unique values: {len(df[column].unique())}
-            - Missing values: {df[column].isnull().sum()}
-            - Data range: {df[column].min()} to {df[column].max()}
-            - 25th percentile: {percentiles[0.25]:.2f}
-            - Median: {percentiles[0.5]:.2f}
-            - 75th percentile: {percentiles[0.75]:.2f}
-            
-            Dataset context: {dataset_context}
-            """
-            
-            results[column] = detector.analyze_outliers(
-                df[column].dropna().tolist(),
-                column_context
-            )
+        # Per-column extras for the prompt, computed for all columns at once
+        selected = df[columns_to_analyze]
+        unique_counts = selected.nunique()
+        missing_counts = selected.isnull().sum()
+        column_details = {
+            column: {
+                "Column type": selected[column].dtype,
+                "Unique values": int(unique_counts[column]),
+                "Missing values": int(missing_counts[column]),
+            }
+            for column in columns_to_analyze
+        }
+        
+        results = await detector.analyze_dataframe(
+            df,
+            columns_to_analyze,
+            dataset_context=dataset_context,
+            column_details=column_details,
+            batch_size=AI_BATCH_SIZE,
+            max_concurrency=AI_MAX_CONCURRENCY,
+        )
         
         return results
     except Exception as e:
         return {"error": str(e)}
+
+@app.post("/analyze_file_stream")
+async def analyze_file_stream(file: UploadFile = File(...), context: str = ""):
+    """Bounded-memory variant of /analyze_file for large CSV or Parquet uploads."""
+    try:
+        detection = await asyncio.to_thread(
+            stream_detect_outliers,
+            file.file,
+            file.filename or "",
+            chunk_rows=STREAM_CHUNK_ROWS,
+            methods=OUTLIER_METHODS,
+            min_votes=OUTLIER_MIN_VOTES,
+            column_filter=should_analyze_summary,
+            max_flagged=STREAM_MAX_FLAGGED,
+        )
+        columns_to_analyze = detection["columns"]
+        
+        dataset_context = f"""
+        This analysis is for a dataset with {detection['rows']} rows.
+        
+        Overall dataset statistics:
+        - Numeric features: {len(detection['numeric_columns'])}
+        - Selected features for outlier analysis: {len(columns_to_analyze)}
+        - Quantiles are approximate (t-digest)
+        
+        {context}
+        """
+        
+        return await detector.analyze_detections(
+            detection["results"],
+            columns_to_analyze,
+            dataset_context=dataset_context,
+            batch_size=AI_BATCH_SIZE,
+            max_concurrency=AI_MAX_CONCURRENCY,
+        )
+    except Exception as e:
+        return {"error": str(e)}
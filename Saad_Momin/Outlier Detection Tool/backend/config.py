@@ -3,4 +3,16 @@ import os
 
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
\ No newline at end of file
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
+
+# Outlier methods (zscore, modified_zscore, iqr, isolation_forest) and how many must agree
+OUTLIER_METHODS = [m.strip() for m in os.getenv("OUTLIER_METHODS", "zscore,modified_zscore,iqr").split(",") if m.strip()]
+OUTLIER_MIN_VOTES = int(os.getenv("OUTLIER_MIN_VOTES", "2"))
+
+# Columns described per Gemini prompt and how many prompts may run at once
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "10"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+
+# Streaming ingestion: rows per chunk and flagged indices kept per column
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "100000"))
+STREAM_MAX_FLAGGED = int(os.getenv("STREAM_MAX_FLAGGED", "10000"))
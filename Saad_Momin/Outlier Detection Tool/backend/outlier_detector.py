@@ -2,30 +2,189 @@
 import google.generativeai as genai
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+import asyncio
 import json
+import re
+from typing import List, Dict, Optional, Sequence, Union
+
+from backend.outlier_engine import detect_outliers
+
+# Only a sample of the flagged points is quoted in the prompt
+MAX_PROMPT_OUTLIERS = 20
+
+# Sample size per column when several columns share one prompt
+MAX_BATCH_PROMPT_OUTLIERS = 5
 
 class OutlierDetector:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        methods: Optional[Sequence[str]] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        min_votes: int = 1,
+    ):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-pro')
+        self.methods = methods
+        self.thresholds = thresholds
+        self.min_votes = min_votes
+
+    @staticmethod
+    def _describe_column(column: str, detection: Dict, extra: Optional[Dict] = None) -> str:
+        summary = detection["summary"]
+        method_counts = {
+            method: result.get("outlier_count", len(result["outlier_indices"]))
+            for method, result in detection["methods"].items()
+        }
+        outlier_count = detection.get("outlier_count", len(detection["outlier_indices"]))
+        sample = list(zip(detection["outlier_indices"], detection["outlier_values"]))[:MAX_BATCH_PROMPT_OUTLIERS]
+        extras = "".join(f"\n        - {key}: {value}" for key, value in (extra or {}).items())
+        return f"""
+        Column: {column}
+        - Count: {summary['count']}
+        - Mean: {summary['mean']:.2f}, Std: {summary['std']:.2f}
+        - Range: {summary['min']} to {summary['max']}
+        - 25th percentile: {summary['q1']:.2f}, Median: {summary['median']:.2f}, 75th percentile: {summary['q3']:.2f}
+        - Outliers flagged per method: {method_counts}
+        - Potential outliers: {outlier_count}, sample: {sample}{extras}
+        """
+
+    @staticmethod
+    def _split_batch_response(text: str, columns: List[str]) -> Dict[str, str]:
+        """Map a batched answer back to its columns, falling back to the full text."""
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        if match:
+            try:
+                parsed = json.loads(match.group())
+                if isinstance(parsed, dict):
+                    return {
+                        column: str(parsed.get(column) or text)
+                        for column in columns
+                    }
+            except json.JSONDecodeError:
+                pass
+        return {column: text for column in columns}
+
+    def _batch_prompt(self, descriptions: List[str], dataset_context: str) -> str:
+        return f"""
+        Analyze the following columns of one dataset for outliers.
         
-    def analyze_outliers(self, data: List[float], context: str = "") -> Dict:
-        # Calculate statistical measures
-        mean = np.mean(data)
-        std = np.std(data)
-        z_scores = [(x - mean) / std for x in data]
+        Dataset context: {dataset_context}
+        
+        {''.join(descriptions)}
+        
+        For every column please provide:
+        1. An assessment of whether these are true outliers
+        2. Possible explanations for the outliers
+        3. Recommendations for handling these outliers
         
-        # Identify potential outliers (Z-score > 2)
-        outliers = [(i, value) for i, (value, z) in enumerate(zip(data, z_scores)) if abs(z) > 2]
+        Respond with a single JSON object whose keys are the column names exactly as given
+        and whose values are the analysis for that column as a markdown string.
+        """
+
+    async def analyze_dataframe(
+        self,
+        df: pd.DataFrame,
+        columns: List[str],
+        dataset_context: str = "",
+        column_details: Optional[Dict[str, Dict]] = None,
+        batch_size: int = 10,
+        max_concurrency: int = 4,
+    ) -> Dict[str, Dict]:
+        """
+        Analyze many columns at once: one vectorized statistical pass over all of them,
+        then the AI commentary in batches of ``batch_size`` columns per prompt, with at
+        most ``max_concurrency`` model requests in flight.
+        """
+        detections = await asyncio.to_thread(self.detect, df, columns)
+        return await self.analyze_detections(
+            detections,
+            columns,
+            dataset_context=dataset_context,
+            column_details=column_details,
+            batch_size=batch_size,
+            max_concurrency=max_concurrency,
+        )
+
+    async def analyze_detections(
+        self,
+        detections: Dict[str, Dict],
+        columns: List[str],
+        dataset_context: str = "",
+        column_details: Optional[Dict[str, Dict]] = None,
+        batch_size: int = 10,
+        max_concurrency: int = 4,
+    ) -> Dict[str, Dict]:
+        """AI commentary for precomputed detections (e.g. from the streaming pass)."""
+        column_details = column_details or {}
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def analyze_batch(batch: List[str]) -> Dict[str, str]:
+            descriptions = [
+                self._describe_column(column, detections[column], column_details.get(column))
+                for column in batch
+            ]
+            prompt = self._batch_prompt(descriptions, dataset_context)
+            async with semaphore:
+                response = await asyncio.to_thread(self.model.generate_content, prompt)
+            return self._split_batch_response(response.text, batch)
+
+        batches = [columns[i:i + batch_size] for i in range(0, len(columns), batch_size)]
+        commentary = {}
+        for batch_result in await asyncio.gather(*(analyze_batch(batch) for batch in batches)):
+            commentary.update(batch_result)
+
+        return {
+            column: {
+                "statistical_analysis": {
+                    **detections[column]["summary"],
+                    "outlier_indices": detections[column]["outlier_indices"],
+                    "outlier_values": detections[column]["outlier_values"],
+                    "outlier_count": detections[column].get(
+                        "outlier_count", len(detections[column]["outlier_indices"])
+                    ),
+                    "methods": detections[column]["methods"],
+                },
+                "ai_analysis": commentary[column]
+            }
+            for column in columns
+        }
+
+    def detect(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Statistical pass over every (or the selected) numeric column of a DataFrame."""
+        return detect_outliers(
+            df,
+            methods=self.methods,
+            thresholds=self.thresholds,
+            min_votes=self.min_votes,
+            columns=columns,
+        )
+
+    def analyze_outliers(self, data: Union[List[float], pd.Series, np.ndarray], context: str = "") -> Dict:
+        # Calculate statistical measures
+        detection = next(iter(detect_outliers(
+            data,
+            methods=self.methods,
+            thresholds=self.thresholds,
+            min_votes=self.min_votes,
+        ).values()))
+        summary = detection["summary"]
+        outliers = list(zip(detection["outlier_indices"], detection["outlier_values"]))
+        method_counts = {
+            method: len(result["outlier_indices"])
+            for method, result in detection["methods"].items()
+        }
         
         # Prepare data for Gemini analysis
         data_description = f"""
         Data summary:
-        - Mean: {mean:.2f}
-        - Standard deviation: {std:.2f}
+        - Mean: {summary['mean']:.2f}
+        - Standard deviation: {summary['std']:.2f}
+        - Median: {summary['median']:.2f}
+        - IQR: {summary['iqr']:.2f}
+        - Outliers flagged per method: {method_counts}
         - Number of potential outliers: {len(outliers)}
-        - Data points flagged as outliers: {outliers}
+        - Data points flagged as outliers (first {MAX_PROMPT_OUTLIERS}): {outliers[:MAX_PROMPT_OUTLIERS]}
         
         Additional context: {context}
         """
@@ -45,11 +204,10 @@ class OutlierDetector:
         
         return {
             "statistical_analysis": {
-                "mean": mean,
-                "std": std,
-                "outlier_indices": [i for i, _ in outliers],
-                "outlier_values": [v for _, v in outliers],
-                "z_scores": z_scores
+                **summary,
+                "outlier_indices": detection["outlier_indices"],
+                "outlier_values": detection["outlier_values"],
+                "methods": detection["methods"],
             },
             "ai_analysis": response.text
         }
@@ -0,0 +1,168 @@
+# backend/outlier_engine.py
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+# Methods applied when the caller does not ask for specific ones
+DEFAULT_METHODS = ("zscore", "modified_zscore", "iqr")
+
+# Default cut-offs for each method
+DEFAULT_THRESHOLDS = {
+    "zscore": 2.0,            # |z| above this is flagged
+    "modified_zscore": 3.5,   # Iglewicz & Hoaglin recommendation
+    "iqr": 1.5,               # Tukey fences: Q1 - k*IQR, Q3 + k*IQR
+    "isolation_forest": 0.05  # expected contamination
+}
+
+# Columns are processed in blocks so the (rows x columns) temporaries stay bounded
+COLUMN_BLOCK_SIZE = 8
+
+# Scale factor that makes the MAD consistent with the standard deviation
+MAD_SCALE = 0.6745
+
+ArrayLike = Union[pd.Series, np.ndarray, Sequence[float]]
+
+
+def _zscore_mask(block: np.ndarray, threshold: float, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+    safe_std = np.where(std > 0, std, np.inf)
+    with np.errstate(invalid="ignore"):
+        return np.abs(block - mean) / safe_std > threshold
+
+
+def _modified_zscore_mask(block: np.ndarray, threshold: float, median: np.ndarray, mad: np.ndarray) -> np.ndarray:
+    safe_mad = np.where(mad > 0, mad, np.inf)
+    with np.errstate(invalid="ignore"):
+        return MAD_SCALE * np.abs(block - median) / safe_mad > threshold
+
+
+def _iqr_mask(block: np.ndarray, threshold: float, q1: np.ndarray, q3: np.ndarray) -> np.ndarray:
+    iqr = q3 - q1
+    with np.errstate(invalid="ignore"):
+        return (block < q1 - threshold * iqr) | (block > q3 + threshold * iqr)
+
+
+def _isolation_forest_mask(block: np.ndarray, contamination: float, random_state: int = 42) -> np.ndarray:
+    try:
+        from sklearn.ensemble import IsolationForest
+    except ImportError as e:
+        raise ImportError("scikit-learn is required for the isolation_forest method") from e
+
+    mask = np.zeros(block.shape, dtype=bool)
+    for j in range(block.shape[1]):
+        column = block[:, j]
+        valid = ~np.isnan(column)
+        if valid.sum() < 2:
+            continue
+        forest = IsolationForest(contamination=contamination, random_state=random_state)
+        # The forest subsamples (max_samples=256 by default) so fitting stays cheap on long columns
+        values = column[valid].reshape(-1, 1)
+        mask[valid, j] = forest.fit(values).predict(values) == -1
+    return mask
+
+
+def _to_frame(data: Union[pd.DataFrame, ArrayLike], name: str = "value") -> pd.DataFrame:
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, pd.Series):
+        return data.to_frame(name=data.name if data.name is not None else name)
+    return pd.DataFrame({name: np.asarray(data, dtype=np.float64)})
+
+
+def column_statistics(block: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-column summary statistics of a 2-D float array, NaNs ignored."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        count = np.sum(~np.isnan(block), axis=0)
+        mean = np.nanmean(block, axis=0)
+        std = np.nanstd(block, axis=0)
+        q1, median, q3 = np.nanpercentile(block, [25, 50, 75], axis=0)
+        mad = np.nanmedian(np.abs(block - median), axis=0)
+    return {
+        "count": count,
+        "mean": mean,
+        "std": std,
+        "min": np.nanmin(block, axis=0),
+        "max": np.nanmax(block, axis=0),
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "iqr": q3 - q1,
+        "mad": mad,
+    }
+
+
+def method_masks(
+    block: np.ndarray,
+    stats: Dict[str, np.ndarray],
+    methods: Iterable[str],
+    thresholds: Dict[str, float],
+) -> Dict[str, np.ndarray]:
+    """Boolean (rows x columns) outlier masks for each requested method."""
+    masks = {}
+    for method in methods:
+        threshold = thresholds[method]
+        if method == "zscore":
+            masks[method] = _zscore_mask(block, threshold, stats["mean"], stats["std"])
+        elif method == "modified_zscore":
+            masks[method] = _modified_zscore_mask(block, threshold, stats["median"], stats["mad"])
+        elif method == "iqr":
+            masks[method] = _iqr_mask(block, threshold, stats["q1"], stats["q3"])
+        elif method == "isolation_forest":
+            masks[method] = _isolation_forest_mask(block, threshold)
+        else:
+            raise ValueError(f"Unknown outlier method: {method}")
+    return masks
+
+
+def _summary(stats: Dict[str, np.ndarray], j: int) -> Dict:
+    return {
+        "count": int(stats["count"][j]),
+        **{key: float(values[j]) for key, values in stats.items() if key != "count"},
+    }
+
+
+def detect_outliers(
+    data: Union[pd.DataFrame, ArrayLike],
+    methods: Optional[Sequence[str]] = None,
+    thresholds: Optional[Dict[str, float]] = None,
+    min_votes: int = 1,
+    columns: Optional[List[str]] = None,
+) -> Dict[str, Dict]:
+    """
+    Run the selected outlier methods column-wise over a DataFrame (or a single series).
+
+    Returns, per column, the summary statistics and the index labels flagged by each
+    method. ``outlier_indices`` holds the rows flagged by at least ``min_votes`` methods.
+    """
+    methods = tuple(methods or DEFAULT_METHODS)
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    min_votes = max(1, min(min_votes, len(methods)))
+
+    df = _to_frame(data)
+    if columns is None:
+        columns = df.select_dtypes(include=[np.number]).columns.tolist()
+    index = df.index
+
+    results = {}
+    for start in range(0, len(columns), COLUMN_BLOCK_SIZE):
+        block_columns = columns[start:start + COLUMN_BLOCK_SIZE]
+        block = df[block_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        stats = column_statistics(block)
+        masks = method_masks(block, stats, methods, thresholds)
+        votes = np.add.reduce([mask.astype(np.uint8) for mask in masks.values()])
+
+        for j, column in enumerate(block_columns):
+            flagged = votes[:, j] >= min_votes
+            results[column] = {
+                "summary": _summary(stats, j),
+                "methods": {
+                    method: {
+                        "threshold": thresholds[method],
+                        "outlier_indices": index[mask[:, j]].tolist(),
+                    }
+                    for method, mask in masks.items()
+                },
+                "outlier_indices": index[flagged].tolist(),
+                "outlier_values": block[flagged, j].tolist(),
+            }
+    return results
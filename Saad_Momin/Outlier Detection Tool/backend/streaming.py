@@ -0,0 +1,257 @@
+# backend/streaming.py
+import numpy as np
+import pandas as pd
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence
+
+from backend.outlier_engine import DEFAULT_METHODS, DEFAULT_THRESHOLDS, method_masks
+
+# Rows per chunk read from the upload
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Flagged indices kept per column and method; counts are always exact
+DEFAULT_MAX_FLAGGED = 10_000
+
+# Methods that can be evaluated from running statistics in a second pass
+STREAMING_METHODS = ("zscore", "modified_zscore", "iqr")
+
+
+class TDigest:
+    """
+    Merging t-digest for approximate quantiles of a stream.
+
+    Each update sorts the incoming values together with the existing centroids and
+    re-bins them with the arcsine scale function, so the digest stays at roughly
+    ``compression / 2`` centroids no matter how many values have been seen.
+    """
+
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(values.size)]),
+        )
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        bins = np.floor(k - k[0]).astype(np.int64)
+
+        merged_weights = np.bincount(bins, weights=weights)
+        merged_sums = np.bincount(bins, weights=weights * means)
+        keep = merged_weights > 0
+        self.weights = merged_weights[keep]
+        self.means = merged_sums[keep] / self.weights
+
+    def quantile(self, q: Sequence[float]) -> np.ndarray:
+        if self.weights.size == 0:
+            return np.full(len(q), np.nan)
+        cumulative = np.cumsum(self.weights)
+        mids = (cumulative - self.weights / 2) / cumulative[-1]
+        return np.interp(
+            q,
+            np.concatenate([[0.0], mids, [1.0]]),
+            np.concatenate([[self.min], self.means, [self.max]]),
+        )
+
+
+class RunningStats:
+    """Per-column count, mean and M2 (Chan et al. merge), min/max and a t-digest."""
+
+    def __init__(self, columns: List[str], compression: int = 200):
+        k = len(columns)
+        self.columns = columns
+        self.rows = 0
+        self.count = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.binary = np.ones(k, dtype=bool)
+        self.digests = [TDigest(compression) for _ in columns]
+
+    def update(self, block: np.ndarray) -> None:
+        self.rows += block.shape[0]
+        valid = ~np.isnan(block)
+        n_b = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(n_b > 0, np.nansum(block, axis=0) / n_b, 0.0)
+            m2_b = np.nansum((block - mean_b) ** 2, axis=0)
+            total = self.count + n_b
+            delta = mean_b - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * n_b / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2_b + delta ** 2 * self.count * n_b / total, 0.0)
+        self.count = total
+        self.binary &= np.all((block == 0) | (block == 1) | ~valid, axis=0)
+        for j, digest in enumerate(self.digests):
+            digest.update(block[:, j])
+
+    def summaries(self) -> Dict[str, Dict]:
+        results = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.m2 / self.count)
+        for j, column in enumerate(self.columns):
+            digest = self.digests[j]
+            q1, median, q3 = digest.quantile([0.25, 0.5, 0.75])
+            results[column] = {
+                "count": int(self.count[j]),
+                "mean": float(self.mean[j]),
+                "std": float(std[j]),
+                "min": float(digest.min),
+                "max": float(digest.max),
+                "q1": float(q1),
+                "median": float(median),
+                "q3": float(q3),
+                "iqr": float(q3 - q1),
+                # MAD needs the exact median; IQR / 2 is exact for symmetric distributions
+                "mad": float((q3 - q1) / 2),
+                "binary": bool(self.binary[j]),
+            }
+        return results
+
+
+def iter_chunks(source: BinaryIO, filename: str = "", chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame chunks from a CSV or Parquet file object, rewinding it first."""
+    source.seek(0)
+    if filename.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("pyarrow is required for Parquet input") from e
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows)
+
+
+def _numeric_block(chunk: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    # Later chunks may infer a different dtype for the same column
+    return chunk[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def collect_statistics(
+    source: BinaryIO,
+    filename: str = "",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> RunningStats:
+    """First pass: running statistics for every numeric column of the first chunk."""
+    stats = None
+    for chunk in iter_chunks(source, filename, chunk_rows):
+        if stats is None:
+            stats = RunningStats(chunk.select_dtypes(include=[np.number]).columns.tolist())
+        stats.update(_numeric_block(chunk, stats.columns))
+    return stats if stats is not None else RunningStats([])
+
+
+def flag_outliers(
+    source: BinaryIO,
+    columns: List[str],
+    summaries: Dict[str, Dict],
+    filename: str = "",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    methods: Optional[Sequence[str]] = None,
+    thresholds: Optional[Dict[str, float]] = None,
+    min_votes: int = 1,
+    max_flagged: int = DEFAULT_MAX_FLAGGED,
+) -> Dict[str, Dict]:
+    """
+    Second pass: flag rows against the statistics from ``collect_statistics``.
+
+    The result has the same shape as ``detect_outliers``, with row positions as
+    indices and an exact ``outlier_count`` next to each (possibly truncated) list.
+    """
+    methods = tuple(m for m in (methods or DEFAULT_METHODS) if m in STREAMING_METHODS)
+    if not methods:
+        raise ValueError(f"Streaming analysis supports only: {', '.join(STREAMING_METHODS)}")
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    min_votes = max(1, min(min_votes, len(methods)))
+
+    stats = {
+        key: np.array([summaries[column][key] for column in columns])
+        for key in ("mean", "std", "median", "mad", "q1", "q3")
+    }
+    results = {
+        column: {
+            "summary": {key: value for key, value in summaries[column].items() if key != "binary"},
+            "methods": {
+                method: {"threshold": thresholds[method], "outlier_indices": [], "outlier_count": 0}
+                for method in methods
+            },
+            "outlier_indices": [],
+            "outlier_values": [],
+            "outlier_count": 0,
+        }
+        for column in columns
+    }
+    if not columns:
+        return results
+
+    offset = 0
+    for chunk in iter_chunks(source, filename, chunk_rows):
+        block = _numeric_block(chunk, columns)
+        positions = np.arange(offset, offset + block.shape[0])
+        offset += block.shape[0]
+
+        masks = method_masks(block, stats, methods, thresholds)
+        votes = np.add.reduce([mask.astype(np.uint8) for mask in masks.values()])
+
+        for j, column in enumerate(columns):
+            result = results[column]
+            for method, mask in masks.items():
+                method_result = result["methods"][method]
+                hits = positions[mask[:, j]]
+                method_result["outlier_count"] += int(hits.size)
+                room = max_flagged - len(method_result["outlier_indices"])
+                method_result["outlier_indices"].extend(hits[:room].tolist())
+
+            flagged = votes[:, j] >= min_votes
+            result["outlier_count"] += int(flagged.sum())
+            room = max_flagged - len(result["outlier_indices"])
+            if room > 0:
+                result["outlier_indices"].extend(positions[flagged][:room].tolist())
+                result["outlier_values"].extend(block[flagged, j][:room].tolist())
+    return results
+
+
+def stream_detect_outliers(
+    source: BinaryIO,
+    filename: str = "",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    methods: Optional[Sequence[str]] = None,
+    thresholds: Optional[Dict[str, float]] = None,
+    min_votes: int = 1,
+    column_filter: Optional[Callable[[str, Dict, int], bool]] = None,
+    max_flagged: int = DEFAULT_MAX_FLAGGED,
+) -> Dict:
+    """
+    Two-pass, bounded-memory outlier detection over a seekable CSV/Parquet file object.
+
+    ``column_filter(column, summary, total_rows)`` decides which numeric columns
+    are flagged in the second pass.
+    """
+    running = collect_statistics(source, filename, chunk_rows)
+    summaries = running.summaries()
+    columns = [
+        column for column in running.columns
+        if column_filter is None or column_filter(column, summaries[column], running.rows)
+    ]
+    return {
+        "rows": running.rows,
+        "numeric_columns": running.columns,
+        "columns": columns,
+        "results": flag_outliers(
+            source, columns, summaries, filename, chunk_rows,
+            methods=methods, thresholds=thresholds, min_votes=min_votes, max_flagged=max_flagged,
+        ),
+    }
@@ -8,22 +8,25 @@ st.set_page_config(page_title="Outlier Detection Tool", layout="wide")
 
 def create_visualization(data, outlier_indices, column_name="Values"):
     fig = go.Figure()
+    series = pd.Series(data)
+    is_outlier = series.index.isin(outlier_indices)
     
     # Add regular points
-    regular_indices = [i for i in range(len(data)) if i not in outlier_indices]
+    regular = series[~is_outlier]
     fig.add_trace(go.Scatter(
-        x=regular_indices,
-        y=[data[i] for i in regular_indices],
+        x=regular.index,
+        y=regular.values,
         mode='markers',
         name='Regular Points',
         marker=dict(color='blue')
     ))
     
     # Add outlier points
-    if outlier_indices:
+    if is_outlier.any():
+        outliers = series[is_outlier]
         fig.add_trace(go.Scatter(
-            x=outlier_indices,
-            y=[data[i] for i in outlier_indices],
+            x=outliers.index,
+            y=outliers.values,
             mode='markers',
             name='Outliers',
             marker=dict(color='red', size=10)
@@ -72,7 +75,7 @@ if uploaded_file and st.button("Analyze"):
                 
                 # Display visualization
                 st.plotly_chart(create_visualization(
-                    df[column].tolist(),
+                    df[column],
                     result["statistical_analysis"]["outlier_indices"],
                     column
                 ))
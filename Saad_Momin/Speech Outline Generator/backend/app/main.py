@@ -2,20 +2,28 @@ from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 import google.generativeai as genai
 import os
+import json
+import asyncio
+from urllib.parse import quote
 from dotenv import load_dotenv
 from typing import Optional
-from fastapi.responses import StreamingResponse, FileResponse
-import tempfile
+from fastapi.responses import StreamingResponse
+from app.outline_store import OutlineStore, ArtifactCache, FORMATS, request_fingerprint, render_outline
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Gemini AI
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel('gemini-pro')
+MODEL_NAME = 'gemini-pro'
+model = genai.GenerativeModel(MODEL_NAME)
 
 app = FastAPI(title="Speech Outline Generator API")
 
+# Generated outlines by request fingerprint, and their rendered downloads
+outline_store = OutlineStore(max_entries=int(os.getenv("OUTLINE_STORE_SIZE", "500")))
+artifact_cache = ArtifactCache(max_bytes=int(os.getenv("ARTIFACT_CACHE_MB", "64")) * 1024 * 1024)
+
 class SpeechRequest(BaseModel):
     topic: str
     language: str
@@ -112,13 +120,12 @@ translations = {
     }
 }
 
-@app.post("/generate-outline")
-async def generate_outline(request: SpeechRequest):
-    try:
-        # Get translations for the selected language
-        lang_trans = translations.get(request.language, translations["English"])
-        
-        prompt = f"""Create a speech outline with the following specifications:
+def build_prompt(request: SpeechRequest) -> list:
+    """Model input for an outline request"""
+    # Get translations for the selected language
+    lang_trans = translations.get(request.language, translations["English"])
+    
+    prompt = f"""Create a speech outline with the following specifications:
         - Topic: {request.topic}
         - Strict Language: {request.language} (Please ensure ALL text, including section headers and structural elements, is in {request.language})
         - Tone: {request.tone}
@@ -151,81 +158,149 @@ async def generate_outline(request: SpeechRequest):
         - Format according to the {request.formatting_style} style
         - Include time markers for each section to total {request.duration} minutes"""
 
-        response = model.generate_content([
-            {"role": "user", "parts": [f"You are an expert speech and content outline generator. Always respond entirely in {request.language}.\n\n{prompt}"]}
-        ])
-        
+    return [
+        {"role": "user", "parts": [f"You are an expert speech and content outline generator. Always respond entirely in {request.language}.\n\n{prompt}"]}
+    ]
+
+def outline_metadata(request: SpeechRequest, outline: str) -> dict:
+    return {
+        "word_count": len(outline.split()),
+        "duration": request.duration,
+        "sections": request.sections,
+        "topic": request.topic,
+        "language": request.language
+    }
+
+async def get_or_generate_outline(request: SpeechRequest):
+    """Stored outline for this request, calling the model only for new fingerprints"""
+    fingerprint = request_fingerprint(request.model_dump(), MODEL_NAME)
+
+    async def generate():
+        response = await asyncio.to_thread(model.generate_content, build_prompt(request))
+        return response.text, outline_metadata(request, response.text)
+
+    return await outline_store.get_or_generate(fingerprint, generate)
+
+def render_artifact(record: dict, fmt: str) -> Response:
+    """Rendered outline file, served from the artifact cache when possible"""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    
+    data = artifact_cache.get(record["outline_id"], fmt)
+    if data is None:
+        try:
+            data = render_outline(record["outline"], fmt, record["topic"])
+        except ImportError as e:
+            raise HTTPException(status_code=501, detail=f"{fmt.upper()} export is not available: {e}")
+        artifact_cache.put(record["outline_id"], fmt, data)
+    
+    media_type, extension = FORMATS[fmt]
+    filename = f"speech_outline_{record['topic'].lower().replace(' ', '_')}.{extension}"
+    return Response(
+        content=data,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    )
+
+@app.post("/generate-outline")
+async def generate_outline(request: SpeechRequest):
+    try:
+        record, cached = await get_or_generate_outline(request)
         return {
-            "outline": response.text,
-            "word_count": len(response.text.split()),
-            "duration": request.duration,
-            "sections": request.sections
+            "outline": record["outline"],
+            "word_count": record["word_count"],
+            "duration": record["duration"],
+            "sections": record["sections"],
+            "outline_id": record["outline_id"],
+            "cached": cached
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/download-outline")
-async def download_outline(request: SpeechRequest):
+def sse_event(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+async def stream_outline_events(request: SpeechRequest):
+    """
+    Server-sent events for an outline: "token" events with text as the model
+    produces it, then a "done" event with the word count and metadata.
+    """
+    fingerprint = request_fingerprint(request.model_dump(), MODEL_NAME)
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
+
+    def produce() -> str:
+        parts = []
+        for chunk in model.generate_content(build_prompt(request), stream=True):
+            parts.append(chunk.text)
+            loop.call_soon_threadsafe(tokens.put_nowait, chunk.text)
+        return "".join(parts)
+
+    async def generate():
+        outline = await asyncio.to_thread(produce)
+        return outline, outline_metadata(request, outline)
+
+    # Runs to completion and is stored even if the client disconnects
+    generation = asyncio.create_task(outline_store.get_or_generate(fingerprint, generate))
+    streamed = False
+    while not generation.done() or not tokens.empty():
+        next_token = asyncio.create_task(tokens.get())
+        done, _ = await asyncio.wait({next_token, generation}, return_when=asyncio.FIRST_COMPLETED)
+        if next_token in done:
+            streamed = True
+            yield sse_event("token", {"text": next_token.result()})
+        else:
+            next_token.cancel()
+
     try:
-        # Get translations for the selected language
-        lang_trans = translations.get(request.language, translations["English"])
-        
-        # Reuse the same prompt generation logic
-        prompt = f"""Create a speech outline with the following specifications:
-        - Topic: {request.topic}
-        - Strict Language: {request.language} (Please ensure ALL text, including section headers and structural elements, is in {request.language})
-        - Tone: {request.tone}
-        - Number of Sections: {request.sections}
-        - Speech Duration: {request.duration} minutes
-        - Target Audience: {request.audience_type}
-        - Presentation Style: {request.presentation_style}
-        - Purpose/Goal: {request.purpose}
-        - Word Limit: {request.word_limit} words
-        - Formatting Style: {request.formatting_style}
-        {f'- Additional Details: {request.topic_details}' if request.topic_details else ''}
-        {f'- Template Style: {request.template}' if request.template != 'Standard' else ''}
+        record, cached = generation.result()
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+        return
 
-        Outline Structure:
-        1. Title (in {request.language})
-        2. Target Audience and Purpose Statement
-        3. Time Allocation per Section
-        4. For each section include:
-           - {lang_trans["key_points"]}
-           - {lang_trans["potential_subtopics"]}
-           - {lang_trans["suggested_transitions"]}
-           - Estimated Time
-        5. {lang_trans["closing_recommendations"]}
-        6. Visual Aid Suggestions
-        7. Engagement Techniques
+    if not streamed:
+        # Stored or generated by a concurrent identical request
+        yield sse_event("token", {"text": record["outline"]})
+    yield sse_event("done", {
+        "word_count": record["word_count"],
+        "duration": record["duration"],
+        "sections": record["sections"],
+        "outline_id": record["outline_id"],
+        "cached": cached
+    })
 
-        Important: 
-        - Ensure that ALL text, including section headers, structural elements, and content is in {request.language}
-        - Keep within the {request.word_limit} word limit
-        - Format according to the {request.formatting_style} style
-        - Include time markers for each section to total {request.duration} minutes"""
+@app.post("/generate-outline/stream")
+async def generate_outline_stream(request: SpeechRequest):
+    return StreamingResponse(
+        stream_outline_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/outlines/{outline_id}")
+async def get_outline(outline_id: str):
+    record = outline_store.get(outline_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Outline not found or expired; generate it again")
+    return {key: value for key, value in record.items() if key != "fingerprint"}
 
-        response = model.generate_content([
-            {"role": "user", "parts": [f"You are an expert speech and content outline generator. Always respond entirely in {request.language}.\n\n{prompt}"]}
-        ])
-        
-        # Create a temporary file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as tmp:
-            tmp.write(response.text)
-            tmp_path = tmp.name
-
-        filename = f"speech_outline_{request.topic.lower().replace(' ', '_')}.txt"
-        
-        # Return the file as a downloadable response
-        return FileResponse(
-            tmp_path,
-            media_type='text/plain',
-            filename=filename,
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-        
+@app.get("/outlines/{outline_id}/download")
+async def download_stored_outline(outline_id: str, format: str = "txt"):
+    """Render a previously generated outline without calling the model"""
+    record = outline_store.get(outline_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Outline not found or expired; generate it again")
+    return await asyncio.to_thread(render_artifact, record, format)
+
+@app.post("/download-outline")
+async def download_outline(request: SpeechRequest, format: str = "txt"):
+    # Reuses the outline generated for the same request, if there was one
+    try:
+        record, _ = await get_or_generate_outline(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return await asyncio.to_thread(render_artifact, record, format)
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
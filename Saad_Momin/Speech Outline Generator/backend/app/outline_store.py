@@ -0,0 +1,240 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+def request_fingerprint(params: dict, model_name: str) -> str:
+    """Stable hash of the generation inputs; identical requests share one outline."""
+    canonical = {
+        key: " ".join(value.split()) if isinstance(value, str) else value
+        for key, value in sorted(params.items())
+    }
+    payload = json.dumps({"model": model_name, "params": canonical}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class OutlineStore:
+    """
+    Generated outlines kept in memory, newest last, up to ``max_entries``.
+
+    Outlines are looked up by id (a fingerprint prefix). Concurrent requests with
+    the same fingerprint wait for a single generation instead of each calling the model.
+    """
+
+    def __init__(self, max_entries: int = 500):
+        self.max_entries = max_entries
+        self._outlines: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def outline_id(fingerprint: str) -> str:
+        return fingerprint[:16]
+
+    def get(self, outline_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._outlines.get(outline_id)
+            if record is not None:
+                self._outlines.move_to_end(outline_id)
+            return record
+
+    def put(self, fingerprint: str, outline: str, metadata: dict) -> dict:
+        record = {
+            "outline_id": self.outline_id(fingerprint),
+            "fingerprint": fingerprint,
+            "outline": outline,
+            "created_at": time.time(),
+            **metadata
+        }
+        with self._lock:
+            self._outlines[record["outline_id"]] = record
+            self._outlines.move_to_end(record["outline_id"])
+            while len(self._outlines) > self.max_entries:
+                self._outlines.popitem(last=False)
+        return record
+
+    async def get_or_generate(
+        self,
+        fingerprint: str,
+        generate: Callable[[], Awaitable[Tuple[str, dict]]]
+    ) -> Tuple[dict, bool]:
+        """Return ``(record, cached)``, generating at most once per fingerprint at a time."""
+        record = self.get(self.outline_id(fingerprint))
+        if record is not None and record["fingerprint"] == fingerprint:
+            return record, True
+
+        with self._lock:
+            pending = self._pending.get(fingerprint)
+            if pending is None:
+                # A thread-safe future, so waiters on any event loop can share it
+                future = self._pending[fingerprint] = concurrent.futures.Future()
+        if pending is not None:
+            return await asyncio.wrap_future(pending), True
+
+        try:
+            outline, metadata = await generate()
+            record = self.put(fingerprint, outline, metadata)
+            future.set_result(record)
+            return record, False
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[fingerprint]
+
+
+class ArtifactCache:
+    """Rendered files keyed by (outline id, format), evicted oldest-first past ``max_bytes``."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._artifacts: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, outline_id: str, fmt: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._artifacts.get((outline_id, fmt))
+            if data is not None:
+                self._artifacts.move_to_end((outline_id, fmt))
+            return data
+
+    def put(self, outline_id: str, fmt: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._artifacts.pop((outline_id, fmt), None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._artifacts[(outline_id, fmt)] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._artifacts.popitem(last=False)
+                self.size -= len(evicted)
+
+
+# Media type and file extension per download format
+FORMATS = {
+    "txt": ("text/plain; charset=utf-8", "txt"),
+    "md": ("text/markdown; charset=utf-8", "md"),
+    "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "docx"),
+    "pdf": ("application/pdf", "pdf"),
+}
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*)$')
+_BULLET = re.compile(r'^(\s*)([-*+•])\s+(.*)$')
+_NUMBERED = re.compile(r'^(\s*)(\d+[.)])\s+(.*)$')
+_BOLD = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+
+
+def _outline_lines(outline: str):
+    """
+    Classify each markdown line as heading, bullet, numbered item or paragraph.
+    Yields ``(kind, level, text, marker)``; level is the heading or nesting depth.
+    """
+    for line in outline.splitlines():
+        if not line.strip():
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            yield "heading", len(heading.group(1)), heading.group(2).strip(), ""
+            continue
+        for kind, pattern in (("bullet", _BULLET), ("numbered", _NUMBERED)):
+            match = pattern.match(line)
+            if match:
+                marker = "•" if kind == "bullet" else match.group(2)
+                yield kind, len(match.group(1).expandtabs(4)) // 2, match.group(3).strip(), marker
+                break
+        else:
+            yield "paragraph", 0, line.strip(), ""
+
+
+def _plain(text: str) -> str:
+    return _BOLD.sub(lambda m: m.group(1) or m.group(2), text).replace("*", "")
+
+
+def render_docx(outline: str, title: str) -> bytes:
+    from docx import Document
+
+    document = Document()
+    document.core_properties.title = title
+    for kind, level, text, _ in _outline_lines(outline):
+        if kind == "heading":
+            document.add_heading(_plain(text), level=min(level, 4))
+            continue
+        style = {"bullet": "List Bullet", "numbered": "List Number"}.get(kind)
+        if style and level:
+            style = f"{style} {min(level + 1, 3)}"
+        paragraph = document.add_paragraph(style=style)
+        # Keep **bold** spans as bold runs
+        position = 0
+        for match in _BOLD.finditer(text):
+            paragraph.add_run(text[position:match.start()].replace("*", ""))
+            paragraph.add_run(match.group(1) or match.group(2)).bold = True
+            position = match.end()
+        paragraph.add_run(text[position:].replace("*", ""))
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def render_pdf(outline: str, title: str) -> bytes:
+    from xml.sax.saxutils import escape
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    styles = getSampleStyleSheet()
+    # The built-in fonts only cover Latin scripts; point PDF_FONT_PATH at a TTF for others
+    font_path = os.getenv("PDF_FONT_PATH")
+    if font_path:
+        pdfmetrics.registerFont(TTFont("OutlineFont", font_path))
+        for style in styles.byName.values():
+            style.fontName = "OutlineFont"
+
+    def markup(text: str) -> str:
+        escaped = escape(text)
+        return _BOLD.sub(lambda m: f"<b>{m.group(1) or m.group(2)}</b>", escaped).replace("*", "")
+
+    item_styles = {}
+    story = []
+    for kind, level, text, marker in _outline_lines(outline):
+        if kind == "heading":
+            story.append(Paragraph(markup(text), styles[f"Heading{min(level, 4)}"]))
+        elif kind == "paragraph":
+            story.append(Paragraph(markup(text), styles["BodyText"]))
+        else:
+            if level not in item_styles:
+                item_styles[level] = ParagraphStyle(
+                    f"Item{level}", parent=styles["BodyText"],
+                    leftIndent=18 * (level + 1), bulletIndent=18 * level
+                )
+            story.append(Paragraph(markup(text), item_styles[level], bulletText=marker))
+        story.append(Spacer(1, 2))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, title=title).build(story)
+    return buffer.getvalue()
+
+
+def render_outline(outline: str, fmt: str, title: str) -> bytes:
+    """Render a stored outline in one of ``FORMATS``."""
+    if fmt in ("txt", "md"):
+        # The model already answers in markdown
+        return outline.encode("utf-8")
+    if fmt == "docx":
+        return render_docx(outline, title)
+    if fmt == "pdf":
+        return render_pdf(outline, title)
+    raise ValueError(f"Unsupported format: {fmt}")
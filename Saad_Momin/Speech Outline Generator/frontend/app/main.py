@@ -1,15 +1,31 @@
 import streamlit as st
 import requests
-import base64
+import json
 
 # API endpoint
 API_URL = "http://localhost:8080"  # FastAPI backend URL
 
-def get_download_link(content, filename):
-    """Generate a download link for the text file"""
-    text_bytes = content.encode('utf-8')
-    b64 = base64.b64encode(text_bytes).decode()
-    return f'<a href="data:text/plain;charset=utf-8;base64,{b64}" download="{filename}">Download Text File</a>'
+DOWNLOAD_FORMATS = [("Text", "txt"), ("Markdown", "md"), ("Word", "docx"), ("PDF", "pdf")]
+
+def fetch_download(outline_id, fmt):
+    """Fetch a rendered outline from the backend, so the browser never has to reach it"""
+    response = requests.get(f"{API_URL}/outlines/{outline_id}/download", params={"format": fmt})
+    response.raise_for_status()
+    return response.content, response.headers.get("content-type", "application/octet-stream")
+
+def iter_sse(response):
+    """Yield (event, data) pairs from a server-sent events response"""
+    response.encoding = "utf-8"
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
 
 def main():
     st.set_page_config(page_title="AI Speech Outline Generator", page_icon="🎤", layout="wide")
@@ -100,34 +116,70 @@ def main():
                         "topic_details": topic_details
                     }
                     
-                    # Make API request
-                    response = requests.post(f"{API_URL}/generate-outline", json=payload)
+                    # Stream the outline and render it as it arrives
+                    response = requests.post(f"{API_URL}/generate-outline/stream", json=payload, stream=True)
                     response.raise_for_status()  # Raise exception for bad status codes
                     
-                    data = response.json()
-                    outline = data["outline"]
-                    
-                    st.write("### 📝 Generated Speech Outline")
-                    st.markdown(outline)
-                    
-                    # Create download options
-                    st.markdown("### 📥 Download Options")
-                    filename = f"speech_outline_{topic.lower().replace(' ', '_')}.txt"
-                    st.markdown(get_download_link(outline, filename), unsafe_allow_html=True)
+                    placeholder = st.empty()
+                    outline, data = "", None
+                    for event, event_data in iter_sse(response):
+                        if event == "token":
+                            outline += event_data["text"]
+                            placeholder.markdown("### 📝 Generated Speech Outline\n\n" + outline + "▌")
+                        elif event == "done":
+                            data = event_data
+                        elif event == "error":
+                            raise RuntimeError(event_data["detail"])
+                    placeholder.empty()
+                    if data is None:
+                        raise RuntimeError("The outline stream ended unexpectedly")
                     
-                    # Display speech statistics
-                    st.markdown("### 📊 Speech Statistics")
-                    st.info(f"""
-                    - Estimated Word Count: {data['word_count']}
-                    - Estimated Speaking Time: {data['duration']} minutes
-                    - Number of Sections: {data['sections']}
-                    """)
+                    # Kept in the session so the result survives the reruns download buttons trigger
+                    st.session_state.outline = outline
+                    st.session_state.outline_data = data
+                    st.session_state.downloads = {}
                 except requests.exceptions.RequestException as e:
                     st.error(f"Error connecting to the backend service: {str(e)}")
                 except Exception as e:
                     st.error(f"An error occurred: {str(e)}")
         else:
             st.warning("Please enter a topic for your speech.")
+    
+    if "outline_data" in st.session_state:
+        render_outline(st.session_state.outline, st.session_state.outline_data)
+
+def render_outline(outline, data):
+    st.write("### 📝 Generated Speech Outline")
+    st.markdown(outline)
+    
+    # Only the format that is asked for is rendered by the backend
+    st.markdown("### 📥 Download Options")
+    labels = dict(DOWNLOAD_FORMATS)
+    label = st.radio("Format", list(labels), horizontal=True, key="download_format")
+    fmt = labels[label]
+    downloads = st.session_state.setdefault("downloads", {})
+    if fmt not in downloads and st.button(f"Prepare {label} download"):
+        try:
+            downloads[fmt] = fetch_download(data['outline_id'], fmt)
+        except requests.exceptions.RequestException as e:
+            st.warning(f"{label} download unavailable: {str(e)}")
+    if fmt in downloads:
+        content, mime = downloads[fmt]
+        st.download_button(
+            label=f"Download {label}",
+            data=content,
+            file_name=f"speech_outline.{fmt}",
+            mime=mime,
+            key=f"download_{fmt}"
+        )
+    
+    # Display speech statistics
+    st.markdown("### 📊 Speech Statistics")
+    st.info(f"""
+    - Estimated Word Count: {data['word_count']}
+    - Estimated Speaking Time: {data['duration']} minutes
+    - Number of Sections: {data['sections']}
+    """)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file